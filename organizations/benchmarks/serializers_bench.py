@@ -0,0 +1,119 @@
+"""Микробенчмарк сериализации строк API в JSON.
+
+Сравнивает прежний построчный путь (словарь через getattr и json.dumps
+с JsonExtendEncoder) с RowSerializer на <rows> строках выгрузки
+документов организаций. Запускается из директории organizations
+с теми же переменными окружения, что и приложение:
+
+    PYTHONPATH=. python benchmarks/serializers_bench.py [--no-orjson]
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (Column, Date, Integer, MetaData, String, Table, Text,
+                        create_engine, select)
+
+FIELDS = ('inn', 'kpp', 'full_name', 'props', 'date_approved', 'comment')
+
+rows_table = Table(
+    'orgs_docs', MetaData(),
+    Column('inn', String(10)),
+    Column('kpp', String(9)),
+    Column('full_name', Text),
+    Column('props', Text),
+    Column('date_approved', Date),
+    Column('comment', Text),
+    Column('org_id', Integer),
+    Column('orgadm_id', Integer),
+)
+
+
+class JsonExtendEncoder(json.JSONEncoder):
+    """Кодировщик прежней реализации API."""
+
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.strftime('%Y-%m-%d %H:%M:%S')
+        elif isinstance(obj, date):
+            return obj.strftime('%Y-%m-%d')
+        else:
+            return json.JSONEncoder.default(self, obj)
+
+
+def fetch_rows(count: int) -> list:
+    """Возвращает <count> строк из SQLite в памяти."""
+    engine = create_engine('sqlite://')
+    rows_table.create(engine)
+    with engine.connect() as connection:
+        connection.execute(rows_table.insert(), [
+            {'inn': f'{7700000000 + i}', 'kpp': f'{770000000 + i % 1000}',
+             'full_name': f'ООО «Организация номер {i}»',
+             'props': f'№ {i} от 01.01.2023',
+             'date_approved': (date(2023, 1, 1) + timedelta(i % 300)
+                               if i % 10 else None),
+             'comment': 'комментарий' if i % 3 else None,
+             'org_id': i, 'orgadm_id': i % 10}
+            for i in range(count)])
+        return connection.execute(select(rows_table)).all()
+
+
+def dump_old(rows) -> bytes:
+    return ''.join(
+        json.dumps({field: getattr(row, field) for field in FIELDS},
+                   cls=JsonExtendEncoder)
+        for row in rows).encode('utf-8')
+
+
+def make_dump_new(serializer):
+    def dump_new(rows) -> bytes:
+        dumps = serializer.dumps
+        return b''.join([dumps(row) for row in rows])
+    return dump_new
+
+
+def measure(function, rows, repeat: int) -> float:
+    """Лучшее время из <repeat> запусков, сек."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(rows)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-orjson', action='store_true',
+                        help='сериализовать модулем json')
+    args = parser.parse_args()
+    if args.no_orjson:
+        sys.modules['orjson'] = None
+
+    from organizations.serializers import RowSerializer, orjson
+
+    rows = fetch_rows(args.rows)
+    serializer = RowSerializer(rows_table.c, FIELDS)
+    dump_new = make_dump_new(serializer)
+    old_result = [json.loads(line) for line in
+                  dump_old(rows).decode().replace('}{', '}\n{').splitlines()]
+    new_result = [json.loads(line) for line in
+                  dump_new(rows).decode().replace('}{', '}\n{').splitlines()]
+    if old_result != new_result:
+        sys.exit('Результаты сериализации не совпадают')
+
+    print(f'Строк: {args.rows}, orjson: {"да" if orjson else "нет"}')
+    old_time = measure(dump_old, rows, args.repeat)
+    new_time = measure(dump_new, rows, args.repeat)
+    print(f'json.dumps + JsonExtendEncoder: {old_time * 1000:.0f} мс')
+    print(f'RowSerializer: {new_time * 1000:.0f} мс '
+          f'(в {old_time / new_time:.1f} раза быстрее)')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ import io
 import random
 
 from organizations import create_app
+from organizations.blob_storage import method_docs_storage
 from organizations.extentions import db
 from organizations.models import (Industry, Message, MethodicalDoc, OrgAdmDoc,
                                   Organization, Region, Resource)
@@ -374,6 +375,7 @@ def fill_demo_data() -> None:
     lst_with_methods = []
 
     for method_doc in methodics_data:
+        data_hash, data_size = method_docs_storage.save(method_doc.get("data"))
         new_method_doc = MethodicalDoc(
             name=method_doc["name"],
             short_name=method_doc["short_name"],
@@ -382,7 +384,8 @@ def fill_demo_data() -> None:
             is_conf=method_doc["is_conf"],
             is_active=method_doc["is_active"],
             data_extension=method_doc["data_extension"],
-            data=method_doc.get("data").read()
+            data_hash=data_hash,
+            data_size=data_size
 
         )
         db.session.add(new_method_doc)
@@ -0,0 +1,46 @@
+"""unique association rows, resp cert/resource index
+
+Revision ID: 5d2e8c41a7b3
+Revises: 1c1219b5fd17
+Create Date: 2026-10-18 10:12:31.418206
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8c41a7b3'
+down_revision = '1c1219b5fd17'
+branch_labels = None
+depends_on = None
+
+ASSOCIATIONS = (
+    ('regions_resources', 'region_id', 'resource_id'),
+    ('responsibilities_services', 'service_id', 'resp_id'),
+)
+
+
+def remove_duplicates(table, first, second):
+    """Удаляет полностью совпадающие строки ассоциативной таблицы."""
+    op.execute(f'CREATE TABLE tmp_{table} AS '
+               f'SELECT DISTINCT {first}, {second} FROM {table}')
+    op.execute(f'DELETE FROM {table}')
+    op.execute(f'INSERT INTO {table} ({first}, {second}) '
+               f'SELECT {first}, {second} FROM tmp_{table}')
+    op.execute(f'DROP TABLE tmp_{table}')
+
+
+def upgrade():
+    for table, first, second in ASSOCIATIONS:
+        remove_duplicates(table, first, second)
+        op.create_index(f'ix_{table}_{first}_{second}', table,
+                        [first, second], unique=True)
+    op.create_index('ix_responsibilities_with_certs_cert_id_resource_id',
+                    'responsibilities_with_certs',
+                    ['cert_id', 'resource_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_responsibilities_with_certs_cert_id_resource_id',
+                  table_name='responsibilities_with_certs')
+    for table, first, second in ASSOCIATIONS:
+        op.drop_index(f'ix_{table}_{first}_{second}', table_name=table)
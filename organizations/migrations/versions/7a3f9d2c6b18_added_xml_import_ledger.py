@@ -0,0 +1,43 @@
+"""added xml import ledger
+
+Revision ID: 7a3f9d2c6b18
+Revises: 5d2e8c41a7b3
+Create Date: 2026-10-18 15:41:07.302114
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '7a3f9d2c6b18'
+down_revision = '5d2e8c41a7b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('xml_imports',
+    sa.Column('import_id', sa.Integer(), nullable=False),
+    sa.Column('cert_id', sa.Integer(), nullable=False),
+    sa.Column('file_name', sa.Text(), nullable=True),
+    sa.Column('file_hash', sa.String(length=64), nullable=False),
+    sa.Column('zones_count', sa.Integer(), nullable=False),
+    sa.Column('zones_skipped', sa.Integer(), nullable=False),
+    sa.Column('date_imported', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['cert_id'], ['certs.cert_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('import_id')
+    )
+    op.create_index(op.f('ix_xml_imports_file_hash'), 'xml_imports', ['file_hash'], unique=False)
+    op.create_table('xml_import_zones',
+    sa.Column('cert_id', sa.Integer(), nullable=False),
+    sa.Column('zone_hash', sa.String(length=64), nullable=False),
+    sa.Column('date_imported', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['cert_id'], ['certs.cert_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('cert_id', 'zone_hash')
+    )
+
+
+def downgrade():
+    op.drop_table('xml_import_zones')
+    op.drop_index(op.f('ix_xml_imports_file_hash'), table_name='xml_imports')
+    op.drop_table('xml_imports')
@@ -0,0 +1,28 @@
+"""added region aliases
+
+Revision ID: 9c4e1b7d2f05
+Revises: 7a3f9d2c6b18
+Create Date: 2026-10-18 17:12:44.518203
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1b7d2f05'
+down_revision = '7a3f9d2c6b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('region_aliases',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('region_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['region_id'], ['regions.region_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('region_aliases')
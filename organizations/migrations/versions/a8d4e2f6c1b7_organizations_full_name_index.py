@@ -0,0 +1,24 @@
+"""organizations full name index
+
+Revision ID: a8d4e2f6c1b7
+Revises: f3b7d5a20c19
+Create Date: 2026-10-18 21:02:36.518940
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'a8d4e2f6c1b7'
+down_revision = 'f3b7d5a20c19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_organizations_full_name_org_id', 'organizations',
+                    ['full_name', 'org_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_organizations_full_name_org_id',
+                  table_name='organizations')
@@ -0,0 +1,34 @@
+"""added date_updated to orgadmdocs_organizations
+
+Revision ID: b5c1f7e3d9a2
+Revises: a8d4e2f6c1b7
+Create Date: 2026-10-18 21:48:05.274113
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b5c1f7e3d9a2'
+down_revision = 'a8d4e2f6c1b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('orgadmdocs_organizations',
+                  sa.Column('date_updated', sa.DateTime(), nullable=True))
+    op.execute('UPDATE orgadmdocs_organizations '
+               'SET date_updated = CURRENT_TIMESTAMP')
+    op.alter_column('orgadmdocs_organizations', 'date_updated',
+                    existing_type=sa.DateTime(),
+                    nullable=False)
+    op.create_index(op.f('ix_orgadmdocs_organizations_date_updated'),
+                    'orgadmdocs_organizations', ['date_updated'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_orgadmdocs_organizations_date_updated'),
+                  table_name='orgadmdocs_organizations')
+    op.drop_column('orgadmdocs_organizations', 'date_updated')
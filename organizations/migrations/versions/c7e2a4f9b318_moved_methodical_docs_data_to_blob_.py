@@ -0,0 +1,79 @@
+"""moved methodical_docs data to blob storage
+
+Revision ID: c7e2a4f9b318
+Revises: b5c1f7e3d9a2
+Create Date: 2026-10-18 22:40:12.518306
+
+"""
+from io import BytesIO
+
+import sqlalchemy as sa
+from alembic import op
+
+from organizations.blob_storage import method_docs_storage
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a4f9b318'
+down_revision = 'b5c1f7e3d9a2'
+branch_labels = None
+depends_on = None
+
+methodical_docs = sa.table(
+    'methodical_docs',
+    sa.column('method_id', sa.Integer),
+    sa.column('data', sa.LargeBinary),
+    sa.column('data_hash', sa.String),
+    sa.column('data_size', sa.BigInteger),
+)
+
+
+def upgrade():
+    op.add_column('methodical_docs',
+                  sa.Column('data_hash', sa.String(length=64), nullable=True))
+    op.add_column('methodical_docs',
+                  sa.Column('data_size', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_methodical_docs_data_hash'), 'methodical_docs',
+                    ['data_hash'], unique=False)
+
+    # файлы переносятся по одному, чтобы не читать в память все сразу
+    connection = op.get_bind()
+    method_ids = connection.execute(
+        sa.select(methodical_docs.c.method_id)
+        .where(methodical_docs.c.data.isnot(None))
+    ).scalars().all()
+    for method_id in method_ids:
+        data = connection.execute(
+            sa.select(methodical_docs.c.data)
+            .where(methodical_docs.c.method_id == method_id)
+        ).scalar()
+        data_hash, data_size = method_docs_storage.save(BytesIO(data))
+        connection.execute(
+            methodical_docs.update()
+            .where(methodical_docs.c.method_id == method_id)
+            .values(data_hash=data_hash, data_size=data_size)
+        )
+
+    op.drop_column('methodical_docs', 'data')
+
+
+def downgrade():
+    op.add_column('methodical_docs',
+                  sa.Column('data', sa.LargeBinary(), nullable=True))
+
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(methodical_docs.c.method_id, methodical_docs.c.data_hash)
+        .where(methodical_docs.c.data_hash.isnot(None))
+    ).all()
+    for method_id, data_hash in rows:
+        with open(method_docs_storage.get_path(data_hash), 'rb') as file:
+            connection.execute(
+                methodical_docs.update()
+                .where(methodical_docs.c.method_id == method_id)
+                .values(data=file.read())
+            )
+
+    op.drop_index(op.f('ix_methodical_docs_data_hash'),
+                  table_name='methodical_docs')
+    op.drop_column('methodical_docs', 'data_size')
+    op.drop_column('methodical_docs', 'data_hash')
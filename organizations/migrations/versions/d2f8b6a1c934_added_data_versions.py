@@ -0,0 +1,28 @@
+"""added data_versions
+
+Revision ID: d2f8b6a1c934
+Revises: c7e2a4f9b318
+Create Date: 2026-10-19 10:14:32.607215
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd2f8b6a1c934'
+down_revision = 'c7e2a4f9b318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('date_updated', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('data_versions')
@@ -0,0 +1,54 @@
+"""keyset pagination indexes
+
+Revision ID: e6a2c9f1b843
+Revises: 9c4e1b7d2f05
+Create Date: 2026-10-18 19:05:21.734610
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e6a2c9f1b843'
+down_revision = '9c4e1b7d2f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # столбцы ключа keyset-пагинации не должны содержать NULL
+    op.execute('UPDATE organizations SET date_updated = date_added '
+               'WHERE date_updated IS NULL')
+    op.execute('UPDATE messages '
+               'SET datetime_created = COALESCE(datetime_updated, '
+               'CURRENT_TIMESTAMP) WHERE datetime_created IS NULL')
+    op.alter_column('organizations', 'date_updated',
+                    existing_type=sa.DateTime(),
+                    nullable=False)
+    op.alter_column('messages', 'datetime_created',
+                    existing_type=sa.DateTime(),
+                    nullable=False)
+    op.create_index('ix_organizations_date_updated_full_name_org_id',
+                    'organizations',
+                    [sa.text('date_updated DESC'), 'full_name', 'org_id'],
+                    unique=False)
+    op.create_index('ix_messages_datetime_created_message_id', 'messages',
+                    ['datetime_created', 'message_id'], unique=False)
+    op.create_index('ix_responsibilities_with_certs_date_start_resp_id',
+                    'responsibilities_with_certs',
+                    ['date_start', 'resp_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_responsibilities_with_certs_date_start_resp_id',
+                  table_name='responsibilities_with_certs')
+    op.drop_index('ix_messages_datetime_created_message_id',
+                  table_name='messages')
+    op.drop_index('ix_organizations_date_updated_full_name_org_id',
+                  table_name='organizations')
+    op.alter_column('messages', 'datetime_created',
+                    existing_type=sa.DateTime(),
+                    nullable=True)
+    op.alter_column('organizations', 'date_updated',
+                    existing_type=sa.DateTime(),
+                    nullable=True)
@@ -0,0 +1,31 @@
+"""xml imports ledger keyed by cert and file hash
+
+Revision ID: e8d4a2c6f1b9
+Revises: d2f8b6a1c934
+Create Date: 2026-10-19 14:22:48.531907
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e8d4a2c6f1b9'
+down_revision = 'd2f8b6a1c934'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index('ix_xml_imports_file_hash', table_name='xml_imports')
+    op.create_index('ix_xml_imports_cert_id_file_hash', 'xml_imports',
+                    ['cert_id', 'file_hash'], unique=False)
+    # в журнале теперь хранятся хеши сведений юр. лиц, а не отдельных
+    # тегов <ЕдЗО>: прежние хеши больше ни с чем не совпадут
+    op.execute('DELETE FROM xml_import_zones')
+
+
+def downgrade():
+    op.drop_index('ix_xml_imports_cert_id_file_hash',
+                  table_name='xml_imports')
+    op.create_index('ix_xml_imports_file_hash', 'xml_imports',
+                    ['file_hash'], unique=False)
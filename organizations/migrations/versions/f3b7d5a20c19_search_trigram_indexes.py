@@ -0,0 +1,40 @@
+"""search trigram indexes
+
+Revision ID: f3b7d5a20c19
+Revises: e6a2c9f1b843
+Create Date: 2026-10-18 20:11:47.092385
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f3b7d5a20c19'
+down_revision = 'e6a2c9f1b843'
+branch_labels = None
+depends_on = None
+
+SEARCH_COLUMNS = (
+    ('organizations', ('db_name', 'short_name', 'inn', 'kpp')),
+    ('messages', ('information', 'our_outbox_number',
+                  'number_inbox_approved')),
+)
+
+
+def upgrade():
+    # на SQLite индексы поиска (FTS5) создает команда flask search-index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, columns in SEARCH_COLUMNS:
+        for column in columns:
+            op.create_index(f'ix_{table}_{column}_trgm', table, [column],
+                            unique=False, postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, columns in SEARCH_COLUMNS:
+        for column in columns:
+            op.drop_index(f'ix_{table}_{column}_trgm', table_name=table)
@@ -4,16 +4,16 @@ from celery import Celery, Task
 from flask import Flask
 from flask_admin import Admin
 
-from .commands import index, parse
+from .commands import index, parse, regions, search_index
 from .config import DevConfig, ProdConfig, TestConfig
 from .extentions import db, babel, migrate
 from .models import (Cert, Organization, Message, MethodicalDoc, OrgAdmDoc,
-                     Resource, Responsibility)
+                     RegionAlias, Resource, Responsibility)
 from .utils import make_org_dirs
 from .views import (CertModelView, HomeView, MessageModelView,
                     MethodDocModelView, OrgAdmDocModelView,
-                    OrganizationModelView, ResourceModelView,
-                    ResponseModelView, WorkspaceView)
+                    OrganizationModelView, RegionAliasModelView,
+                    ResourceModelView, ResponseModelView, WorkspaceView)
 
 
 def init_admin(app: Flask) -> None:
@@ -44,6 +44,9 @@ def init_admin(app: Flask) -> None:
         MethodDocModelView(MethodicalDoc, db.session,
                            name='Методические '
                                 'материалы', endpoint='method-docs'),
+        RegionAliasModelView(RegionAlias, db.session,
+                             name='Регионы базы индексов',
+                             endpoint='region-aliases'),
         WorkspaceView(name='Поиск в ЕГРЮЛ', endpoint='workspace')]
     admin.add_views(*views_to_register)
 
@@ -88,6 +91,8 @@ def create_app() -> Flask:
     babel.init_app(app)
     app.cli.add_command(index)
     app.cli.add_command(parse)
+    app.cli.add_command(regions)
+    app.cli.add_command(search_index)
 
     @app.shell_context_processor
     def make_shell_context():
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from flask import current_app as app
+
+from ..data_versions import ORGS_DOCS_VERSION, get_data_version
+
+
+class ResponseCache:
+    """LRU-кеш тел ответов API в памяти процесса. Ключ записи содержит
+    версию данных, поэтому после изменения данных любым процессом
+    устаревшие записи не отдаются и со временем вытесняются. Количество
+    записей и их общий размер ограничены API_CACHE_MAX_ENTRIES
+    и API_CACHE_MAX_BYTES."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key: tuple, etag: str) -> Optional[tuple]:
+        """Возвращает (тело, mimetype, заголовки) ответа с ETag <etag>."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1:]
+
+    def set(self, key: tuple, etag: str, body: bytes, mimetype: str,
+            headers: dict) -> None:
+        settings = app.config['BUSINESS_LOGIC']
+        max_bytes = settings['API_CACHE_MAX_BYTES']
+        if not settings['API_CACHE_MAX_ENTRIES'] or len(body) > max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (etag, body, mimetype, headers)
+            self._size += len(body)
+            while (len(self._entries) > settings['API_CACHE_MAX_ENTRIES']
+                   or self._size > max_bytes):
+                self._pop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _pop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def cache_chunks(self, chunks: Iterable[bytes], key: tuple, etag: str,
+                     mimetype: str, headers: dict):
+        """Выдает части потокового ответа и, если ответ выдан целиком
+        и уместился в API_CACHE_MAX_BYTES, сохраняет его в кеш."""
+        max_bytes = app.config['BUSINESS_LOGIC']['API_CACHE_MAX_BYTES']
+        parts, size = [], 0
+        for chunk in chunks:
+            yield chunk
+            if parts is not None:
+                size += len(chunk)
+                if size > max_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+        if parts is not None:
+            self.set(key, etag, b''.join(parts), mimetype, headers)
+
+
+orgs_docs_cache = ResponseCache()
+
+
+def get_orgs_docs_version() -> Tuple[int, Optional[datetime]]:
+    """Возвращает версию организаций и их ОР документов и время
+    их последнего изменения (включая удаления). Версия общая для
+    всех процессов, поэтому ответы, закешированные процессом до
+    изменения, сделанного другим процессом, больше не отдаются."""
+    return get_data_version(ORGS_DOCS_VERSION)
+
+
+def get_last_modified(changed: Optional[datetime]) -> Optional[datetime]:
+    """Возвращает значение Last-Modified по времени изменения данных
+    <changed>. HTTP-дата точна до секунды, поэтому, пока не прошла
+    секунда с изменения, заголовок не отдается: иначе следующее
+    изменение в ту же секунду не изменило бы Last-Modified."""
+    if changed is None or datetime.today() - changed < timedelta(seconds=1):
+        return None
+    return changed
+
+
+def make_etag(key: tuple) -> str:
+    """Возвращает ETag ответа по ключу <key> (версия данных
+    и параметры запроса)."""
+    return hashlib.sha1(repr(key).encode()).hexdigest()
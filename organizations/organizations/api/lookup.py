@@ -0,0 +1,147 @@
+import re
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy import (Column, MetaData, String, Table, and_, bindparam,
+                        func, or_, select)
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from ..extentions import db
+from ..models import (Cert, OrgAdmDoc, OrgAdmDocOrganization, Organization,
+                      Resource, Responsibility)
+from ..serializers import RowSerializer
+
+INN_KEY_PATTERN = re.compile(r'\d{10}|\d{12}')
+KPP_KEY_PATTERN = re.compile(r'\d{9}')
+
+# Временная таблица ключей поиска (для СУБД без unnest)
+lookup_keys_table = Table(
+    'lookup_keys', MetaData(),
+    Column('inn', String(12), nullable=False),
+    Column('kpp', String(9)),
+    prefixes=['TEMPORARY']
+)
+
+lookup_orgs_serializer = RowSerializer(
+    (Organization.org_id, Organization.inn, Organization.kpp,
+     Organization.ogrn, Organization.full_name, Organization.short_name,
+     Organization.uuid),
+    fields=('inn', 'kpp', 'ogrn', 'full_name', 'short_name', 'uuid'))
+
+lookup_docs_serializer = RowSerializer(
+    (OrgAdmDocOrganization.org_id, OrgAdmDoc.name,
+     OrgAdmDocOrganization.props, OrgAdmDocOrganization.date_approved,
+     OrgAdmDocOrganization.comment),
+    fields=('name', 'props', 'date_approved', 'comment'))
+
+lookup_certs_serializer = RowSerializer(
+    (Resource.org_id, Cert.name.label('cert'),
+     Resource.name.label('resource'), Responsibility.date_start,
+     Responsibility.date_end),
+    fields=('cert', 'resource', 'date_start', 'date_end'))
+
+
+@contextmanager
+def lookup_source(keys: Sequence[tuple]):
+    """Возвращает выборку (inn, kpp) из ключей поиска <keys>.
+    В PostgreSQL ключи передаются массивами и разворачиваются unnest,
+    в остальных СУБД записываются во временную таблицу, которая
+    удаляется по выходе из контекста."""
+    inns = [inn for inn, kpp in keys]
+    kpps = [kpp for inn, kpp in keys]
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        yield func.unnest(
+            bindparam('lookup_inns', inns, type_=ARRAY(String)),
+            bindparam('lookup_kpps', kpps, type_=ARRAY(String))
+        ).table_valued('inn', 'kpp').alias('lookup_keys')
+        return
+    lookup_keys_table.create(connection)
+    try:
+        connection.execute(lookup_keys_table.insert(),
+                           [{"inn": inn, "kpp": kpp} for inn, kpp in keys])
+        yield lookup_keys_table
+    finally:
+        lookup_keys_table.drop(connection, checkfirst=True)
+
+
+def select_lookup_org_ids(lookup):
+    """Выборка идентификаторов организаций, совпавших с ключами <lookup>:
+    по ИНН и КПП, а если КПП в ключе не указан - только по ИНН."""
+    return (
+        select(Organization.org_id)
+        .join(lookup, and_(Organization.inn == lookup.c.inn,
+                           or_(lookup.c.kpp.is_(None),
+                               Organization.kpp == lookup.c.kpp)))
+    )
+
+
+def group_by_org(rows, serializer: RowSerializer) -> dict:
+    """Группирует строки по org_id (первый столбец выборки)."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[0], []).append(serializer.to_dict(row))
+    return groups
+
+
+def iter_lookup_results(keys: Sequence[tuple],
+                        batch_size: int) -> Iterator[dict]:
+    """Выдает найденные по ключам (ИНН, КПП) организации с их ОР
+    документами и центрами мониторинга, ответственными за их
+    ресурсы. Организации читаются из курсора БД пачками по
+    <batch_size>, документы и центры - одним запросом на пачку."""
+    with lookup_source(keys) as lookup:
+        orgs = db.session.execute(
+            select(*lookup_orgs_serializer.columns)
+            .where(Organization.org_id.in_(select_lookup_org_ids(lookup)))
+            .order_by(Organization.org_id)
+            .execution_options(stream_results=True)
+        )
+        for batch in orgs.partitions(batch_size):
+            org_ids = [row.org_id for row in batch]
+            docs = group_by_org(db.session.execute(
+                select(*lookup_docs_serializer.columns)
+                .join(OrgAdmDoc, OrgAdmDocOrganization.org_doc)
+                .where(OrgAdmDocOrganization.org_id.in_(org_ids))
+                .order_by(OrgAdmDocOrganization.org_id, OrgAdmDoc.name)
+            ), lookup_docs_serializer)
+            certs = group_by_org(db.session.execute(
+                select(*lookup_certs_serializer.columns)
+                .select_from(Responsibility)
+                .join(Responsibility.resource)
+                .join(Responsibility.cert)
+                .where(Resource.org_id.in_(org_ids), Resource.is_active)
+                .order_by(Resource.org_id, Cert.name, Resource.name)
+            ), lookup_certs_serializer)
+            for row in batch:
+                org = lookup_orgs_serializer.to_dict(row)
+                org["docs"] = docs.get(row.org_id, [])
+                org["certs"] = certs.get(row.org_id, [])
+                yield org
+
+
+def get_not_found_keys(keys: Sequence[tuple],
+                       found: Sequence[tuple]) -> list:
+    """Возвращает ключи (ИНН, КПП) из <keys>, для которых
+    не нашлось ни одной организации из <found>."""
+    found_pairs = set(found)
+    found_inns = {inn for inn, kpp in found}
+    return [(inn, kpp) for inn, kpp in keys
+            if (inn, kpp) not in found_pairs
+            and not (kpp is None and inn in found_inns)]
+
+
+def parse_lookup_key(item) -> Optional[tuple]:
+    """Возвращает ключ (ИНН, КПП) из элемента запроса
+    {"inn": ..., "kpp": ...} или None, если элемент некорректен:
+    ИНН и КПП принимаются только строками (в числе теряются ведущие
+    нули), ИНН - из 10 или 12 цифр, КПП - из 9 цифр или null."""
+    if not isinstance(item, dict):
+        return None
+    inn, kpp = item.get('inn'), item.get('kpp')
+    if not isinstance(inn, str) or not INN_KEY_PATTERN.fullmatch(inn):
+        return None
+    if kpp is not None and (not isinstance(kpp, str)
+                            or not KPP_KEY_PATTERN.fullmatch(kpp)):
+        return None
+    return inn, kpp
@@ -1,13 +1,20 @@
-import json
 import re
-from datetime import date, datetime
+from datetime import datetime
+from typing import Optional
 
 from flask import Blueprint, Response
 from flask import current_app as app
-from flask import request
+from flask import request, stream_with_context
 from sqlalchemy import func
+from werkzeug.http import is_resource_modified
 
+from ..keyset import (decode_keyset_cursor, encode_keyset_cursor,
+                      get_keyset_condition, get_keyset_order)
 from ..models import OrgAdmDocOrganization, Organization
+from ..serializers import RowSerializer, dumps
+from .cache import (get_last_modified, get_orgs_docs_version, make_etag,
+                    orgs_docs_cache)
+from .lookup import get_not_found_keys, iter_lookup_results, parse_lookup_key
 
 api = Blueprint('api', __name__, url_prefix='/api')
 db = app.extensions['db']
@@ -15,59 +22,227 @@ db = app.extensions['db']
 regions_pattern = re.compile(r'\b\d{1,2}\b')
 docs_pattern = re.compile(r'\b\d+\b')
 
+# Количество строк, которые читаются из курсора БД за раз
+API_YIELD_PER = 1000
 
-class JsonExtendEncoder(json.JSONEncoder):
+NDJSON_MIMETYPE = 'application/x-ndjson'
 
-    def default(self, obj):
-        """
-            provide a interface for datetime/date
-        """
-        if isinstance(obj, datetime):
-            return obj.strftime('%Y-%m-%d %H:%M:%S')
-        elif isinstance(obj, date):
-            return obj.strftime('%Y-%m-%d')
-        else:
-            return json.JSONEncoder.default(self, obj)
+# Ключ курсора списка организаций с документами
+ORGS_DOCS_KEY = [(Organization.full_name, False),
+                 (Organization.org_id, False),
+                 (OrgAdmDocOrganization.orgadm_id, False)]
+orgs_docs_serializer = RowSerializer(
+    (Organization.inn, Organization.kpp, Organization.full_name,
+     OrgAdmDocOrganization.props, OrgAdmDocOrganization.date_approved,
+     OrgAdmDocOrganization.comment, Organization.org_id,
+     OrgAdmDocOrganization.orgadm_id),
+    fields=('inn', 'kpp', 'full_name', 'props', 'date_approved', 'comment'))
+
+
+def is_true_arg(name: str) -> bool:
+    """Проверяет, что параметр запроса <name> включен."""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def get_limit_arg():
+    """Возвращает размер страницы из параметра limit, ограниченный
+    API_MAX_LIMIT, или None, если ответ нужен целиком."""
+    limit = request.args.get('limit', type=int)
+    if limit is None or limit < 1:
+        return None
+    return min(limit, app.config['BUSINESS_LOGIC']['API_MAX_LIMIT'])
+
+
+def error_response(message: str, status: int = 400,
+                   **details) -> Response:
+    return Response(response=dumps({"error": message, **details}),
+                    status=status, mimetype='application/json')
+
+
+def stream_json(rows, serializer: RowSerializer):
+    """Построчно выдает JSON-объект {"results": [...], "count": N}:
+    количество считается по ходу выдачи строк, без отдельного запроса."""
+    yield b'{"results":['
+    count = 0
+    for row in rows:
+        yield (b',' if count else b'') + serializer.dumps(row)
+        count += 1
+    yield b'],"count":%d}' % count
+
+
+def stream_ndjson(rows, serializer: RowSerializer):
+    """Выдает строки в формате NDJSON (по JSON-объекту в строке)."""
+    for row in rows:
+        yield serializer.dumps(row) + b'\n'
+
+
+def get_orgs_docs_params() -> dict:
+    """Возвращает нормализованные параметры запроса списка организаций
+    с документами: одинаковые по смыслу запросы дают одинаковые
+    параметры (и попадают в одну запись кеша)."""
+    regions = request.args.get('regions') or ''
+    docs = request.args.get('docs') or ''
+    return {
+        "regions": tuple(sorted({int(r) for r in
+                                 re.findall(regions_pattern, regions)})),
+        "docs": tuple(sorted({int(d) for d in
+                              re.findall(docs_pattern, docs)})),
+        "limit": get_limit_arg(),
+        "after": request.args.get('after') or None,
+        "ndjson": request.args.get('format') == 'ndjson',
+        "count": is_true_arg('count'),
+    }
+
+
+def set_validators(response: Response, etag: str,
+                   last_modified: Optional[datetime]) -> Response:
+    """Добавляет к ответу заголовки для условных запросов."""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
 
 
 @api.route('/organizations/with_docs/',
            methods=['GET', 'HEAD', 'OPTIONS'])
 def get_orgs_docs_by_region():
     """Возвращает информацию об организациях, расположенных в <region_id>
-    и имеющих документ <doc_id>."""
-    regions = request.args.get('regions')
-    docs = request.args.get('docs')
+    и имеющих документ <doc_id>.
+    Без параметра limit результат целиком выдается потоком из курсора
+    БД, с limit - страница и курсор следующей страницы next, который
+    передается в параметре after. Параметр count=1 добавляет к странице
+    общее количество строк, format=ndjson - выдача в формате NDJSON.
+    Ответ содержит ETag и Last-Modified по общей для всех процессов
+    версии данных: если данные не изменились, возвращается 304, иначе
+    тело ответа по возможности берется из кеша."""
+    params = get_orgs_docs_params()
+    version, changed = get_orgs_docs_version()
+    key = (version, *params.items())
+    last_modified = get_last_modified(changed)
+    etag = make_etag(key)
+    if not is_resource_modified(request.environ, etag=etag,
+                                last_modified=last_modified):
+        return set_validators(Response(status=304), etag, last_modified)
+
+    cached = orgs_docs_cache.get(key, etag)
+    if cached:
+        body, mimetype, headers = cached
+        return set_validators(
+            Response(response=body, mimetype=mimetype, headers=headers),
+            etag, last_modified)
 
     orgs = (
         db.session
-        .query(Organization.inn, Organization.kpp,
-               Organization.full_name, OrgAdmDocOrganization.props,
-               OrgAdmDocOrganization.date_approved,
-               OrgAdmDocOrganization.comment)
+        .query(*orgs_docs_serializer.columns)
         .join(OrgAdmDocOrganization, Organization.org_adm_doc)
     )
 
-    count = (
-        db.session
-        .query(func.count(Organization.org_id))
-        .join(OrgAdmDocOrganization, Organization.org_adm_doc)
-    )
+    if params["regions"]:
+        orgs = orgs.filter(Organization.region_id.in_(params["regions"]))
+
+    if params["docs"]:
+        orgs = orgs.filter(
+            OrgAdmDocOrganization.orgadm_id.in_(params["docs"]))
+
+    count_query = orgs.with_entities(func.count())
+
+    if params["after"]:
+        values = decode_keyset_cursor(params["after"], ORGS_DOCS_KEY)
+        if values is None:
+            return error_response('Некорректное значение параметра after')
+        orgs = orgs.filter(get_keyset_condition(ORGS_DOCS_KEY, values))
+    orgs = orgs.order_by(*get_keyset_order(ORGS_DOCS_KEY))
 
-    if regions and re.search(regions_pattern, regions):
-        regions = [int(r) for r in re.findall(regions_pattern, regions)]
-        orgs = orgs.filter(Organization.region_id.in_(regions))
-        count = count.filter(Organization.region_id.in_(regions))
+    mimetype = NDJSON_MIMETYPE if params["ndjson"] else 'application/json'
+    limit = params["limit"]
+    if limit is None:
+        rows = orgs.yield_per(API_YIELD_PER)
+        stream = stream_ndjson if params["ndjson"] else stream_json
+        chunks = orgs_docs_cache.cache_chunks(
+            stream(rows, orgs_docs_serializer), key, etag, mimetype, {})
+        return set_validators(
+            Response(stream_with_context(chunks), mimetype=mimetype),
+            etag, last_modified)
 
-    if docs and re.search(docs_pattern, docs):
-        search_docs = re.findall(docs_pattern, docs)
-        orgs = orgs.filter(OrgAdmDocOrganization.orgadm_id.in_(search_docs))
-        count = count.filter(OrgAdmDocOrganization.orgadm_id.in_(search_docs))
+    rows = orgs.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_keyset_cursor(
+            [last.full_name, last.org_id, last.orgadm_id])
 
-    count = count.scalar()
-    orgs = orgs.order_by(Organization.full_name).all()
+    headers = {}
+    if params["ndjson"]:
+        body = b''.join(stream_ndjson(rows, orgs_docs_serializer))
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+    else:
+        page = {"results": [orgs_docs_serializer.to_dict(row)
+                            for row in rows],
+                "next": next_cursor}
+        if params["count"]:
+            page["count"] = count_query.scalar()
+        body = dumps(page)
+    orgs_docs_cache.set(key, etag, body, mimetype, headers)
+    return set_validators(
+        Response(response=body, mimetype=mimetype, headers=headers),
+        etag, last_modified)
+
+
+def stream_lookup_json(orgs, keys):
+    """Построчно выдает JSON-объект {"results": [...], "not_found": [...],
+    "count": N}; ненайденные ключи определяются по выданным строкам."""
+    yield b'{"results":['
+    found = []
+    for org in orgs:
+        yield (b',' if found else b'') + dumps(org)
+        found.append((org["inn"], org["kpp"]))
+    not_found = [{"inn": inn, "kpp": kpp}
+                 for inn, kpp in get_not_found_keys(keys, found)]
+    yield b'],"not_found":' + dumps(not_found)
+    yield b',"count":%d}' % len(found)
+
+
+def stream_lookup_ndjson(orgs):
+    for org in orgs:
+        yield dumps(org) + b'\n'
+
+
+@api.route('/organizations/lookup', methods=['POST'])
+def lookup_orgs():
+    """Возвращает организации по списку ИНН/КПП из тела запроса
+    {"organizations": [{"inn": ..., "kpp": ...}, ...]} (КПП можно
+    не указывать) вместе с их ОР документами и центрами мониторинга,
+    ответственными за их ресурсы. Список сопоставляется с организациями
+    одним запросом, результат выдается потоком; format=ndjson - выдача
+    в формате NDJSON (без списка ненайденных ключей)."""
+    data = request.get_json(silent=True)
+    items = data.get('organizations') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return error_response(
+            'Тело запроса должно содержать непустой список organizations')
+    max_items = app.config['BUSINESS_LOGIC']['API_LOOKUP_MAX_ITEMS']
+    if len(items) > max_items:
+        return error_response(
+            f'Количество организаций в запросе больше {max_items}', 413)
+    keys, invalid = [], []
+    for number, item in enumerate(items):
+        key = parse_lookup_key(item)
+        if key is None:
+            invalid.append(number)
+        else:
+            keys.append(key)
+    if invalid:
+        return error_response(
+            'Некорректные ИНН/КПП: ИНН - строка из 10 или 12 цифр, '
+            'КПП - строка из 9 цифр', invalid=invalid)
+    keys = list(dict.fromkeys(keys))
 
-    response = json.dumps({"count": count,
-                           "results": [dict(org) for org in orgs]},
-                          cls=JsonExtendEncoder)
-    return Response(response=response,
+    orgs = iter_lookup_results(keys, API_YIELD_PER)
+    if request.args.get('format') == 'ndjson':
+        return Response(stream_with_context(stream_lookup_ndjson(orgs)),
+                        mimetype=NDJSON_MIMETYPE)
+    return Response(stream_with_context(stream_lookup_json(orgs, keys)),
                     mimetype='application/json')
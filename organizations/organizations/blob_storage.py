@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Tuple
+
+from flask import Response
+from flask import current_app as app
+from flask import request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.utils import send_file as send_file_with_headers
+
+# Поддиректория хранилища с файлами
+BLOBS_DIR = 'blobs'
+# Размер части файла, которая читается и хешируется за раз
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStorage:
+    """Файловое хранилище с адресацией по содержимому. Файл хранится
+    в <директория из настройки root_setting>/blobs/<xx>/<sha256>, где
+    xx - первые два символа хеша; одинаковые файлы хранятся один раз.
+    В БД остаются только хеш и размер файла."""
+
+    def __init__(self, root_setting: str, accel_setting: str) -> None:
+        self.root_setting = root_setting
+        self.accel_setting = accel_setting
+
+    @property
+    def root(self) -> str:
+        return os.path.join(
+            app.config['BUSINESS_LOGIC'][self.root_setting], BLOBS_DIR)
+
+    @staticmethod
+    def get_relative_path(data_hash: str) -> str:
+        return f'{data_hash[:2]}/{data_hash}'
+
+    def get_path(self, data_hash: str) -> str:
+        return os.path.join(self.root, self.get_relative_path(data_hash))
+
+    def save(self, stream: BinaryIO) -> Tuple[str, int]:
+        """Записывает содержимое <stream> в хранилище частями, считая
+        хеш по ходу записи, и возвращает (sha256, размер). Если такой
+        файл уже есть, новая копия не сохраняется."""
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.upload-', dir=self.root)
+        try:
+            sha256 = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in iter(lambda: stream.read(BLOB_CHUNK_SIZE), b''):
+                    sha256.update(chunk)
+                    file.write(chunk)
+                    size += len(chunk)
+            data_hash = sha256.hexdigest()
+            path = self.get_path(data_hash)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return data_hash, size
+
+    def delete(self, data_hash: str) -> None:
+        try:
+            os.remove(self.get_path(data_hash))
+        except FileNotFoundError:
+            pass
+
+    def send(self, data_hash: str, file_name: str) -> Response:
+        """Возвращает ответ с файлом <data_hash> под именем <file_name>.
+        Если задан префикс внутреннего location nginx (настройка
+        accel_setting), файл отдает nginx по X-Accel-Redirect, иначе
+        он отдается с диска send_file (через wsgi.file_wrapper, то есть
+        sendfile, или X-Sendfile при USE_X_SENDFILE)."""
+        path = self.get_path(data_hash)
+        if not os.path.isfile(path):
+            raise NotFound()
+        accel_prefix = app.config['BUSINESS_LOGIC'][self.accel_setting]
+        if not accel_prefix:
+            return send_file(path, attachment_filename=file_name,
+                             as_attachment=True)
+        response = send_file_with_headers(
+            path, request.environ, as_attachment=True,
+            download_name=file_name, use_x_sendfile=True,
+            response_class=app.response_class)
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = (
+            accel_prefix.rstrip('/') + '/'
+            + self.get_relative_path(data_hash))
+        return response
+
+
+method_docs_storage = BlobStorage('METHOD_DOCS_PATH',
+                                  'METHOD_DOCS_ACCEL_REDIRECT')
@@ -0,0 +1,38 @@
+from typing import Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .extentions import db
+from .utils import chunked
+
+# Количество строк в одном многострочном INSERT
+BULK_CHUNK_SIZE = 500
+
+
+def get_table(model_or_table):
+    """Возвращает таблицу модели или саму таблицу."""
+    return getattr(model_or_table, '__table__', model_or_table)
+
+
+def insert_rows(model_or_table, rows: Iterable[dict],
+                ignore_conflicts: bool = False) -> int:
+    """Вставляет строки <rows> многострочными INSERT.
+    При <ignore_conflicts> строки, нарушающие уникальность, пропускаются:
+    на PostgreSQL и SQLite используется ON CONFLICT DO NOTHING,
+    на прочих СУБД выполняется обычный INSERT.
+    Возвращает количество переданных строк."""
+
+    table = get_table(model_or_table)
+    stmt = insert(table)
+    if ignore_conflicts:
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            stmt = postgresql.insert(table).on_conflict_do_nothing()
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(table).on_conflict_do_nothing()
+    count = 0
+    for chunk in chunked(rows, BULK_CHUNK_SIZE):
+        db.session.execute(stmt, chunk)
+        count += len(chunk)
+    return count
@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import List, Tuple
+
+from flask import current_app as app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import Industry, Okrug, OrgAdmDoc, Region
+from .utils import get_instance_choices
+
+# Справочники, из которых строятся опции динамических фильтров
+REFERENCE_MODELS = (Industry, Okrug, OrgAdmDoc, Region)
+
+_lock = threading.Lock()
+_version = 0
+_choices = {}
+
+
+def get_choices_version() -> tuple:
+    """Возвращает версию справочников. Версия меняется после фиксации
+    транзакции, изменившей справочник в текущем процессе, а также
+    по истечении FILTERS_CACHE_TTL сек. - чтобы подхватывались
+    изменения, сделанные другими процессами."""
+    ttl = app.config['BUSINESS_LOGIC']['FILTERS_CACHE_TTL']
+    if ttl <= 0:
+        return _version, time.monotonic()
+    return _version, int(time.monotonic() // ttl)
+
+
+def get_cached_instance_choices(model, _id: str = "id", _name: str = "name",
+                                _name_limiter: int = None
+                                ) -> List[Tuple[int, str]]:
+    """Кеширующая версия get_instance_choices: опции справочника
+    запрашиваются из БД не чаще одного раза на версию справочников."""
+    version = get_choices_version()
+    key = (model, _id, _name, _name_limiter)
+    with _lock:
+        cached = _choices.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+    choices = get_instance_choices(model, _id, _name, _name_limiter)
+    with _lock:
+        _choices[key] = (version, choices)
+    return choices
+
+
+def mark_reference_changed(mapper, connection, target) -> None:
+    """Отмечает в сессии, что справочник изменен. Отметка остается
+    и после отката транзакции: лишний сброс кеша безопасен."""
+    Session.object_session(target).info['reference_changed'] = True
+
+
+def bump_choices_version(session) -> None:
+    """Сбрасывает кеш после фиксации изменений справочников.
+    Версия меняется после COMMIT, а не при flush, чтобы другой поток
+    не закешировал под новой версией еще не зафиксированные данные."""
+    global _version
+    if session.info.pop('reference_changed', False):
+        with _lock:
+            _version += 1
+            _choices.clear()
+
+
+for _model in REFERENCE_MODELS:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, mark_reference_changed)
+event.listen(Session, 'after_commit', bump_choices_version)
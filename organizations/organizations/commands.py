@@ -2,12 +2,26 @@ import click
 from flask.cli import with_appcontext
 
 from .pindex_to_db import fill_db_with_addresses_delta, find_db_indexes
+from .resource_regions import REGIONS_BATCH_SIZE, rebuild_resources_regions
+from .search import create_search_indexes
 from .utils import get_cur_time
 from .xml_parser import XMLHandler
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
 
+def echo_unmapped_regions(unmapped: dict) -> None:
+    """Выводит названия регионов, которым не удалось сопоставить
+    регион РФ, и количество пропущенных из-за этого строк."""
+    if not unmapped:
+        return
+    click.echo("Не удалось определить регион, строки пропущены. "
+               "Добавьте сопоставления в раздел "
+               "\"Регионы базы индексов\":")
+    for name, count in sorted(unmapped.items(), key=lambda item: -item[1]):
+        click.echo(f"  {name or '<пусто>'}: {count}")
+
+
 @click.group(context_settings=CONTEXT_SETTINGS)
 @click.option("-f", "--file-name", "path_to_file", required=True,
               type=click.Path(exists=True),
@@ -30,8 +44,12 @@ def check(ctx):
     """Определяет разницу между индексами из БД и <file-name>."""
 
     file_name = ctx.obj.get('FILE_NAME')
-    new_indexes = find_db_indexes(file_name)
-    click.echo(f"Количество новых индексов: {len(new_indexes)}")
+    result = find_db_indexes(file_name)
+    click.echo(f"Количество новых индексов: {result['new']}")
+    click.echo(f"Количество измененных адресов: {result['changed']}")
+    click.echo(f"Пропущено строк с некорректным индексом: "
+               f"{result['skipped']}")
+    echo_unmapped_regions(result['unmapped'])
 
 
 @index.command()
@@ -43,7 +61,12 @@ def update(ctx):
     """Обновляет БД новыми адресами из <file-name>."""
 
     file_name = ctx.obj.get('FILE_NAME')
-    fill_db_with_addresses_delta(file_name)
+    result = fill_db_with_addresses_delta(file_name)
+    click.echo(f"Добавлено адресов: {result['new']}")
+    click.echo(f"Обновлено адресов: {result['changed']}")
+    click.echo(f"Пропущено строк с некорректным индексом: "
+               f"{result['skipped']}")
+    echo_unmapped_regions(result['unmapped'])
     click.echo("Успех")
 
 
@@ -54,16 +77,63 @@ def update(ctx):
 @click.option("-f", "--file", "file", required=True,
               type=click.Path(exists=True),
               help="Путь до файла с файлом.")
+@click.option("--stream", "stream", is_flag=True, default=False,
+              help="Потоковый режим для больших файлов.")
+@click.option("--chunk-size", "chunk_size", type=click.IntRange(min=1),
+              help="Количество тегов <ЕдЗО> в одной транзакции.")
+@click.option("--force", "force", is_flag=True, default=False,
+              help="Обработать файл и теги <ЕдЗО> целиком, даже если "
+                   "они не изменились с прошлой загрузки.")
+@click.option("--dry-run", "--diff", "dry_run", is_flag=True, default=False,
+              help="Режим проверки: обработать файл, вывести сводку "
+                   "изменений и отменить все изменения в БД.")
 @click.pass_context
 @with_appcontext
-def parse(ctx, schema, file):
+def parse(ctx, schema, file, stream, chunk_size, force, dry_run):
     """Парсит XML-файл."""
 
     cur_time = get_cur_time()
     log_file_name = f'{file}-{cur_time}.log'
     handler = XMLHandler(file=file, schema=schema, logger_name='xml_parser',
-                         logger_file=log_file_name)
-    if handler.handle():
+                         logger_file=log_file_name, stream=stream,
+                         chunk_size=chunk_size, force=force,
+                         dry_run=dry_run)
+    result = handler.handle()
+    if handler.skipped:
+        click.echo("Файл с таким же содержимым уже загружен")
+    elif dry_run:
+        click.echo("Режим проверки, изменения в БД не сохранены")
+        for line in handler.stats.report():
+            click.echo(line)
+    if result:
         click.echo("Успех")
     else:
         click.echo("Неудача. Смотри лог")
+
+
+@click.command("regions")
+@click.option("--batch-size", "batch_size", type=click.IntRange(min=1),
+              default=REGIONS_BATCH_SIZE, show_default=True,
+              help="Количество ресурсов в одной транзакции.")
+@click.option("--prune", "prune", is_flag=True, default=False,
+              help="Удалить регионы, не подтвержденные почтовыми "
+                   "индексами в адресах ресурса.")
+@with_appcontext
+def regions(batch_size, prune):
+    """Перестраивает регионы активных ресурсов по почтовым индексам
+    в их адресах."""
+
+    stats = rebuild_resources_regions(
+        batch_size=batch_size, prune=prune,
+        progress=lambda stats: click.echo(stats.report()))
+    click.echo(f"Готово за {stats.duration:.1f} сек.")
+
+
+@click.command("search-index")
+@with_appcontext
+def search_index():
+    """Создает индексы поиска организаций и писем: pg_trgm
+    на PostgreSQL, FTS5 на SQLite (с перестроением содержимого)."""
+
+    create_search_indexes()
+    click.echo("Успех")
@@ -32,13 +32,49 @@ class Config:
             os.path.join(METHOD_DOC_TEMPLATE_PATH, 'method.docx'),
         "EGRUL_SERVICE_URL": os.environ.get(
             'EGRUL_SERVICE_URL', 'http://localhost:28961/'),
+        "EGRUL_CONNECT_TIMEOUT": float(os.environ.get(
+            'EGRUL_CONNECT_TIMEOUT', 3.05)),
+        "EGRUL_READ_TIMEOUT": float(os.environ.get('EGRUL_READ_TIMEOUT', 10)),
+        "EGRUL_POOL_SIZE": int(os.environ.get('EGRUL_POOL_SIZE', 10)),
+        "EGRUL_MAX_WORKERS": int(os.environ.get('EGRUL_MAX_WORKERS', 8)),
+        "EGRUL_CACHE_PATH": os.environ.get(
+            'EGRUL_CACHE_PATH', os.path.join(BASE_DIR, 'egrul_cache.db')),
+        "EGRUL_CACHE_TTL": int(os.environ.get(
+            'EGRUL_CACHE_TTL', 7 * 24 * 60 * 60)),
+        "EGRUL_CACHE_NEGATIVE_TTL": int(os.environ.get(
+            'EGRUL_CACHE_NEGATIVE_TTL', 24 * 60 * 60)),
+        "EGRUL_CACHE_MAX_ENTRIES": int(os.environ.get(
+            'EGRUL_CACHE_MAX_ENTRIES', 100000)),
+        "EGRUL_CACHE_MEMORY_ENTRIES": int(os.environ.get(
+            'EGRUL_CACHE_MEMORY_ENTRIES', 1024)),
         "ORG_FILES_DIR": (os.environ.get('ORG_FILES_MOUNT_PATH')
                           or os.environ.get('ORG_FILES_PATH', '/tmp/')
                           ),
         "METHOD_DOCS_PATH": (os.environ.get('METHOD_DOCS_MOUNT_PATH')
                              or os.environ.get('METHOD_DOCS_PATH', '/tmp/')
                              ),
-        "XSD_SCHEMA_PATH": os.path.join(UPLOAD_PATH, 'CERT-ZONE-DATA-v-00.xsd')
+        "METHOD_DOCS_ACCEL_REDIRECT": os.environ.get(
+            'METHOD_DOCS_ACCEL_REDIRECT'),
+        "XSD_SCHEMA_PATH": os.path.join(UPLOAD_PATH,
+                                        'CERT-ZONE-DATA-v-00.xsd'),
+        "XML_STREAM_THRESHOLD": int(os.environ.get(
+            'XML_STREAM_THRESHOLD', 20 * 1024 * 1024)),
+        "XML_CHUNK_SIZE": int(os.environ.get('XML_CHUNK_SIZE', 500)),
+        "INDEX_RESOLVER_TTL": int(os.environ.get(
+            'INDEX_RESOLVER_TTL', 60 * 60)),
+        "FILTERS_CACHE_TTL": int(os.environ.get('FILTERS_CACHE_TTL', 5 * 60)),
+        "LIST_COUNT_CACHE_TTL": int(os.environ.get(
+            'LIST_COUNT_CACHE_TTL', 30)),
+        "LIST_COUNT_ESTIMATE_THRESHOLD": int(os.environ.get(
+            'LIST_COUNT_ESTIMATE_THRESHOLD', 100000)),
+        "LIST_COUNT_TIMEOUT": int(os.environ.get('LIST_COUNT_TIMEOUT', 2000)),
+        "API_MAX_LIMIT": int(os.environ.get('API_MAX_LIMIT', 1000)),
+        "API_CACHE_MAX_ENTRIES": int(os.environ.get(
+            'API_CACHE_MAX_ENTRIES', 256)),
+        "API_CACHE_MAX_BYTES": int(os.environ.get(
+            'API_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        "API_LOOKUP_MAX_ITEMS": int(os.environ.get(
+            'API_LOOKUP_MAX_ITEMS', 10000))
     }
 
     EMAIL = {
@@ -53,7 +89,7 @@ class Config:
     CELERY = {
         "broker_url": os.environ.get('CELERY_BROKER_URL',
                                      'pyamqp://localhost'),
-        "result_backend": None,
+        "result_backend": os.environ.get('CELERY_RESULT_BACKEND'),
         "task_ignore_result": True,
         "timezone": "Europe/Moscow",
         "beat_schedule":
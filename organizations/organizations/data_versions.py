@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .extentions import db
+from .models import Address, DataVersion, OrgAdmDocOrganization, Organization
+
+# Набор данных почтовых адресов (резолвер почтовых индексов)
+ADDRESSES_VERSION = 'addresses'
+# Набор данных организаций и их ОР документов (ответы API)
+ORGS_DOCS_VERSION = 'orgs_docs'
+
+# Модели и наборы данных, версия которых меняется при изменении модели
+MODEL_DATA_VERSIONS = {
+    Address: ADDRESSES_VERSION,
+    Organization: ORGS_DOCS_VERSION,
+    OrgAdmDocOrganization: ORGS_DOCS_VERSION,
+}
+
+
+def get_data_version(name: str) -> Tuple[int, Optional[datetime]]:
+    """Возвращает (номер версии, время изменения) набора данных <name>."""
+    row = db.session.execute(
+        select(DataVersion.version, DataVersion.date_updated)
+        .where(DataVersion.name == name)).first()
+    if row is None:
+        return 0, None
+    return tuple(row)
+
+
+def bump_data_version(connection, name: str) -> None:
+    """Увеличивает версию набора данных <name> в транзакции
+    соединения <connection>. Строка версии создается при первом
+    изменении набора."""
+    table = DataVersion.__table__
+    values = {'version': table.c.version + 1,
+              'date_updated': datetime.today()}
+    updated = connection.execute(
+        table.update().where(table.c.name == name).values(**values)
+    ).rowcount
+    if updated:
+        return
+    dialect = connection.dialect.name
+    insert = {'postgresql': postgresql.insert,
+              'sqlite': sqlite.insert}.get(dialect)
+    stmt = (insert(table).on_conflict_do_nothing() if insert
+            else table.insert())
+    connection.execute(stmt.values(name=name, version=0,
+                                   date_updated=datetime.today()))
+    connection.execute(
+        table.update().where(table.c.name == name).values(**values))
+
+
+def mark_data_changed(mapper, connection, target) -> None:
+    """Отмечает в сессии, какие наборы данных изменены."""
+    Session.object_session(target).info.setdefault(
+        'changed_data', set()).add(MODEL_DATA_VERSIONS[mapper.class_])
+
+
+def bump_changed_data_versions(session, flush_context) -> None:
+    """Увеличивает версии наборов данных, измененных при flush:
+    один раз на flush, в той же транзакции, что и изменения."""
+    for name in sorted(session.info.pop('changed_data', ())):
+        bump_data_version(session.connection(), name)
+
+
+for _model in MODEL_DATA_VERSIONS:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, mark_data_changed)
+event.listen(Session, 'after_flush', bump_changed_data_versions)
@@ -0,0 +1,135 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import requests
+from flask import current_app as app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .egrul_cache import MISSING, EgrulCache
+from .extentions import db
+from .models import Organization, Region
+from .utils import (check_response, check_retrieve_response,
+                    convert_from_json_to_dict)
+
+SEARCH_URL = 'api/organizations/'
+
+
+class EgrulClient:
+    """Клиент EGRUL-сервиса. Переиспользует keep-alive соединения
+    из пула и ограничивает время ожидания ответа."""
+
+    def __init__(self, base_url: str, timeout: tuple = (3.05, 10),
+                 pool_size: int = 10, max_workers: int = 8,
+                 retries: int = 2, cache: EgrulCache = None,
+                 logger: str = __name__) -> None:
+        self.base_url = base_url
+        self.cache = cache
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.logger = logging.getLogger(logger)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=retries, backoff_factor=0.5,
+                              status_forcelist=(502, 503, 504)))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get_url(self, url_to_go: str) -> str:
+        """Создает абсолютный путь адреса EGRUL-сервиса."""
+        return self.base_url + url_to_go.lstrip('/')
+
+    def get(self, url: str, params: dict = None) -> dict:
+        """Выполняет GET-запрос и возвращает ответ в виде словаря.
+        Если ответ уже есть в кеше, запрос не выполняется."""
+        key = None
+        if self.cache:
+            key = self.cache.make_key(url, params)
+            cached = self.cache.get(key)
+            if cached is not MISSING:
+                self.logger.info(f'Ответ на запрос {key} найден в кеше')
+                return cached
+        self.logger.info(f'Отправляю запрос на {url} с параметрами {params}')
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        result = convert_from_json_to_dict(response)
+        if key and response.ok and isinstance(result, dict):
+            self.cache.set(key, result)
+        return result
+
+    def search(self, params: dict, url: str = None) -> dict:
+        """Возвращает результаты поиска организаций в ЕГРЮЛ."""
+        return self.get(url or self.get_url(SEARCH_URL), params=params)
+
+    def retrieve(self, relative_addr: str) -> dict:
+        """Возвращает сведения об организации из ЕГРЮЛ."""
+        response = self.get(self.get_url(relative_addr))
+        return check_retrieve_response(response)
+
+    def find_org(self, inn: str) -> Optional[dict]:
+        """Возвращает сведения о головной организации по ИНН или None."""
+        response = self.search({"inn": inn, "is_main": True})
+        if not response:
+            return None
+        orgs = check_response(response)
+        if not orgs:
+            return None
+        return self.retrieve(orgs[0]['relative_addr'])
+
+    def find_orgs(self, inns: Iterable[str],
+                  logger: logging.Logger = None) -> dict:
+        """Параллельно ищет в ЕГРЮЛ организации по списку ИНН.
+        Возвращает словарь вида {inn: сведения об организации или None}."""
+        flask_app = app._get_current_object()
+        logger = logger or self.logger
+
+        def find(inn: str) -> Optional[dict]:
+            with flask_app.app_context():
+                try:
+                    return self.find_org(inn)
+                except requests.exceptions.RequestException:
+                    logger.warning(f'ЕГРЮЛ недоступен (ИНН {inn})')
+                    return None
+
+        inns = list(inns)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(inns, executor.map(find, inns)))
+
+
+def get_egrul_client() -> EgrulClient:
+    """Возвращает клиент EGRUL-сервиса текущего процесса."""
+    client = app.extensions.get('egrul')
+    if client is None:
+        settings = app.config['BUSINESS_LOGIC']
+        cache = None
+        if settings['EGRUL_CACHE_TTL'] > 0:
+            cache = EgrulCache(
+                path=settings['EGRUL_CACHE_PATH'] or None,
+                ttl=settings['EGRUL_CACHE_TTL'],
+                negative_ttl=settings['EGRUL_CACHE_NEGATIVE_TTL'],
+                max_entries=settings['EGRUL_CACHE_MAX_ENTRIES'],
+                memory_entries=settings['EGRUL_CACHE_MEMORY_ENTRIES'])
+        client = EgrulClient(
+            base_url=settings['EGRUL_SERVICE_URL'],
+            timeout=(settings['EGRUL_CONNECT_TIMEOUT'],
+                     settings['EGRUL_READ_TIMEOUT']),
+            pool_size=settings['EGRUL_POOL_SIZE'],
+            max_workers=settings['EGRUL_MAX_WORKERS'],
+            cache=cache)
+        app.extensions['egrul'] = client
+    return client
+
+
+def create_org_from_egrul(response: dict) -> Organization:
+    """Возвращает новый объект организации из сведений ЕГРЮЛ."""
+    return Organization(
+        inn=response['inn'],
+        kpp=response['kpp'],
+        ogrn=response['ogrn'],
+        full_name=response['full_name'],
+        short_name=response.get("short_name") or response["full_name"],
+        factual_address=response['factual_address'],
+        region=db.session.query(Region).get(response['region_code'])
+    )
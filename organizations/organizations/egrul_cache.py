@@ -0,0 +1,151 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Optional
+from urllib.parse import urlencode
+
+MISSING = object()
+
+# Вытеснение лишних ответов из файла выполняется раз в столько записей
+EVICT_EVERY_INSERTS = 100
+# Время последнего обращения к ответу в файле обновляется, только если
+# оно старше такой доли срока хранения: чтение почти всегда обходится
+# без записи в файл
+ACCESSED_UPDATE_FRACTION = 0.1
+
+
+class EgrulCache:
+    """Кеш ответов EGRUL-сервиса. Хранит ответы в SQLite-файле <path>
+    (если он задан) и, дополнительно, в памяти процесса.
+    Пустые результаты поиска (организация не найдена) тоже кешируются,
+    но на меньший срок. Смена даты актуальности сведений ЕГРЮЛ (date_info)
+    сбрасывает все ранее сохраненные ответы."""
+
+    def __init__(self, path: Optional[str], ttl: int,
+                 negative_ttl: int, max_entries: int,
+                 memory_entries: int = 0) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.date_info = None
+        self.inserts = 0
+        self.lock = threading.Lock()
+        if self.path:
+            self.init_db()
+
+    @staticmethod
+    def make_key(url: str, params: dict = None) -> str:
+        """Возвращает ключ кеша из адреса запроса и его параметров."""
+        if not params:
+            return url
+        return f'{url}?{urlencode(sorted(params.items()))}'
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def init_db(self) -> None:
+        with closing(self.connect()) as conn, conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS egrul_cache ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                         'date_info TEXT, expires REAL NOT NULL, '
+                         'accessed REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_egrul_cache_accessed'
+                         ' ON egrul_cache (accessed)')
+            conn.execute('CREATE TABLE IF NOT EXISTS egrul_cache_meta ('
+                         'name TEXT PRIMARY KEY, value TEXT)')
+            row = conn.execute("SELECT value FROM egrul_cache_meta"
+                               " WHERE name = 'date_info'").fetchone()
+            self.date_info = row[0] if row else None
+
+    def get(self, key: str):
+        """Возвращает сохраненный ответ или MISSING."""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self.memory.move_to_end(key)
+                    return value
+                del self.memory[key]
+        if not self.path:
+            return MISSING
+        with closing(self.connect()) as conn, conn:
+            row = conn.execute('SELECT value, expires, accessed'
+                               ' FROM egrul_cache WHERE key = ?',
+                               (key,)).fetchone()
+            if row is None:
+                return MISSING
+            if row[1] <= now:
+                conn.execute('DELETE FROM egrul_cache WHERE key = ?', (key,))
+                return MISSING
+            if now - row[2] > self.ttl * ACCESSED_UPDATE_FRACTION:
+                conn.execute('UPDATE egrul_cache SET accessed = ?'
+                             ' WHERE key = ?', (now, key))
+        value = json.loads(row[0])
+        self.remember(key, value, row[1])
+        return value
+
+    def set(self, key: str, value: dict) -> None:
+        """Сохраняет ответ EGRUL-сервиса."""
+        date_info = value.get('date_info')
+        if date_info and date_info != self.date_info:
+            self.invalidate(date_info)
+        ttl = self.ttl
+        if value.get('results') == []:
+            ttl = self.negative_ttl
+        now = time.time()
+        expires = now + ttl
+        self.remember(key, value, expires)
+        if not self.path:
+            return
+        with closing(self.connect()) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO egrul_cache'
+                         ' VALUES (?, ?, ?, ?, ?)',
+                         (key, json.dumps(value, ensure_ascii=False),
+                          self.date_info, expires, now))
+        with self.lock:
+            self.inserts += 1
+            if self.inserts % EVICT_EVERY_INSERTS:
+                return
+        self.evict()
+
+    def evict(self) -> None:
+        """Удаляет из файла давно не запрошенные ответы сверх
+        max_entries. Вызывается раз в EVICT_EVERY_INSERTS записей,
+        поэтому между вызовами ответов может быть больше max_entries."""
+        with closing(self.connect()) as conn, conn:
+            conn.execute('DELETE FROM egrul_cache WHERE key IN ('
+                         'SELECT key FROM egrul_cache ORDER BY accessed'
+                         ' LIMIT max(0, (SELECT COUNT(*) FROM egrul_cache)'
+                         ' - ?))', (self.max_entries,))
+
+    def remember(self, key: str, value: dict, expires: float) -> None:
+        """Сохраняет ответ в памяти процесса."""
+        if not self.memory_entries:
+            return
+        with self.lock:
+            self.memory[key] = (value, expires)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def invalidate(self, date_info: str) -> None:
+        """Сбрасывает ответы, полученные до обновления сведений ЕГРЮЛ."""
+        with self.lock:
+            self.memory.clear()
+            self.date_info = date_info
+        if not self.path:
+            return
+        with closing(self.connect()) as conn, conn:
+            conn.execute('DELETE FROM egrul_cache'
+                         ' WHERE date_info IS NULL OR date_info != ?',
+                         (date_info,))
+            conn.execute('INSERT OR REPLACE INTO egrul_cache_meta'
+                         " VALUES ('date_info', ?)", (date_info,))
@@ -1,10 +1,10 @@
 from flask_admin.babel import lazy_gettext
 from flask_admin.contrib.sqla import filters
-from sqlalchemy import func
+from sqlalchemy import exists, func, select
 
-from .extentions import db
-from .models import (Industry, Message, MethodicalDoc, OrgAdmDocOrganization,
-                     Organization, Region, Resource, Responsibility)
+from .models import (Industry, Message, OrgAdmDocOrganization, Organization,
+                     Region, Resource, Responsibility,
+                     regions_resources_table)
 
 OPTIONS = [('да', 'Да'), ('нет', 'Нет')]
 
@@ -49,14 +49,8 @@ class OrgOkrugFilter(filters.FilterInList):
     расположенных в округах, id которых переданы."""
 
     def apply(self, query, value, alias=None):
-        org_ids = (
-            db.session
-            .query(Organization.org_id.distinct())
-            .join(Region, Organization.region_id == Region.region_id)
-            .filter(Region.okrug_id.in_(value))
-        )
-
-        return query.filter(Organization.org_id.in_(org_ids))
+        return query.filter(
+            Organization.region.has(Region.okrug_id.in_(value)))
 
 
 class OrgOkrugNotFilter(filters.FilterNotInList):
@@ -64,14 +58,8 @@ class OrgOkrugNotFilter(filters.FilterNotInList):
     расположенных не в округах, id которых переданы."""
 
     def apply(self, query, value, alias=None):
-        org_ids = (
-            db.session
-            .query(Organization.org_id.distinct())
-            .join(Region, Organization.region_id == Region.region_id)
-            .filter(~Region.okrug_id.in_(value))
-        )
-
-        return query.filter(Organization.org_id.in_(org_ids))
+        return query.filter(
+            Organization.region.has(~Region.okrug_id.in_(value)))
 
     def operation(self):
         return lazy_gettext('не в списке')
@@ -82,10 +70,8 @@ class OrgDocumentsFilter(filters.FilterInList):
     есть организационно-распорядительные документы (любой из списка)."""
 
     def apply(self, query, value, alias=None):
-        return (query
-                .join(OrgAdmDocOrganization, Organization.org_adm_doc)
-                .filter(OrgAdmDocOrganization.orgadm_id.in_(value))
-                )
+        return query.filter(Organization.org_adm_doc.any(
+            OrgAdmDocOrganization.orgadm_id.in_(value)))
 
     def operation(self):
         return lazy_gettext('в списке (логическое ИЛИ)')
@@ -96,16 +82,14 @@ class OrgDocumentsAndFilter(filters.FilterInList):
     есть организационно-распорядительные документы (каждый из списка)."""
 
     def apply(self, query, value, alias=None):
-        subquery = (
-            db.session.query(Organization.org_id)
-            .join(OrgAdmDocOrganization, Organization.org_adm_doc)
-            .filter(OrgAdmDocOrganization.orgadm_id.in_(value))
-            .group_by(Organization.org_id)
-            .having(func.count(OrgAdmDocOrganization.orgadm_id) == len(value))
-            .all()
+        org_ids = (
+            select(OrgAdmDocOrganization.org_id)
+            .where(OrgAdmDocOrganization.orgadm_id.in_(value))
+            .group_by(OrgAdmDocOrganization.org_id)
+            .having(func.count(OrgAdmDocOrganization.orgadm_id.distinct())
+                    == len(set(value)))
         )
-        subquery_list_results = [org_id[0] for org_id in subquery]
-        return query.filter(Organization.org_id.in_(subquery_list_results))
+        return query.filter(Organization.org_id.in_(org_ids))
 
     def operation(self):
         return lazy_gettext('в списке (логическое И)')
@@ -116,15 +100,10 @@ class OrgIsSubjectKIIFilter(filters.BaseSQLAFilter):
     чьи ресурсы являются объектами КИИ."""
 
     def apply(self, query, value, alias=None):
-        subjects_kii_ids = (
-            db.session
-            .query(Organization.org_id.distinct())
-            .join(Resource, Organization.resources)
-            .filter(Resource.is_okii.is_(True))
-        )
+        is_subject_kii = Organization.resources.any(Resource.is_okii.is_(True))
         if value == "да":
-            return query.filter(Organization.org_id.in_(subjects_kii_ids))
-        return query.filter(Organization.org_id.not_in(subjects_kii_ids))
+            return query.filter(is_subject_kii)
+        return query.filter(~is_subject_kii)
 
     def operation(self):
         return lazy_gettext('?')
@@ -135,35 +114,21 @@ class OrgIsSubjectKIIFilter(filters.BaseSQLAFilter):
 
 class ResourceRegionFilter(filters.FilterInList):
     def apply(self, query, value, alias=None):
-        resource_ids = (
-            db.session
-            .query(Resource.resource_id.distinct())
-            .join(Region, Resource.regions)
-            .filter(Region.region_id.in_(value))
-        )
-        return query.filter(Resource.resource_id.in_(resource_ids))
+        return query.filter(exists().where(
+            regions_resources_table.c.resource_id == Resource.resource_id,
+            regions_resources_table.c.region_id.in_(value)))
 
 
 class ResourceIndustryFilter(filters.FilterInList):
     def apply(self, query, value, alias=None):
-        resource_ids = (
-            db.session
-            .query(Resource.resource_id.distinct())
-            .join(Industry, Resource.industries)
-            .filter(Industry.industry_id.in_(value))
-        )
-        return query.filter(Resource.resource_id.in_(resource_ids))
+        return query.filter(
+            Resource.industries.any(Industry.industry_id.in_(value)))
 
 
 class ResourceOkrugFilter(filters.FilterInList):
     def apply(self, query, value, alias=None):
-        resource_ids = (
-            db.session
-            .query(Resource.resource_id.distinct())
-            .join(Region, Resource.regions)
-            .filter(Region.okrug_id.in_(value))
-        )
-        return query.filter(Resource.resource_id.in_(resource_ids))
+        return query.filter(
+            Resource.regions.any(Region.okrug_id.in_(value)))
 
 
 class MessageIsMethodDoc(filters.BaseSQLAFilter):
@@ -171,17 +136,10 @@ class MessageIsMethodDoc(filters.BaseSQLAFilter):
     методические документы."""
 
     def apply(self, query, value, alias=None):
-        subquery_methods = db.session.query(MethodicalDoc.method_id)
-        subquery_messages = (db.session
-                             .query(Message.message_id)
-                             .join(MethodicalDoc, Message.methodical_docs)
-                             .filter(MethodicalDoc.method_id
-                                     .in_(subquery_methods)
-                                     )
-                             )
+        has_method_docs = Message.methodical_docs.any()
         if value == "да":
-            return query.filter(Message.message_id.in_(subquery_messages))
-        return query.filter(~Message.message_id.in_(subquery_messages))
+            return query.filter(has_method_docs)
+        return query.filter(~has_method_docs)
 
     def operation(self):
         return lazy_gettext('равно')
@@ -192,23 +150,16 @@ class MessageIsMethodDoc(filters.BaseSQLAFilter):
 
 class RespResourceRegionFilter(filters.FilterInList):
     def apply(self, query, value, alias=None):
-        resps_ids = (
-            db.session
-            .query(Responsibility.resp_id.distinct())
-            .join(Resource, Responsibility.resource)
-            .join(Region, Resource.regions)
-            .filter(Region.region_id.in_(value))
-        )
-        return query.filter(Responsibility.resp_id.in_(resps_ids))
+        return query.filter(exists().where(
+            regions_resources_table.c.resource_id
+            == Responsibility.resource_id,
+            regions_resources_table.c.region_id.in_(value)))
 
 
 class RespResourceOkrugFilter(filters.FilterInList):
     def apply(self, query, value, alias=None):
-        resps_ids = (
-            db.session
-            .query(Responsibility.resp_id.distinct())
-            .join(Resource, Responsibility.resource)
-            .join(Region, Resource.regions)
-            .filter(Region.okrug_id.in_(value))
-        )
-        return query.filter(Responsibility.resp_id.in_(resps_ids))
+        return query.filter(exists().where(
+            regions_resources_table.c.resource_id
+            == Responsibility.resource_id,
+            regions_resources_table.c.region_id == Region.region_id,
+            Region.okrug_id.in_(value)))
@@ -0,0 +1,96 @@
+import re
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from flask import current_app as app
+
+from .data_versions import ADDRESSES_VERSION, get_data_version
+from .extentions import db
+from .models import Address
+
+INDEX_PATTERN = r"((?<!\d)\d{6}(?!\d))"
+INDEX_REGEX = re.compile(INDEX_PATTERN)
+
+
+class IndexRegionResolver:
+    """Определяет регион по почтовому индексу без запросов к БД.
+    Хранит таблицу адресов в двух параллельных массивах: отсортированных
+    индексов и идентификаторов их регионов; поиск - бинарный."""
+
+    def __init__(self, indexes: array, region_ids: array,
+                 version: int = 0) -> None:
+        self.indexes = indexes
+        self.region_ids = region_ids
+        self.version = version
+        self.loaded = time.monotonic()
+
+    @classmethod
+    def load(cls) -> 'IndexRegionResolver':
+        """Загружает из БД индексы, для которых известен регион."""
+        version = get_data_version(ADDRESSES_VERSION)[0]
+        indexes = array('I')
+        region_ids = array('I')
+        # индексы одной длины, поэтому порядок строк совпадает с числовым
+        query = (db.session.query(Address.index, Address.region_id)
+                 .filter(Address.region_id.isnot(None))
+                 .order_by(Address.index))
+        for index, region_id in query:
+            if len(index) == 6 and index.isdigit():
+                indexes.append(int(index))
+                region_ids.append(region_id)
+        return cls(indexes, region_ids, version)
+
+    def __len__(self) -> int:
+        return len(self.indexes)
+
+    def get_region_id(self, index) -> Optional[int]:
+        """Возвращает идентификатор региона почтового индекса или None."""
+        try:
+            index = int(index)
+        except (TypeError, ValueError):
+            return None
+        position = bisect_left(self.indexes, index)
+        if position < len(self.indexes) and self.indexes[position] == index:
+            return self.region_ids[position]
+        return None
+
+    def get_region_ids(self, indexes: Iterable) -> list:
+        """Возвращает идентификаторы регионов почтовых индексов
+        <indexes> без повторов и в порядке их следования."""
+        region_ids = []
+        for index in indexes:
+            region_id = self.get_region_id(index)
+            if region_id is not None and region_id not in region_ids:
+                region_ids.append(region_id)
+        return region_ids
+
+    def find_region_ids(self, text: str) -> list:
+        """Возвращает идентификаторы регионов по всем почтовым индексам,
+        найденным в строке адреса <text>."""
+        if not text:
+            return []
+        return self.get_region_ids(INDEX_REGEX.findall(text))
+
+
+def get_index_resolver() -> IndexRegionResolver:
+    """Возвращает резолвер почтовых индексов текущего процесса.
+    Резолвер перезагружается из БД, если версия адресов (data_versions)
+    изменилась - ее увеличивает flask index update и любое изменение
+    адресов через ORM в любом процессе, - а также по истечении
+    INDEX_RESOLVER_TTL сек. (на случай изменений в обход приложения).
+    Проверка версии - один запрос по первичному ключу."""
+    resolver = app.extensions.get('index_resolver')
+    ttl = app.config['BUSINESS_LOGIC']['INDEX_RESOLVER_TTL']
+    if (resolver is None or time.monotonic() - resolver.loaded > ttl
+            or get_data_version(ADDRESSES_VERSION)[0] != resolver.version):
+        resolver = refresh_index_resolver()
+    return resolver
+
+
+def refresh_index_resolver() -> IndexRegionResolver:
+    """Перезагружает резолвер почтовых индексов текущего процесса."""
+    resolver = IndexRegionResolver.load()
+    app.extensions['index_resolver'] = resolver
+    return resolver
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import and_, literal, or_, tuple_
+
+# Параметры ссылки на следующую и предыдущую страницы списка
+KEYSET_AFTER_ARG = 'after'
+KEYSET_BEFORE_ARG = 'before'
+
+# Количество строк в одном запросе при выгрузке всего списка
+KEYSET_BATCH_SIZE = 1000
+
+
+def get_keyset_order(columns: list, reverse: bool = False) -> list:
+    """Возвращает ORDER BY по столбцам ключа <columns> - списку пар
+    (столбец, по убыванию). При <reverse> порядок обратный."""
+    return [column.desc() if desc != reverse else column.asc()
+            for column, desc in columns]
+
+
+def get_keyset_condition(columns: list, values: list,
+                         backward: bool = False):
+    """Возвращает условие отбора строк, которые в порядке ключа <columns>
+    идут после строки со значениями <values> (при <backward> - до нее).
+    Если все столбцы сортируются в одном направлении, используется
+    сравнение кортежей (a, b) < (x, y), иначе - развернутое условие
+    a < x OR (a = x AND b > y), к которому для использования индекса
+    добавлена граница по первому столбцу. Столбцы ключа не должны
+    содержать NULL."""
+
+    def follows(column, desc, value):
+        return column < value if desc != backward else column > value
+
+    values = [literal(value, column.type)
+              for (column, _), value in zip(columns, values)]
+    directions = {desc for _, desc in columns}
+    if len(directions) == 1:
+        return follows(tuple_(*[column for column, _ in columns]),
+                       directions.pop(), tuple_(*values))
+
+    terms = []
+    for i, (column, desc) in enumerate(columns):
+        equal = [prev == value
+                 for (prev, _), value in zip(columns[:i], values)]
+        terms.append(and_(*equal, follows(column, desc, values[i])))
+    first, desc = columns[0]
+    bound = first <= values[0] if desc != backward else first >= values[0]
+    return and_(bound, or_(*terms))
+
+
+def encode_keyset_cursor(values: list) -> str:
+    """Кодирует значения ключа строки для передачи в ссылке."""
+    data = json.dumps([value.isoformat()
+                       if isinstance(value, (date, datetime)) else value
+                       for value in values], ensure_ascii=False)
+    return base64.urlsafe_b64encode(
+        data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_keyset_cursor(cursor: str, columns: list) -> Optional[list]:
+    """Декодирует значения ключа из ссылки и приводит их к типам
+    столбцов <columns>. Для некорректного значения возвращает None."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data.decode('utf-8'))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        result = []
+        for (column, _), value in zip(columns, values):
+            python_type = column.type.python_type
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            elif not isinstance(value, python_type):
+                return None
+            result.append(value)
+        return result
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        return None
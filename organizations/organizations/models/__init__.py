@@ -1,6 +1,7 @@
 from .address import Address
 from .cert import Cert
 from .contact import Contact
+from .data_version import DataVersion
 from .industry import Industry
 from .industry_resource import industries_resources_table
 from .message import Message
@@ -12,8 +13,11 @@ from .orgadmdoc_organization import OrgAdmDocOrganization
 from .organization import Organization
 from .organization_message import organizations_messages
 from .region import Region
+from .region_alias import RegionAlias
 from .regions_resource import regions_resources_table
 from .resource import Resource
 from .responsibility import Responsibility
 from .responsibility_service import responsibilities_services_table
 from .service import Service
+from .xml_import import XMLImport
+from .xml_import_zone import XMLImportZone
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from ..extentions import db
+
+
+class DataVersion(db.Model):
+    """Модель версии набора данных. Номер версии увеличивается
+    в той же транзакции, что и изменение набора, поэтому по нему
+    все процессы узнают об изменениях, сделанных другими процессами."""
+    __tablename__ = "data_versions"
+    name = db.Column(db.String(50), primary_key=True, nullable=False)
+
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    date_updated = db.Column(db.DateTime, nullable=False,
+                             default=datetime.today)
+
+    def __repr__(self):
+        return f"{self.name} v{self.version}"
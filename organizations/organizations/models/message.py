@@ -10,6 +10,10 @@ from .organization_message import organizations_messages
 class Message(db.Model):
     """Модель письма организации."""
     __tablename__ = "messages"
+    __table_args__ = (
+        db.Index("ix_messages_datetime_created_message_id",
+                 "datetime_created", "message_id"),
+    )
     message_id = db.Column(db.Integer, primary_key=True)
 
     date_inbox_approved = db.Column(db.Date)
@@ -23,7 +27,8 @@ class Message(db.Model):
 
     information = db.Column(db.Text, nullable=False)
 
-    datetime_created = db.Column(db.DateTime, default=datetime.today)
+    datetime_created = db.Column(db.DateTime, nullable=False,
+                                 default=datetime.today)
     datetime_updated = db.Column(db.DateTime, onupdate=datetime.today)
 
     is_inbox = db.Column(db.Boolean, default=True)
@@ -1,5 +1,7 @@
-from io import BytesIO
+import shutil
+import zipfile
 
+from ..blob_storage import BLOB_CHUNK_SIZE, method_docs_storage
 from ..extentions import db
 from .methodicaldoc_message import methodicaldocs_messages
 from .mixins import DateAddedCreatedMixin
@@ -19,7 +21,9 @@ class MethodicalDoc(DateAddedCreatedMixin, db.Model):
                         default=False)
     is_active = db.Column(db.Boolean, nullable=False,
                           default=True)
-    data = db.Column(db.LargeBinary)
+    # файл хранится в method_docs_storage по sha256 содержимого
+    data_hash = db.Column(db.String(64), index=True)
+    data_size = db.Column(db.BigInteger)
     data_extension = db.Column(db.String(10))
 
     messages = db.relationship("Message",
@@ -32,8 +36,22 @@ class MethodicalDoc(DateAddedCreatedMixin, db.Model):
         return self.name[:40]
 
     @property
-    def get_file(self):
-        return BytesIO(self.data)
+    def get_file_path(self):
+        if self.data_hash:
+            return method_docs_storage.get_path(self.data_hash)
+        return None
+
+    def write_to_archive(self, archive: zipfile.ZipFile) -> None:
+        """Добавляет образ документа в zip-архив <archive>,
+        читая файл с диска частями."""
+        info = zipfile.ZipInfo(self.get_file_name)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        if self.data_hash is None:
+            archive.writestr(info, b'')
+            return
+        with open(self.get_file_path, 'rb') as src, \
+                archive.open(info, 'w') as dst:
+            shutil.copyfileobj(src, dst, BLOB_CHUNK_SIZE)
 
     @property
     def get_file_name(self):
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from ..extentions import db
 
 
@@ -24,6 +26,9 @@ class OrgAdmDocOrganization(db.Model):
     our_inbox_number = db.Column(db.String(7))
     inventory_number = db.Column(db.Integer)
     comment = db.Column(db.Text)
+    date_updated = db.Column(db.DateTime, nullable=False,
+                             default=datetime.today,
+                             onupdate=datetime.today, index=True)
     organization = db.relationship("Organization",
                                    back_populates="org_adm_doc")
 
@@ -15,7 +15,8 @@ class Organization(DateAddedCreatedMixin, db.Model):
 
     date_added = db.Column(db.DateTime, nullable=False,
                            default=datetime.today)
-    date_updated = db.Column(db.DateTime, default=datetime.today,
+    date_updated = db.Column(db.DateTime, nullable=False,
+                             default=datetime.today,
                              onupdate=datetime.today)
     org_id = db.Column(db.Integer, primary_key=True)
 
@@ -93,3 +94,10 @@ class Organization(DateAddedCreatedMixin, db.Model):
         if self.inn or self.kpp:
             return f"{name} (ИНН/КПП {self.inn}/{self.kpp})"
         return name
+
+
+db.Index("ix_organizations_date_updated_full_name_org_id",
+         Organization.date_updated.desc(), Organization.full_name,
+         Organization.org_id)
+db.Index("ix_organizations_full_name_org_id",
+         Organization.full_name, Organization.org_id)
@@ -0,0 +1,18 @@
+from ..extentions import db
+
+
+class RegionAlias(db.Model):
+    """Модель сопоставления названия региона из базы индексов
+    АО \"Почты России\" региону РФ."""
+    __tablename__ = "region_aliases"
+    name = db.Column(db.String(100), primary_key=True, nullable=False)
+
+    region_id = db.Column(db.Integer,
+                          db.ForeignKey("regions.region_id",
+                                        ondelete="CASCADE"),
+                          nullable=False)
+
+    region = db.relationship("Region")
+
+    def __repr__(self):
+        return self.name
@@ -11,5 +11,8 @@ regions_resources_table = db.Table(
               db.Integer,
               db.ForeignKey("resources.resource_id",
                             ondelete="CASCADE")
-              )
+              ),
+    db.Index("ix_regions_resources_region_id_resource_id",
+             "region_id", "resource_id",
+             unique=True)
 )
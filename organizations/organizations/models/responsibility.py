@@ -7,6 +7,12 @@ class Responsibility(db.Model):
     об аутсорсинге ИБ-услуг ресурсам."""
 
     __tablename__ = "responsibilities_with_certs"
+    __table_args__ = (
+        db.Index("ix_responsibilities_with_certs_cert_id_resource_id",
+                 "cert_id", "resource_id"),
+        db.Index("ix_responsibilities_with_certs_date_start_resp_id",
+                 "date_start", "resp_id"),
+    )
     resp_id = db.Column(db.Integer, primary_key=True, unique=True)
 
     cert_id = db.Column(
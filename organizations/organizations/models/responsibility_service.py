@@ -11,5 +11,8 @@ responsibilities_services_table = db.Table(
               db.Integer,
               db.ForeignKey("responsibilities_with_certs.resp_id",
                             ondelete="CASCADE")
-              )
+              ),
+    db.Index("ix_responsibilities_services_service_id_resp_id",
+             "service_id", "resp_id",
+             unique=True)
 )
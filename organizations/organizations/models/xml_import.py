@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from ..extentions import db
+
+
+class XMLImport(db.Model):
+    """Модель журнала загрузок XML-файлов центров."""
+
+    __tablename__ = "xml_imports"
+    __table_args__ = (
+        db.Index("ix_xml_imports_cert_id_file_hash", "cert_id", "file_hash"),
+    )
+    import_id = db.Column(db.Integer, primary_key=True)
+
+    cert_id = db.Column(db.Integer,
+                        db.ForeignKey("certs.cert_id",
+                                      ondelete="CASCADE"),
+                        nullable=False)
+    file_name = db.Column(db.Text)
+    file_hash = db.Column(db.String(64), nullable=False)
+    zones_count = db.Column(db.Integer, nullable=False, default=0)
+    zones_skipped = db.Column(db.Integer, nullable=False, default=0)
+    date_imported = db.Column(db.DateTime, nullable=False,
+                              default=datetime.today)
+
+    def __repr__(self):
+        return f"{self.file_name} ({self.date_imported})"
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from ..extentions import db
+
+
+class XMLImportZone(db.Model):
+    """Модель журнала загруженных сведений юр. лиц зон ответственности
+    центров. Хранит хеш всех тегов <ЕдЗО> юр. лица (в порядке следования
+    в файле), записанных в БД."""
+
+    __tablename__ = "xml_import_zones"
+
+    cert_id = db.Column(db.Integer,
+                        db.ForeignKey("certs.cert_id",
+                                      ondelete="CASCADE"),
+                        primary_key=True)
+    zone_hash = db.Column(db.String(64), primary_key=True)
+    date_imported = db.Column(db.DateTime, nullable=False,
+                              default=datetime.today)
+
+    def __repr__(self):
+        return self.zone_hash
@@ -1,7 +1,29 @@
+import io
+from collections import Counter
+from typing import Iterator, Optional
+
 from dbfread import DBF
+from sqlalchemy import (Column, Integer, MetaData, String, Table, exists,
+                        func, or_, select)
 
+from .bulk import insert_rows
+from .data_versions import ADDRESSES_VERSION, bump_data_version
 from .extentions import db
-from .models import Address, Region
+from .models import Address, Region, RegionAlias
+from .utils import chunked
+
+# Количество строк в одной порции COPY / executemany
+STAGING_CHUNK_SIZE = 10000
+
+# Временная таблица для сверки базы индексов с БД. Создается на время
+# загрузки в соединении сессии и не входит в метаданные моделей.
+addresses_staging = Table(
+    'addresses_staging', MetaData(),
+    Column('index', String(6), primary_key=True),
+    Column('area', String(40)),
+    Column('locality', String(60)),
+    Column('region_id', Integer),
+    prefixes=['TEMPORARY'])
 
 
 def cast_reg_pochta_to_constitute(region_name: str) -> str:
@@ -31,38 +53,194 @@ def cast_reg_pochta_to_constitute(region_name: str) -> str:
     return region
 
 
-def find_db_indexes(filename: str) -> set:
-    """Возвращает разницу между количеством почтовых индексов
-    в БД и переданном файле."""
-    db_indexes = set(i for i, in db.session.query(Address.index))
-    file_indexes = set(i.get('INDEX') for i in DBF(filename))
-    new_indexes = file_indexes - db_indexes
-    return new_indexes
+class PochtaRegionResolver:
+    """Определяет регион по его названию из базы индексов.
+    Сопоставления хранятся в таблице region_aliases и редактируются
+    в админке; для названий, которых там нет, регион подбирается
+    функцией cast_reg_pochta_to_constitute, а результат запоминается
+    и сохраняется методом save(). Названия, которым не удалось
+    сопоставить регион, накапливаются в <unmapped>."""
 
+    def __init__(self) -> None:
+        self.region_ids = dict(
+            db.session.query(RegionAlias.name, RegionAlias.region_id))
+        self.regions = None
+        self.new_aliases = {}
+        self.unmapped = Counter()
 
-def fill_db_with_addresses_delta(filename: str) -> None:
-    """Заполняет БД данными о почтовых адресах базы
-    АО \"Почты России\"."""
-    new_indexes = find_db_indexes(filename)
-    addresses = DBF(filename)
-    addresses_list = []
-    regions = {item.name: item.region_id for item in Region.query.all()}
-    for address in addresses:
+    def get_region_id(self, region_name: str) -> Optional[int]:
+        """Возвращает идентификатор региона или None."""
         try:
-            index = address.get('INDEX')
-            if index in new_indexes:
-                if address.get('REGION'):
-                    dbf_region = address.get('REGION')
-                else:
-                    dbf_region = address.get('AUTONOM')
-
-                region_id = regions[cast_reg_pochta_to_constitute(dbf_region)]
-                new_address = Address(index=index,
-                                      area=address.get('AREA'),
-                                      locality=address.get('CITY'),
-                                      region_id=region_id)
-                addresses_list.append(new_address)
-        except ValueError:
-            print('Вместо индекса что-то странное, пропускаю строку')
-    db.session.bulk_save_objects(addresses_list)
-    db.session.commit()
+            region_id = self.region_ids[region_name]
+        except KeyError:
+            region_id = self.region_ids[region_name] = self.resolve(
+                region_name)
+        if region_id is None:
+            self.unmapped[region_name] += 1
+        return region_id
+
+    def resolve(self, region_name: str) -> Optional[int]:
+        """Подбирает регион для названия, которого нет в region_aliases."""
+        if self.regions is None:
+            self.regions = dict(
+                db.session.query(Region.name, Region.region_id))
+        region_id = self.regions.get(
+            cast_reg_pochta_to_constitute(region_name or ''))
+        if region_id is not None:
+            self.new_aliases[region_name] = region_id
+        return region_id
+
+    def save(self) -> int:
+        """Сохраняет в region_aliases новые сопоставления."""
+        return insert_rows(
+            RegionAlias,
+            ({'name': name, 'region_id': region_id}
+             for name, region_id in self.new_aliases.items()),
+            ignore_conflicts=True)
+
+
+def read_dbf_addresses(filename: str, regions: PochtaRegionResolver,
+                       skipped: list) -> Iterator[dict]:
+    """Потоково читает базу индексов и возвращает строки для таблицы
+    адресов. Строки с некорректным или повторным индексом, а также
+    строки с неизвестным регионом пропускаются; некорректные
+    и повторные индексы добавляются в <skipped>."""
+    seen = set()
+    for address in DBF(filename):
+        index = address.get('INDEX')
+        if not isinstance(index, str) or not index.isdigit() \
+                or len(index) != 6 or index in seen:
+            skipped.append(index)
+            continue
+        seen.add(index)
+        region_id = regions.get_region_id(
+            address.get('REGION') or address.get('AUTONOM'))
+        if region_id is None:
+            continue
+        yield {'index': index,
+               'area': address.get('AREA'),
+               'locality': address.get('CITY'),
+               'region_id': region_id}
+
+
+def format_csv_value(value) -> str:
+    """Возвращает значение поля CSV для COPY: None - пустое поле без
+    кавычек (в формате csv это NULL), строки - в кавычках (пустая
+    строка остается пустой строкой), числа - как есть."""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def copy_rows(table: Table, rows: Iterator[dict]) -> int:
+    """Загружает строки <rows> в таблицу <table> через COPY порциями
+    по STAGING_CHUNK_SIZE строк. Только для PostgreSQL."""
+    columns = [column.name for column in table.columns]
+    sql = (f'COPY {table.name} ({", ".join(columns)}) '
+           f'FROM STDIN WITH (FORMAT csv)')
+    cursor = db.session.connection().connection.cursor()
+    count = 0
+    try:
+        for chunk in chunked(rows, STAGING_CHUNK_SIZE):
+            # csv.writer пишет None как "" (пустую строку), поэтому
+            # строки собираются вручную, чтобы NULL остался NULL
+            buffer = io.StringIO(''.join(
+                ','.join(format_csv_value(row[column])
+                         for column in columns) + '\n'
+                for row in chunk))
+            cursor.copy_expert(sql, buffer)
+            count += len(chunk)
+    finally:
+        cursor.close()
+    return count
+
+
+def load_addresses_staging(filename: str,
+                           regions: PochtaRegionResolver) -> dict:
+    """Создает временную таблицу addresses_staging и за один проход
+    загружает в нее базу индексов: на PostgreSQL через COPY,
+    на прочих СУБД многострочными INSERT."""
+    skipped = []
+    connection = db.session.connection()
+    # На SQLite временная таблица живет, пока живет соединение,
+    # поэтому остатки прерванной загрузки удаляются заранее
+    addresses_staging.drop(bind=connection, checkfirst=True)
+    addresses_staging.create(bind=connection)
+    rows = read_dbf_addresses(filename, regions, skipped)
+    if db.engine.dialect.name == 'postgresql':
+        loaded = copy_rows(addresses_staging, rows)
+    else:
+        loaded = 0
+        for chunk in chunked(rows, STAGING_CHUNK_SIZE):
+            loaded += insert_rows(addresses_staging, chunk)
+    return {'loaded': loaded, 'skipped': len(skipped),
+            'unmapped': dict(regions.unmapped)}
+
+
+def get_new_addresses_filter():
+    """Условие: индекса из addresses_staging нет в таблице адресов."""
+    address = Address.__table__
+    return ~exists().where(address.c.index == addresses_staging.c.index)
+
+
+def get_changed_addresses_filter():
+    """Условие: у адреса из таблицы адресов в addresses_staging
+    изменились район, населенный пункт или регион."""
+    address = Address.__table__
+    staging = addresses_staging
+    return exists().where(
+        staging.c.index == address.c.index,
+        or_(*(address.c[name].is_distinct_from(staging.c[name])
+              for name in ('area', 'locality', 'region_id'))))
+
+
+def find_db_indexes(filename: str) -> dict:
+    """Сверяет базу индексов с БД, не изменяя ее.
+    Возвращает количество новых и измененных адресов."""
+    try:
+        result = load_addresses_staging(filename, PochtaRegionResolver())
+        result['new'] = db.session.execute(
+            select(func.count()).select_from(addresses_staging)
+            .where(get_new_addresses_filter())).scalar()
+        result['changed'] = db.session.execute(
+            select(func.count()).select_from(Address.__table__)
+            .where(get_changed_addresses_filter())).scalar()
+    finally:
+        db.session.rollback()
+    return result
+
+
+def fill_db_with_addresses_delta(filename: str) -> dict:
+    """Заполняет БД данными о почтовых адресах базы
+    АО \"Почты России\": добавляет новые индексы и обновляет
+    адреса, у которых изменились район, населенный пункт или регион.
+    Возвращает количество добавленных и обновленных адресов."""
+    address = Address.__table__
+    staging = addresses_staging
+    columns = [column.name for column in staging.columns]
+    regions = PochtaRegionResolver()
+    try:
+        result = load_addresses_staging(filename, regions)
+        result['new'] = db.session.execute(
+            address.insert().from_select(
+                columns,
+                select(*staging.columns).where(get_new_addresses_filter()))
+        ).rowcount
+        new_values = {
+            name: select(staging.c[name])
+            .where(staging.c.index == address.c.index).scalar_subquery()
+            for name in ('area', 'locality', 'region_id')}
+        result['changed'] = db.session.execute(
+            address.update().values(**new_values)
+            .where(get_changed_addresses_filter())).rowcount
+        regions.save()
+        addresses_staging.drop(bind=db.session.connection())
+        if result['new'] or result['changed']:
+            bump_data_version(db.session.connection(), ADDRESSES_VERSION)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result
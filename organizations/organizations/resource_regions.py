@@ -0,0 +1,154 @@
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import (Column, Integer, MetaData, String, Table, and_,
+                        exists, select)
+
+from .bulk import insert_rows
+from .extentions import db
+from .index_resolver import INDEX_REGEX
+from .models import Address, Resource, regions_resources_table
+
+# Количество ресурсов, обрабатываемых в одной транзакции
+REGIONS_BATCH_SIZE = 1000
+
+# Временная таблица пар (ресурс, почтовый индекс) текущей пачки.
+# Создается в каждой транзакции заново: на SQLite соединение
+# может закрываться после фиксации транзакции.
+resource_indexes_staging = Table(
+    'resource_indexes_staging', MetaData(),
+    Column('resource_id', Integer, nullable=False),
+    Column('index', String(6), nullable=False),
+    prefixes=['TEMPORARY'])
+
+
+class RegionsRebuildStats:
+    """Счетчики перестроения регионов ресурсов."""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.resources = 0
+        self.indexes = 0
+        self.created = 0
+        self.deleted = 0
+
+    @property
+    def duration(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Количество обработанных ресурсов в секунду."""
+        return self.resources / self.duration if self.duration else 0.0
+
+    def report(self) -> str:
+        return (f'Обработано ресурсов: {self.resources} '
+                f'({self.throughput:.0f} в сек.), '
+                f'найдено индексов: {self.indexes}, '
+                f'добавлено регионов: {self.created}, '
+                f'удалено регионов: {self.deleted}')
+
+
+def get_resources_batch(last_id: int, batch_size: int) -> list:
+    """Возвращает пачку активных ресурсов с идентификатором
+    больше <last_id> в виде списка (resource_id, factual_addresses)."""
+    return (db.session.query(Resource.resource_id,
+                             Resource.factual_addresses)
+            .filter(Resource.is_active.is_(True),
+                    Resource.resource_id > last_id)
+            .order_by(Resource.resource_id)
+            .limit(batch_size)
+            .all())
+
+
+def get_resource_indexes(resources: list) -> list:
+    """Возвращает пары (ресурс, почтовый индекс) из адресов ресурсов."""
+    rows = []
+    for resource_id, factual_addresses in resources:
+        for index in set(INDEX_REGEX.findall(factual_addresses or '')):
+            rows.append({'resource_id': resource_id, 'index': index})
+    return rows
+
+
+def rebuild_batch_regions(resource_ids: list, rows: list,
+                          prune: bool) -> tuple:
+    """Перестраивает регионы пачки ресурсов: одним INSERT ... SELECT
+    добавляет недостающие регионы, найденные соединением почтовых
+    индексов с таблицей адресов, а при <prune> одним DELETE удаляет
+    регионы, не подтвержденные индексами. Удаление затрагивает только
+    ресурсы, для которых найден хотя бы один регион, - регионы
+    ресурсов без индексов в адресах (например, заданные кодом региона
+    в XML-файле) не удаляются. Возвращает количество добавленных
+    и удаленных регионов."""
+
+    connection = db.session.connection()
+    staging = resource_indexes_staging
+    address = Address.__table__
+    regions = regions_resources_table
+    staging.drop(bind=connection, checkfirst=True)
+    staging.create(bind=connection)
+    insert_rows(staging, rows)
+
+    found = (select(staging.c.resource_id, address.c.region_id)
+             .join(address, address.c.index == staging.c.index)
+             .where(address.c.region_id.isnot(None)))
+    new_regions = found.where(~exists().where(
+        regions.c.resource_id == staging.c.resource_id,
+        regions.c.region_id == address.c.region_id)).distinct()
+    created = db.session.execute(
+        regions.insert().from_select(['resource_id', 'region_id'],
+                                     new_regions)).rowcount
+
+    deleted = 0
+    if prune:
+        confirmed = exists().where(
+            staging.c.resource_id == regions.c.resource_id,
+            address.c.index == staging.c.index,
+            address.c.region_id == regions.c.region_id)
+        resolved = exists().where(
+            staging.c.resource_id == regions.c.resource_id,
+            address.c.index == staging.c.index,
+            address.c.region_id.isnot(None))
+        deleted = db.session.execute(
+            regions.delete().where(and_(
+                regions.c.resource_id.in_(resource_ids),
+                resolved, ~confirmed))).rowcount
+
+    staging.drop(bind=connection)
+    return created, deleted
+
+
+def rebuild_resources_regions(
+        batch_size: int = REGIONS_BATCH_SIZE, prune: bool = False,
+        progress: Optional[Callable[[RegionsRebuildStats], None]] = None
+) -> RegionsRebuildStats:
+    """Перестраивает регионы всех активных ресурсов по почтовым индексам
+    в их адресах. Ресурсы читаются пачками по <batch_size> в порядке
+    идентификаторов, каждая пачка фиксируется отдельной транзакцией,
+    поэтому все ресурсы в памяти одновременно не держатся.
+    После каждой пачки вызывается <progress>."""
+
+    stats = RegionsRebuildStats()
+    last_id = 0
+    while True:
+        resources = get_resources_batch(last_id, batch_size)
+        if not resources:
+            break
+        last_id = resources[-1].resource_id
+        rows = get_resource_indexes(resources)
+        try:
+            if rows:
+                created, deleted = rebuild_batch_regions(
+                    [resource_id for resource_id, _ in resources],
+                    rows, prune)
+                stats.created += created
+                stats.deleted += deleted
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        stats.resources += len(resources)
+        stats.indexes += len(rows)
+        if progress:
+            progress(stats)
+    return stats
@@ -0,0 +1,159 @@
+from typing import List
+
+from sqlalchemy import (DDL, Table, event, func, literal, literal_column,
+                        or_, select, union)
+from sqlalchemy.sql import column, table
+
+from .extentions import db
+from .models import Message, Organization, organizations_messages
+
+# Минимальная длина слова, которое можно найти по триграммам
+SEARCH_MIN_TERM_LENGTH = 3
+
+
+class SearchIndex:
+    """Индекс поиска подстроки в текстовых столбцах таблицы.
+    На PostgreSQL используются GIN-индексы pg_trgm по каждому столбцу,
+    на SQLite - таблица FTS5 с токенизатором trigram, содержимое которой
+    поддерживают триггеры. На прочих СУБД выполняется обычный ILIKE."""
+
+    def __init__(self, source: Table, columns: List[str]) -> None:
+        self.source = source
+        self.columns = columns
+        self.name = f'{source.name}_search'
+        self.pk = list(source.primary_key.columns)[0]
+        self.fts = table(self.name, column('rowid'))
+        for statement in self.get_sqlite_ddl():
+            event.listen(source, 'after_create',
+                         DDL(statement).execute_if(dialect='sqlite'))
+        event.listen(source, 'before_drop',
+                     DDL(f'DROP TABLE IF EXISTS {self.name}')
+                     .execute_if(dialect='sqlite'))
+
+    def get_trgm_index_name(self, column_name: str) -> str:
+        return f'ix_{self.source.name}_{column_name}_trgm'
+
+    def get_postgresql_ddl(self) -> List[str]:
+        """Возвращает DDL индексов pg_trgm."""
+        statements = ['CREATE EXTENSION IF NOT EXISTS pg_trgm']
+        for column_name in self.columns:
+            statements.append(
+                f'CREATE INDEX IF NOT EXISTS '
+                f'{self.get_trgm_index_name(column_name)} '
+                f'ON {self.source.name} '
+                f'USING gin ({column_name} gin_trgm_ops)')
+        return statements
+
+    def get_sqlite_ddl(self) -> List[str]:
+        """Возвращает DDL таблицы FTS5 и триггеров, которые
+        переносят в нее изменения исходной таблицы."""
+        name, source, pk = self.name, self.source.name, self.pk.name
+        columns = ', '.join(self.columns)
+        new_values = ', '.join(f'new.{c}' for c in self.columns)
+        old_values = ', '.join(f'old.{c}' for c in self.columns)
+        insert_new = (f"INSERT INTO {name}(rowid, {columns}) "
+                      f"VALUES (new.{pk}, {new_values});")
+        delete_old = (f"INSERT INTO {name}({name}, rowid, {columns}) "
+                      f"VALUES ('delete', old.{pk}, {old_values});")
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+            f"{columns}, content='{source}', content_rowid='{pk}', "
+            f"tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT "
+            f"ON {source} BEGIN {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE "
+            f"ON {source} BEGIN {delete_old} END",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE "
+            f"OF {columns} ON {source} BEGIN {delete_old} {insert_new} END",
+            f"INSERT INTO {name}({name}) VALUES ('rebuild')"]
+
+    def create(self) -> None:
+        """Создает недостающие структуры индекса в текущей БД,
+        на SQLite перестраивает содержимое таблицы FTS5."""
+        connection = db.session.connection()
+        dialect = connection.dialect.name
+        if dialect == 'postgresql':
+            for statement in self.get_postgresql_ddl():
+                connection.exec_driver_sql(statement)
+        elif dialect == 'sqlite':
+            for statement in self.get_sqlite_ddl():
+                connection.exec_driver_sql(statement)
+
+    @staticmethod
+    def is_trigram_term(term: str) -> bool:
+        """Слово без префиксов поиска Flask-Admin (^ и =),
+        которое можно найти по триграммам."""
+        return (len(term) >= SEARCH_MIN_TERM_LENGTH
+                and not term.startswith(('^', '=')))
+
+    def get_match(self, terms: List[str]):
+        """Возвращает условие MATCH таблицы FTS5: все слова <terms>
+        как подстроки."""
+        query = ' '.join('"{}"'.format(term.replace('"', '""'))
+                         for term in terms)
+        return literal_column(self.name).op('MATCH')(query)
+
+    def select_ids(self, term: str):
+        """Возвращает SELECT первичных ключей строк, один из столбцов
+        которых содержит <term> (с учетом префиксов ^ и = Flask-Admin)."""
+        if (db.engine.dialect.name == 'sqlite'
+                and self.is_trigram_term(term)):
+            return select(self.fts.c.rowid).where(self.get_match([term]))
+        if term.startswith('^'):
+            like = f'{term[1:]}%'
+        elif term.startswith('='):
+            like = term[1:]
+        else:
+            like = f'%{term}%'
+        return select(self.pk).where(
+            or_(*[self.source.c[c].ilike(like) for c in self.columns]))
+
+    def order_by_rank(self, query, terms: List[str]):
+        """Сортирует запрос <query> по релевантности строк словам <terms>:
+        на PostgreSQL - по сумме word_similarity слов с лучшим столбцом,
+        на SQLite - по bm25, который вычисляется за один проход
+        по таблице FTS5 и присоединяется к запросу."""
+        terms = [term.lstrip('^=') for term in terms if term.lstrip('^=')]
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql' and terms:
+            rank = literal(0.0)
+            for term in terms:
+                rank = rank + func.coalesce(func.greatest(*[
+                    func.word_similarity(literal(term), self.source.c[c])
+                    for c in self.columns]), 0)
+            return query.order_by(rank.desc())
+        terms = [term for term in terms if self.is_trigram_term(term)]
+        if dialect == 'sqlite' and terms:
+            ranked = (select(self.fts.c.rowid,
+                             literal_column('rank').label('rank'))
+                      .where(self.get_match(terms))
+                      .subquery())
+            # bm25 отрицательный: чем меньше, тем релевантнее
+            return (query.outerjoin(ranked, ranked.c.rowid == self.pk)
+                    .order_by(func.coalesce(ranked.c.rank, 0)))
+        return query
+
+
+organizations_search = SearchIndex(
+    Organization.__table__, ['db_name', 'short_name', 'inn', 'kpp'])
+messages_search = SearchIndex(
+    Message.__table__,
+    ['information', 'our_outbox_number', 'number_inbox_approved'])
+
+SEARCH_INDEXES = (organizations_search, messages_search)
+
+
+def select_message_ids(term: str):
+    """Возвращает SELECT идентификаторов писем, которые содержат <term>
+    или адресованы организациям, название которых содержит <term>."""
+    by_organizations = select(organizations_messages.c.message_id).where(
+        organizations_messages.c.org_id.in_(
+            organizations_search.select_ids(term)))
+    return union(messages_search.select_ids(term), by_organizations)
+
+
+def create_search_indexes() -> None:
+    """Создает индексы поиска в текущей БД."""
+    for search_index in SEARCH_INDEXES:
+        search_index.create()
+    db.session.commit()
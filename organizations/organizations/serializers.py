@@ -0,0 +1,112 @@
+import json
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Callable, Optional, Sequence
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def format_datetime(value: datetime) -> str:
+    """Дата и время в формате ГГГГ-ММ-ДД ЧЧ:ММ:СС."""
+    return value.isoformat(' ', 'seconds')
+
+
+def format_date(value: date) -> str:
+    """Дата в формате ГГГГ-ММ-ДД."""
+    return value.isoformat()
+
+
+def default(obj):
+    """Сериализует значения, которые кодировщик не знает."""
+    if isinstance(obj, datetime):
+        return format_datetime(obj)
+    if isinstance(obj, date):
+        return format_date(obj)
+    return str(obj)
+
+
+if orjson is not None:
+    def dumps(obj) -> bytes:
+        """Сериализует <obj> в JSON (UTF-8) с помощью orjson."""
+        return orjson.dumps(obj, default=default,
+                            option=orjson.OPT_PASSTHROUGH_DATETIME)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'),
+                                default=default)
+
+    def dumps(obj) -> bytes:
+        """Сериализует <obj> в JSON (UTF-8) модулем json."""
+        return _encoder.encode(obj).encode('utf-8')
+
+
+def get_value_converter(python_type: Optional[type]) -> Optional[Callable]:
+    """Возвращает функцию преобразования значения столбца типа
+    <python_type> в значение JSON или None, если оно не нужно."""
+    if python_type is datetime:
+        return format_datetime
+    if python_type is date:
+        return format_date
+    return None
+
+
+def get_python_type(column) -> Optional[type]:
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def compile_row_converter(fields: Sequence[tuple]) -> Callable:
+    """Собирает функцию row -> dict для строк результата запроса.
+    <fields> - тройки (ключ, позиция в строке, преобразование или None).
+    Ключи, позиции и преобразования вычисляются один раз: значения
+    выбираются из строки одним вызовом itemgetter, а преобразуются
+    только значения столбцов, которым это нужно."""
+    keys = tuple(key for key, index, converter in fields)
+    indexes = [index for key, index, converter in fields]
+    converters = tuple((number, converter) for number, (key, index, converter)
+                       in enumerate(fields) if converter is not None)
+    if len(indexes) == 1:
+        index = indexes[0]
+
+        def getter(row):
+            return (row[index],)
+    else:
+        getter = itemgetter(*indexes)
+    if not converters:
+        return lambda row: dict(zip(keys, getter(row)))
+
+    def convert(row) -> dict:
+        values = list(getter(row))
+        for number, converter in converters:
+            if values[number] is not None:
+                values[number] = converter(values[number])
+        return dict(zip(keys, values))
+    return convert
+
+
+class RowSerializer:
+    """Сериализатор строк запроса с выбранными столбцами <columns>.
+    Преобразователь строки в словарь собирается один раз по составу
+    и типам столбцов; даты преобразуются в строки сразу при сборке
+    словаря. В JSON выводятся столбцы <fields> (по умолчанию все)."""
+
+    def __init__(self, columns: Sequence,
+                 fields: Optional[Sequence[str]] = None) -> None:
+        self.columns = tuple(columns)
+        keys = [column.key for column in self.columns]
+        self.fields = tuple(fields or keys)
+        converter_fields = []
+        for key in self.fields:
+            index = keys.index(key)
+            python_type = get_python_type(self.columns[index])
+            converter_fields.append(
+                (key, index, get_value_converter(python_type)))
+        self.to_dict = compile_row_converter(converter_fields)
+
+    def dumps(self, row) -> bytes:
+        """Сериализует строку в JSON."""
+        return dumps(self.to_dict(row))
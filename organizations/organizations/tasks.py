@@ -1,32 +1,87 @@
 import copy
 import datetime
+import logging
+import os
+import time
 from typing import List, Tuple
 
-from celery import shared_task
+from celery import chord, shared_task
 from flask import current_app as app
+from sqlalchemy import exists
 
 from .extentions import db
 from .models import Message, Organization, methodicaldocs_messages
+from .resource_regions import rebuild_resources_regions
 from .utils import create_zip_archive_mem, get_cur_time, send_mail
 from .views.organization import METHOD_DOC_OUTPUT_NUMBER_TEXT
 from .xml_parser import XMLHandler
 
 
-@shared_task(ignore_results=True)
-def aparse_xml(file_paths, email):
-    log_names = []
-    cur_time = get_cur_time()
+XML_STATUSES = {
+    'success': 'успешно',
+    'failure': 'ошибка обработки (см. лог)',
+    'error': 'непредвиденная ошибка (см. лог)'
+}
+
+
+def parse_xml_file(file_path: str, file_name: str, cur_time: str) -> dict:
+    """Обрабатывает один XML-файл. Возвращает сведения о результате
+    обработки: имя файла и лога, статус, режим и время обработки."""
+
+    log_file_name = f'{file_path}-{cur_time}.log'
+    stream = (os.path.getsize(file_path)
+              >= app.config['BUSINESS_LOGIC']['XML_STREAM_THRESHOLD'])
+    started = datetime.datetime.now()
+    start = time.monotonic()
+    handler = XMLHandler(
+        file=file_path, logger_file=log_file_name,
+        schema=app.config['BUSINESS_LOGIC']['XSD_SCHEMA_PATH'],
+        logger_name=file_name,
+        stream=stream)
+    try:
+        status = 'success' if handler.handle() else 'failure'
+    except Exception:
+        db.session.rollback()
+        logging.getLogger(file_name).exception('Непредвиденная ошибка')
+        status = 'error'
+    return {
+        'file': file_name,
+        'log': log_file_name,
+        'status': status,
+        'stream': stream,
+        'started': started.isoformat(timespec='seconds'),
+        'duration': round(time.monotonic() - start, 3)
+    }
+
+
+def get_xml_results_text(results: List[dict]) -> str:
+    """Возвращает отчет о результатах обработки XML-файлов."""
+
+    lines = []
+    for result in results:
+        mode = 'потоковый' if result['stream'] else 'обычный'
+        lines.append(f"{result['file']}: {XML_STATUSES[result['status']]}, "
+                     f"режим {mode}, начало {result['started']}, "
+                     f"длительность {result['duration']} с")
+    return '\n'.join(lines)
+
+
+@shared_task(ignore_result=False)
+def aparse_xml_file(file_path: str, file_name: str, cur_time: str) -> dict:
+    """Обрабатывает один XML-файл из пачки загруженных файлов."""
+
+    return parse_xml_file(file_path, file_name, cur_time)
 
-    for file in file_paths:
-        log_file_name = f'{file[0]}-{cur_time}.log'
-        handler = XMLHandler(
-            file=file[0], logger_file=log_file_name,
-            schema=app.config['BUSINESS_LOGIC']['XSD_SCHEMA_PATH'],
-            logger_name=file[1])
-        handler.handle()
-        log_names.append(log_file_name)
 
-    archive = create_zip_archive_mem(log_names)
+@shared_task
+def send_xml_results(results: List[dict], email: str, cur_time: str):
+    """Отправляет на email архив с логами и отчетом
+    о результатах обработки XML-файлов."""
+
+    archive = create_zip_archive_mem(
+        [result['log'] for result in results
+         if os.path.exists(result['log'])],
+        extra_files={'results.txt': get_xml_results_text(results)})
     archive_name = f'{cur_time}-results.zip'
 
     email_settings = app.config['EMAIL']
@@ -45,26 +100,36 @@ def aparse_xml(file_paths, email):
         file_binary_name=archive_name)
 
 
+@shared_task(ignore_result=True)
+def aparse_xml(file_paths, email):
+    """Обрабатывает загруженные XML-файлы и отправляет результаты на email.
+    Если настроено хранилище результатов Celery, каждый файл
+    обрабатывается отдельной задачей, и файлы обрабатываются параллельно
+    на всех доступных обработчиках. Иначе файлы обрабатываются по очереди."""
+
+    cur_time = get_cur_time()
+    if app.config['CELERY']['result_backend']:
+        chord(aparse_xml_file.s(file_path, file_name, cur_time)
+              for file_path, file_name in file_paths)(
+            send_xml_results.s(email=email, cur_time=cur_time))
+        return
+    results = [parse_xml_file(file_path, file_name, cur_time)
+               for file_path, file_name in file_paths]
+    send_xml_results(results, email=email, cur_time=cur_time)
+
+
 def get_unexecuted_messages() -> List[Tuple[datetime.datetime, str]]:
     """Возвращает дату подписи (генерации) письма с методичками
      и название адресата, исполнение которого не внесено в сервис."""
 
-    message_subquery = (
-        db.session
-        .query(Message.message_id.distinct())
-        .join(
-            methodicaldocs_messages,
-            methodicaldocs_messages.c.message_id == Message.message_id
-        )
-        .filter(~methodicaldocs_messages.c.method_id.is_(None))
-        .filter(Message.our_outbox_number == METHOD_DOC_OUTPUT_NUMBER_TEXT)
-        .all()
-    )
-    message_subquery = [i for i, in message_subquery]
+    has_method_docs = exists().where(
+        methodicaldocs_messages.c.message_id == Message.message_id,
+        methodicaldocs_messages.c.method_id.isnot(None))
     return (db.session
             .query(Message.date_approved, Organization.full_name)
             .join(Organization, Message.organizations)
-            .filter(Message.message_id.in_(message_subquery))
+            .filter(Message.our_outbox_number == METHOD_DOC_OUTPUT_NUMBER_TEXT,
+                    has_method_docs)
             .all()
             )
 
@@ -80,6 +145,17 @@ def get_notify_text(messages: List[Tuple[datetime.datetime, str]]):
     return ';\n'.join(results)
 
 
+@shared_task(ignore_result=True)
+def arebuild_resources_regions(prune: bool = False):
+    """Перестраивает регионы активных ресурсов по почтовым индексам
+    в их адресах."""
+
+    logger = logging.getLogger(__name__)
+    stats = rebuild_resources_regions(
+        prune=prune, progress=lambda stats: logger.info(stats.report()))
+    logger.info(f'Регионы ресурсов перестроены за {stats.duration:.1f} сек.')
+
+
 @shared_task
 def send_notify_email():
     """Отправляет email-письмо, содержащее реквизиты
@@ -11,15 +11,17 @@ from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from io import BytesIO
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 import requests
 from flask import current_app as app
 from fpdf import FPDF
 from pytils import translit
 from requests.exceptions import InvalidJSONError
-from sqlalchemy import func
+from sqlalchemy import func, text
+from sqlalchemy.exc import OperationalError
 
 from .exceptions import (EgrulApiWrongFormatError, ModelAttributeError,
                          SMTPAuthError, SMTPNotAssignError)
@@ -70,16 +72,54 @@ def generate_uuid() -> str:
     return str(uuid.uuid4())
 
 
-def get_quick_query_count(query) -> int:
+def get_quick_query_count(query, timeout: int = None) -> Optional[int]:
     """Оптимальный способ получение количества
-    строк в таблице."""
+    строк в таблице. На PostgreSQL подсчет можно ограничить
+    по времени <timeout> (мс): если он не уложился в отведенное
+    время, возвращается None."""
     count_q = query.statement.with_only_columns(
         [func.count()]
     ).order_by(None)
-    count = query.session.execute(count_q).scalar()
+    session = query.session
+    if not timeout or session.connection().dialect.name != 'postgresql':
+        return session.execute(count_q).scalar()
+    savepoint = session.begin_nested()
+    try:
+        session.execute(text(
+            f'SET LOCAL statement_timeout = {int(timeout)}'))
+        count = session.execute(count_q).scalar()
+        session.execute(text('SET LOCAL statement_timeout = DEFAULT'))
+        savepoint.commit()
+    except OperationalError:
+        savepoint.rollback()
+        return None
     return count
 
 
+def get_table_count_estimate(session, table_name: str) -> Optional[int]:
+    """Возвращает оценку количества строк в таблице по статистике
+    PostgreSQL (pg_class.reltuples) или None, если оценки нет."""
+    if session.connection().dialect.name != 'postgresql':
+        return None
+    estimate = session.execute(
+        text('SELECT reltuples FROM pg_class '
+             'WHERE oid = to_regclass(:table_name)'),
+        {'table_name': table_name}).scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Разбивает последовательность на списки длиной не более <size>."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def create_a_href_string(link: str, text: str) -> str:
     """Создает из переданных строк кликабельную ссылку."""
     return f"<a href={link}>{text}</a>"
@@ -217,8 +257,9 @@ def get_cur_time() -> str:
     return now.strftime('%Y-%m-%d-%H:%M:%S')
 
 
-def create_zip_archive_mem(files):
-    """Возвращает архив в памяти."""
+def create_zip_archive_mem(files, extra_files: dict = None):
+    """Возвращает архив в памяти. Помимо файлов <files> в архив
+    добавляются файлы из словаря <extra_files> вида {имя: содержимое}."""
 
     memory_archive = BytesIO()
 
@@ -228,6 +269,10 @@ def create_zip_archive_mem(files):
             data.compress_type = zipfile.ZIP_DEFLATED
             with open(file, "rb") as f:
                 zf.writestr(data, f.read())
+        for name, content in (extra_files or {}).items():
+            data = zipfile.ZipInfo(name)
+            data.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(data, content)
     memory_archive.seek(0)
     return memory_archive.getvalue()
 
@@ -4,6 +4,7 @@ from .message import MessageModelView
 from .method_doc import MethodDocModelView
 from .orgadmdoc import OrgAdmDocModelView
 from .organization import OrganizationModelView
+from .region_alias import RegionAliasModelView
 from .resource import ResourceModelView
 from .responsibility import ResponseModelView
 from .workspace import WorkspaceView
@@ -282,6 +282,16 @@ orgadmdoc_fields_descriptions = dict(
     name="Полное название вида организационно-распорядительного документа"
 )
 
+region_alias_fields_labels = dict(
+    name="Название региона в базе индексов",
+    region="Регион"
+)
+
+region_alias_fields_descriptions = dict(
+    name="Название региона в том виде, в котором оно указано "
+         "в базе индексов АО \"Почты России\" (поле REGION или AUTONOM)"
+)
+
 methoddoc_fields_labels = dict(
     name="Полное название",
     short_name="Сокращенное название (используется для генерации образов)",
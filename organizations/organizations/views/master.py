@@ -1,7 +1,23 @@
+import threading
+import time
 from datetime import date
+from typing import Optional
 
+from flask import current_app as app
+from flask import Response, g, request, stream_with_context
+from flask_admin._compat import csv_encode
 from flask_admin.contrib.sqla import ModelView
 from flask_admin.model import typefmt
+from sqlalchemy import func
+from sqlalchemy.orm import Query, joinedload, scoped_session, selectinload
+from werkzeug.utils import secure_filename
+
+from ..choices_cache import get_choices_version
+from ..keyset import (KEYSET_AFTER_ARG, KEYSET_BATCH_SIZE, KEYSET_BEFORE_ARG,
+                      decode_keyset_cursor, encode_keyset_cursor,
+                      get_keyset_condition, get_keyset_order)
+from ..serializers import dumps
+from ..utils import get_quick_query_count, get_table_count_estimate
 
 SYMB_CONST = "—"
 DEFAULT_PAGE_SIZE_CONST = 20
@@ -19,6 +35,17 @@ EXPORT_BOOL_DATE_DEFAULT_FORMATTERS.update({
 })
 
 
+class CountQuery(Query):
+    """COUNT-запрос списка. Flask-Admin добавляет к нему условия поиска
+    и фильтров и вызывает scalar(), а подсчет выполняет
+    BaseModelView.count_rows."""
+    view = None
+
+    def scalar(self):
+        filtered = self.get_execution_options().get('list_filtered', False)
+        return self.view.count_rows(self, filtered)
+
+
 class BaseModelView(ModelView):
     """Базовый view-класс."""
 
@@ -31,6 +58,294 @@ class BaseModelView(ModelView):
                          url, static_folder, menu_class_name,
                          menu_icon_type, menu_icon_value)
         self.dynamic_filters = None
+        self._dynamic_filters_version = None
+        self._dynamic_filters_lock = threading.Lock()
+        self._count_cache = None
+        self._keyset_columns = None
+
+    def get_dynamic_filters(self) -> list:
+        """Возвращает динамические фильтры, опции которых
+        берутся из справочников. Переопределяется в наследниках."""
+        return []
+
+    def refresh_dynamic_filters(self) -> None:
+        """Пересоздает динамические фильтры, если с момента их создания
+        изменились справочники. Количество и порядок фильтров постоянны,
+        поэтому запросы, которые в этот момент читают кеш фильтров
+        в других потоках, получают корректные индексы фильтров."""
+        version = get_choices_version()
+        if self._dynamic_filters_version == version:
+            return
+        with self._dynamic_filters_lock:
+            if self._dynamic_filters_version == version:
+                return
+            self.dynamic_filters = self.get_dynamic_filters()
+            self._refresh_filters_cache()
+            self._dynamic_filters_version = version
+
+    def _get_list_extra_args(self):
+        """Обновляет динамические фильтры перед разбором параметров
+        списка (используется и списком, и экспортом)."""
+        self.refresh_dynamic_filters()
+        return super(BaseModelView, self)._get_list_extra_args()
+
+    def get_count_query(self):
+        """Возвращает COUNT-запрос списка, подсчет которого
+        выполняется через count_rows."""
+        session = self.session
+        if isinstance(session, scoped_session):
+            session = session()
+        query = CountQuery(func.count('*'), session).select_from(self.model)
+        query.view = self
+        return query
+
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        """Если задан search_index, слова ищутся по индексу поиска,
+        а не через ILIKE по столбцам column_searchable_list."""
+        if self.search_index is None:
+            query, count_query, joins, count_joins = super(
+                BaseModelView, self)._apply_search(query, count_query, joins,
+                                                   count_joins, search)
+            return query, self.mark_filtered(count_query), joins, count_joins
+        terms = [term for term in search.split(' ') if term]
+        for term in terms:
+            condition = self.get_search_condition(term)
+            query = query.filter(condition)
+            if count_query is not None:
+                count_query = count_query.filter(condition)
+        query = query.execution_options(search_terms=terms)
+        return query, self.mark_filtered(count_query), joins, count_joins
+
+    def get_search_condition(self, term: str):
+        """Возвращает условие отбора строк, содержащих слово <term>."""
+        pk = getattr(self.model, self._primary_key)
+        return pk.in_(self.search_index.select_ids(term))
+
+    def order_by_search_rank(self, query, terms: list):
+        """Сортирует запрос по релевантности строк словам поиска <terms>."""
+        return self.search_index.order_by_rank(query, terms)
+
+    def _apply_filters(self, query, count_query, joins, count_joins,
+                       filters):
+        query, count_query, joins, count_joins = super(
+            BaseModelView, self)._apply_filters(query, count_query, joins,
+                                                count_joins, filters)
+        return query, self.mark_filtered(count_query), joins, count_joins
+
+    @staticmethod
+    def mark_filtered(count_query):
+        """Отмечает COUNT-запрос как запрос с поиском или фильтрами."""
+        if count_query is None:
+            return None
+        return count_query.execution_options(list_filtered=True)
+
+    def count_rows(self, query, filtered: bool) -> Optional[int]:
+        """Возвращает количество строк списка. Без поиска и фильтров
+        используется оценка по статистике PostgreSQL или точное
+        количество, закешированное на LIST_COUNT_CACHE_TTL сек.
+        С поиском или фильтрами количество считается точно, но не дольше
+        LIST_COUNT_TIMEOUT мс; если время вышло, возвращается None
+        и список выводится без номеров страниц."""
+        settings = app.config['BUSINESS_LOGIC']
+        if filtered:
+            return get_quick_query_count(
+                query, timeout=settings['LIST_COUNT_TIMEOUT'])
+        # оценка считается по всей таблице, поэтому подходит только
+        # для списков без собственных условий (как у ресурсов)
+        if query.whereclause is None:
+            estimate = get_table_count_estimate(
+                query.session, self.model.__tablename__)
+            if (estimate is not None and estimate
+                    >= settings['LIST_COUNT_ESTIMATE_THRESHOLD']):
+                return estimate
+        cached = self._count_cache
+        if cached and time.monotonic() - cached[0] < settings[
+                'LIST_COUNT_CACHE_TTL']:
+            return cached[1]
+        count = get_quick_query_count(query)
+        self._count_cache = (time.monotonic(), count)
+        return count
+
+    def get_keyset_columns(self) -> list:
+        """Возвращает ключ keyset-пагинации - пары (столбец, по убыванию)
+        из column_default_sort, дополненные первичным ключом модели."""
+        if self._keyset_columns is None:
+            sort = self.column_default_sort
+            if isinstance(sort, str):
+                sort = [(sort, False)]
+            elif isinstance(sort, tuple):
+                sort = [sort]
+            columns = [(getattr(self.model, name), bool(desc))
+                       for name, desc in sort]
+            if self._primary_key not in [column.key for column, _ in columns]:
+                columns.append((getattr(self.model, self._primary_key),
+                                columns[-1][1] if columns else False))
+            self._keyset_columns = columns
+        return self._keyset_columns
+
+    def get_keyset_values(self, row) -> list:
+        """Возвращает значения ключа keyset-пагинации строки."""
+        return [getattr(row, column.key)
+                for column, _ in self.get_keyset_columns()]
+
+    def get_keyset_cursor(self) -> Optional[tuple]:
+        """Возвращает значения ключа строки из параметров after/before
+        запроса и признак перехода назад или None."""
+        for arg, backward in ((KEYSET_AFTER_ARG, False),
+                              (KEYSET_BEFORE_ARG, True)):
+            cursor = request.args.get(arg)
+            if cursor:
+                values = decode_keyset_cursor(cursor,
+                                              self.get_keyset_columns())
+                return (values, backward) if values else None
+        return None
+
+    def _apply_sorting(self, query, joins, sort_column, sort_desc):
+        """При сортировке по умолчанию результаты поиска по search_index
+        сортируются по релевантности, а список в режиме keyset_pagination -
+        по ключу keyset-пагинации."""
+        terms = query.get_execution_options().get('search_terms')
+        if sort_column is None and terms:
+            query = self.order_by_search_rank(query, terms)
+            query = query.order_by(
+                *get_keyset_order(self.get_keyset_columns()))
+            return query, joins
+        if not self.keyset_pagination or sort_column is not None:
+            return super(BaseModelView, self)._apply_sorting(
+                query, joins, sort_column, sort_desc)
+        query = query.order_by(*get_keyset_order(self.get_keyset_columns()))
+        return query.execution_options(keyset_pagination=True), joins
+
+    def _apply_pagination(self, query, page, page_size):
+        """Если ссылка на страницу содержит ключ соседней строки,
+        вместо OFFSET отбирает строки после (или до) нее по индексу."""
+        if page_size is None:
+            page_size = self.page_size
+        cursor = None
+        if (page and page_size and query.get_execution_options().get(
+                'keyset_pagination')):
+            cursor = self.get_keyset_cursor()
+        if cursor is None:
+            return super(BaseModelView, self)._apply_pagination(
+                query, page, page_size)
+        values, backward = cursor
+        columns = self.get_keyset_columns()
+        if backward:
+            query = (query.order_by(None)
+                     .order_by(*get_keyset_order(columns, reverse=True))
+                     .execution_options(keyset_backward=True))
+        return (query.filter(get_keyset_condition(columns, values, backward))
+                .limit(page_size))
+
+    def get_list(self, page, sort_column, sort_desc, search, filters,
+                 execute=True, page_size=None):
+        """В режиме keyset_pagination запоминает ключи первой и последней
+        строк страницы для ссылок на соседние страницы, а выгрузку всего
+        списка читает пачками по KEYSET_BATCH_SIZE строк."""
+        count, query = super(BaseModelView, self).get_list(
+            page, sort_column, sort_desc, search, filters,
+            execute=False, page_size=page_size)
+        options = query.get_execution_options()
+        if not execute:
+            return count, query
+        if not options.get('keyset_pagination'):
+            return count, query.all()
+        if page_size == 0:
+            return count, self.iter_keyset_rows(query)
+        data = query.all()
+        if options.get('keyset_backward'):
+            data.reverse()
+        if data:
+            g.keyset_page = dict(view=self.endpoint, page=page or 0,
+                                 search=search or None,
+                                 filters=filters or None,
+                                 first=self.get_keyset_values(data[0]),
+                                 last=self.get_keyset_values(data[-1]))
+        return count, data
+
+    def iter_keyset_rows(self, query):
+        """Выдает строки запроса, выбирая их пачками по ключу
+        keyset-пагинации, без OFFSET и без загрузки всего списка."""
+        columns = self.get_keyset_columns()
+        batch_query = query
+        while True:
+            rows = batch_query.limit(KEYSET_BATCH_SIZE).all()
+            yield from rows
+            if len(rows) < KEYSET_BATCH_SIZE:
+                return
+            batch_query = query.filter(get_keyset_condition(
+                columns, self.get_keyset_values(rows[-1])))
+
+    def _get_list_url(self, view_args):
+        """Добавляет к ссылкам на следующую и предыдущую страницы
+        ключ соседней строки текущей страницы."""
+        extra_args = {key: value for key, value in view_args.extra_args.items()
+                      if key not in (KEYSET_AFTER_ARG, KEYSET_BEFORE_ARG)}
+        current = g.get('keyset_page')
+        if (current and current['view'] == self.endpoint
+                and view_args.sort is None
+                and (view_args.search or None) == current['search']
+                and (view_args.filters or None) == current['filters']):
+            page = view_args.page or 0
+            if page == current['page'] + 1:
+                extra_args[KEYSET_AFTER_ARG] = encode_keyset_cursor(
+                    current['last'])
+            elif page and page == current['page'] - 1:
+                extra_args[KEYSET_BEFORE_ARG] = encode_keyset_cursor(
+                    current['first'])
+        return super(BaseModelView, self)._get_list_url(
+            view_args.clone(extra_args=extra_args))
+
+    def _export_tablib(self, export_type, return_url):
+        """Выгрузка в JSON выдается потоком по мере чтения строк
+        (сериализатором serializers.dumps), без сборки набора данных
+        tablib в памяти; остальные форматы выгружаются через tablib."""
+        if export_type != 'json':
+            return super()._export_tablib(export_type, return_url)
+
+        filename = self.get_export_name(export_type)
+        disposition = 'attachment;filename=%s' % (secure_filename(filename),)
+        titles = [csv_encode(c[1]) for c in self._export_columns]
+        count, data = self._export_data()
+
+        def generate():
+            yield b'['
+            for number, row in enumerate(data):
+                values = [csv_encode(self.get_export_value(row, c[0]))
+                          for c in self._export_columns]
+                yield (b',' if number else b'') + dumps(
+                    dict(zip(titles, values)))
+            yield b']'
+
+        return Response(stream_with_context(generate()),
+                        headers={'Content-Disposition': disposition},
+                        mimetype='application/json')
+
+    def get_eager_load_options(self) -> list:
+        """Возвращает опции загрузки связей из column_eager_load.
+        Для коллекций используется selectinload (один запрос на связь
+        для всей страницы), для ссылок на один объект - joinedload."""
+        options = []
+        for path in self.column_eager_load:
+            entity = self.model
+            loader = None
+            for attr_name in path.split('.'):
+                attr = getattr(entity, attr_name)
+                strategy = (selectinload if attr.property.uselist
+                            else joinedload)
+                loader = (strategy(attr) if loader is None
+                          else getattr(loader, strategy.__name__)(attr))
+                entity = attr.property.mapper.class_
+            options.append(loader)
+        return options
+
+    def get_query(self):
+        """Добавляет к SELECT-запросу списка загрузку связей,
+        которые используются при выводе столбцов."""
+        query = super(BaseModelView, self).get_query()
+        if self.column_eager_load:
+            query = query.options(*self.get_eager_load_options())
+        return query
 
     def get_filters(self) -> list:
         """Получает динамические фильтры."""
@@ -50,8 +365,20 @@ class BaseModelView(ModelView):
     can_export = True
     export_types = ['csv', 'json']
 
+    # индекс поиска (search.SearchIndex), заменяющий ILIKE
+    # по column_searchable_list
+    search_index = None
+
+    # связи, загружаемые вместе со списком (пути через точку),
+    # в дополнение к column_select_related_list
+    column_eager_load = ()
+
     # pagination
     can_set_page_size = True
+    # keyset-пагинация при сортировке по умолчанию: соседние страницы
+    # и выгрузка выбираются по ключу (column_default_sort и первичный
+    # ключ) без OFFSET; столбцы ключа не должны содержать NULL
+    keyset_pagination = False
     page_size = DEFAULT_PAGE_SIZE_CONST
 
     # modals
@@ -7,6 +7,7 @@ from ..extentions import db
 from ..filters import MessageIsMethodDoc
 from ..forms import validate_future_date
 from ..models import Message, Organization
+from ..search import messages_search, select_message_ids
 from ..views import forms_placeholders as dictionary
 from .markup_formatters import (children_list_formatter,
                                 methodical_docs_formatter, org_list_formatter,
@@ -59,6 +60,7 @@ class MessageModelView(BaseModelView):
 
     # LIST options
     column_default_sort = ('datetime_created', True)
+    keyset_pagination = True
     column_descriptions = dictionary.message_fields_descriptions
     column_filters = ['information', 'is_inbox',
                       'date_inbox_approved', 'number_inbox_approved',
@@ -103,6 +105,12 @@ class MessageModelView(BaseModelView):
                               'number_inbox_approved',
                               'organizations.db_name',
                               'organizations.short_name']
+    search_index = messages_search
+
+    def get_search_condition(self, term: str):
+        """Ищет слово в реквизитах письма и в названиях
+        и реквизитах организаций-адресатов."""
+        return Message.message_id.in_(select_message_ids(term))
 
     def search_placeholder(self):
         """Переопределяет текст, отображаемый в Поиске по модели письма."""
@@ -1,13 +1,14 @@
+import tempfile
 import zipfile
 from datetime import date
-from io import BytesIO
 from pathlib import Path
 
-from flask import send_file
+from flask import abort, send_file
 from flask_admin import expose
 from flask_wtf.file import FileField
 from wtforms.validators import InputRequired, ValidationError
 
+from ..blob_storage import method_docs_storage
 from ..extentions import db
 from ..models import MethodicalDoc
 from ..utils import create_prefix
@@ -40,7 +41,8 @@ class MethodDocModelView(BaseModelView):
     list_template = 'admin/method-doc_list.html'
 
     form_excluded_columns = ('messages', 'date_added', 'date_updated',
-                             'path_prefix', 'data', 'data_extension')
+                             'path_prefix', 'data_hash', 'data_size',
+                             'data_extension')
 
     form_extra_fields = {
         'file': FileField('Образ загружаемого документа')
@@ -60,6 +62,8 @@ class MethodDocModelView(BaseModelView):
         if is_created:
             model.path_prefix = create_prefix(model.name)
 
+        old_data_hash = model.data_hash
+        new_data_hash = None
         file = form.file.data
         if file:
             extensions = ''.join(Path(file.filename).suffixes)
@@ -67,14 +71,30 @@ class MethodDocModelView(BaseModelView):
                 raise ValidationError(
                     METHOD_DOC_BASE_FILE_FORMAT_TEXT
                 )
-            model.data = file.read()
+            new_data_hash, model.data_size = method_docs_storage.save(
+                file.stream)
+            model.data_hash = new_data_hash
             model.data_extension = extensions
         db.session.add(model)
         try:
             db.session.commit()
         except Exception:
             db.session.rollback()
+            if new_data_hash and new_data_hash != old_data_hash:
+                self.delete_unused_file(new_data_hash)
             raise ValidationError(METHODICAL_DOC_FILE_ERROR_MESSAGE)
+        if old_data_hash and old_data_hash != model.data_hash:
+            self.delete_unused_file(old_data_hash)
+
+    @staticmethod
+    def delete_unused_file(data_hash: str) -> None:
+        """Удаляет из хранилища файл <data_hash>, если на него
+        больше не ссылается ни один документ."""
+        is_used = db.session.query(
+            MethodicalDoc.query.filter_by(data_hash=data_hash).exists()
+        ).scalar()
+        if not is_used:
+            method_docs_storage.delete(data_hash)
 
     @expose('/<int:method_doc_id>/')
     def get_method_doc_file(self, method_doc_id: int):
@@ -84,28 +104,27 @@ class MethodDocModelView(BaseModelView):
                       .query(MethodicalDoc)
                       .get_or_404(method_doc_id)
                       )
-        return send_file(method_doc.get_file,
-                         attachment_filename=method_doc.get_file_name,
-                         as_attachment=True)
+        if method_doc.data_hash is None:
+            abort(404)
+        return method_docs_storage.send(method_doc.data_hash,
+                                        method_doc.get_file_name)
 
     @expose('/get_docs/')
     def get_all_method_docs(self):
         """Возвращает zip-архив с образами
         всех методических документов."""
         archive_name = f'{date.today()}-methodical-docs-archive.zip'
-        memory_archive = BytesIO()
+        archive = tempfile.TemporaryFile()
         method_docs = (db.session
                        .query(MethodicalDoc)
                        .filter(MethodicalDoc.is_active.is_(True))
                        .all()
                        )
 
-        with zipfile.ZipFile(memory_archive, 'w') as zf:
+        with zipfile.ZipFile(archive, 'w') as zf:
             for method_doc in method_docs:
-                data = zipfile.ZipInfo(method_doc.get_file_name)
-                data.compress_type = zipfile.ZIP_DEFLATED
-                zf.writestr(data, method_doc.get_file.read())
-        memory_archive.seek(0)
-        return send_file(memory_archive,
+                method_doc.write_to_archive(zf)
+        archive.seek(0)
+        return send_file(archive,
                          attachment_filename=archive_name,
                          as_attachment=True)
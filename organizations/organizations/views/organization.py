@@ -12,6 +12,7 @@ from flask_admin import expose
 from flask_admin.form.rules import FieldSet
 from wtforms.validators import Optional
 
+from ..choices_cache import get_cached_instance_choices
 from ..extentions import db
 from ..filters import (OrgDocumentsAndFilter, OrgHasAgreementFilter,
                        OrgOkrugFilter, OrgOkrugNotFilter, OrgRegionFilter,
@@ -22,8 +23,9 @@ from ..forms import (AddSubjectDocumentForm, SendMethodDocsToOrgForm,
 from ..lingva_master import LingvaMaster
 from ..models import (Contact, Message, MethodicalDoc, Okrug, OrgAdmDoc,
                       OrgAdmDocOrganization, Organization, Region)
+from ..search import organizations_search
 from ..utils import (cast_string_to_non_breaking_space, create_dot_pdf,
-                     create_pdf, get_alpha_num_string, get_instance_choices)
+                     create_pdf, get_alpha_num_string)
 from ..views import forms_placeholders as dictionary
 from .markup_formatters import org_name_formatter
 from .master import BaseModelView
@@ -90,6 +92,7 @@ class OrganizationModelView(BaseModelView):
 
     column_default_sort = [('date_updated', True),
                            ('full_name', False)]
+    keyset_pagination = True
 
     column_descriptions = dictionary.organization_fields_descriptions
 
@@ -113,6 +116,7 @@ class OrganizationModelView(BaseModelView):
 
     column_labels = dictionary.organization_fields_labels
     column_searchable_list = ['db_name', 'short_name', 'inn', 'kpp']
+    search_index = organizations_search
 
     def search_placeholder(self):
         """Переопределяет текст, отображаемый в Поиске
@@ -180,55 +184,48 @@ class OrganizationModelView(BaseModelView):
 
     form_widget_args = dictionary.organization_fields_placeholders
 
-    @expose('/')
-    def index_view(self):
-        """Расширяет view-класс для возможности обновления
-         динамических фильтров."""
-        self.dynamic_filters = []
-        self.dynamic_filters.extend(
-            [
-                OrgRegionFilter(
-                    None,
-                    name='Регион(-ы) организаций',
-                    options=get_instance_choices(Region,
-                                                 'region_id',
-                                                 'name')
-                ),
-                OrgRegionNotFilter(
-                    None,
-                    name='Регион(-ы) организаций',
-                    options=get_instance_choices(Region,
-                                                 'region_id',
-                                                 'name')
-                ),
-                OrgOkrugFilter(
-                    None,
-                    name='Округ(-и) организаций',
-                    options=get_instance_choices(Okrug,
-                                                 'okrug_id',
-                                                 'name')
-                ),
-                OrgOkrugNotFilter(
-                    None,
-                    name='Округ(-и) организаций',
-                    options=get_instance_choices(Okrug,
-                                                 'okrug_id',
-                                                 'name')
-                ),
-                OrgDocumentsAndFilter(
-                    None,
-                    name='Наличие документа(-ов)',
-                    options=get_instance_choices(
-                        OrgAdmDoc,
-                        'orgadm_id',
-                        'name',
-                        _name_limiter=ORGADM_DOC_NAME_CONST
-                    )
-                ),
-            ]
-        )
-        self._refresh_filters_cache()
-        return super(OrganizationModelView, self).index_view()
+    def get_dynamic_filters(self) -> list:
+        """Возвращает динамические фильтры по справочникам."""
+        return [
+            OrgRegionFilter(
+                None,
+                name='Регион(-ы) организаций',
+                options=get_cached_instance_choices(Region,
+                                                    'region_id',
+                                                    'name')
+            ),
+            OrgRegionNotFilter(
+                None,
+                name='Регион(-ы) организаций',
+                options=get_cached_instance_choices(Region,
+                                                    'region_id',
+                                                    'name')
+            ),
+            OrgOkrugFilter(
+                None,
+                name='Округ(-и) организаций',
+                options=get_cached_instance_choices(Okrug,
+                                                    'okrug_id',
+                                                    'name')
+            ),
+            OrgOkrugNotFilter(
+                None,
+                name='Округ(-и) организаций',
+                options=get_cached_instance_choices(Okrug,
+                                                    'okrug_id',
+                                                    'name')
+            ),
+            OrgDocumentsAndFilter(
+                None,
+                name='Наличие документа(-ов)',
+                options=get_cached_instance_choices(
+                    OrgAdmDoc,
+                    'orgadm_id',
+                    'name',
+                    _name_limiter=ORGADM_DOC_NAME_CONST
+                )
+            ),
+        ]
 
     @expose('/<int:org_id>/documents/', methods=['GET', 'POST'])
     def org_documents_view(self, org_id: int):
@@ -457,9 +454,7 @@ class OrganizationModelView(BaseModelView):
             try:
                 with zipfile.ZipFile(zip_path, 'w') as zf:
                     for chosen_method_doc in chosen_method_docs:
-                        data = zipfile.ZipInfo(chosen_method_doc.get_file_name)
-                        data.compress_type = zipfile.ZIP_DEFLATED
-                        zf.writestr(data, chosen_method_doc.get_file.read())
+                        chosen_method_doc.write_to_archive(zf)
                 application_file_name = os.path.basename(zip_path)
             except Exception as e:
                 flash(METHOD_DOC_ARCHIVE_NOT_CREATED_TEXT,
@@ -0,0 +1,20 @@
+from flask_admin.contrib.sqla import ModelView
+
+from .forms_placeholders import (region_alias_fields_descriptions,
+                                 region_alias_fields_labels)
+
+
+class RegionAliasModelView(ModelView):
+    """View-класс сопоставления названий регионов
+    из базы индексов АО \"Почты России\" регионам РФ."""
+    can_create = True
+    can_view_details = False
+    can_edit = True
+    can_delete = True
+
+    column_list = ['name', 'region']
+    column_labels = region_alias_fields_labels
+    column_descriptions = region_alias_fields_descriptions
+    column_searchable_list = ['name']
+    column_filters = ['region.name']
+    column_default_sort = 'name'
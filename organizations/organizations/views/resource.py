@@ -1,22 +1,18 @@
-import re
-
 from flask import flash
-from flask_admin import expose
 from flask_admin.contrib.sqla.ajax import QueryAjaxModelLoader
-from sqlalchemy import func
 
+from ..choices_cache import get_cached_instance_choices
 from ..extentions import db
 from ..filters import (ResourceIndustryFilter, ResourceOkrugFilter,
                        ResourceRegionFilter)
-from ..models import Address, Industry, Okrug, Organization, Region
-from ..utils import get_instance_choices
+from ..index_resolver import get_index_resolver
+from ..models import Industry, Okrug, Organization, Region
 from ..views import forms_placeholders as dictionary
 from .markup_formatters import org_list_formatter
 from .master import BaseModelView
 from .system_messages_for_user import FLASH_ERROR
 
 CHOOSE_SINGLE_ORG_TEXT = "Выберете организацию"
-INDEX_PATTERN = r"((?<!\d)\d{6}(?!\d))"
 RESOURCE_AJAX_OWNER_CONST = 3
 RESOURCE_NOT_DELETED_MSG = "Ресурсы не были удалены!"
 
@@ -38,8 +34,8 @@ class ResourceModelView(BaseModelView):
     def get_count_query(self):
         """Переопределяет COUNT(SELECT-запрос по умолчанию к БД)
         с целью исключить из подсчета количества ресурсов неактивные."""
-        return (self.session
-                .query(func.count('*'))
+        return (super(ResourceModelView, self)
+                .get_count_query()
                 .filter(self.model.is_active.is_(True))
                 )
 
@@ -47,21 +43,15 @@ class ResourceModelView(BaseModelView):
         """Переопределяет поведение создания и изменения ресурса.
          Определяет регионы в адресной строке по наличию
          почтовых индексов в ней."""
-        raw_address = model.factual_addresses
-        # TODO вместо None сохраняется пустая строка
-        if raw_address:
-            raw_address = raw_address.lower()
-            indexes = map(int,
-                          re.findall(INDEX_PATTERN, raw_address)
-                          )
-            regions = set()
-            for index in indexes:
-                address = db.session.query(Address).get(index)
-                if address:
-                    regions.add(address.region)
-            if regions:
-                model.regions.extend(list(regions))
-                db.session.commit()
+        region_ids = get_index_resolver().find_region_ids(
+            model.factual_addresses)
+        existing_ids = {region.region_id for region in model.regions}
+        new_ids = [region_id for region_id in region_ids
+                   if region_id not in existing_ids]
+        if new_ids:
+            model.regions.extend(
+                db.session.query(Region)
+                .filter(Region.region_id.in_(new_ids)).all())
 
     def delete_model(self, model):
         """Переопределяет поведение при удалении информационного
@@ -139,36 +129,29 @@ class ResourceModelView(BaseModelView):
                              'date_updated_to_fstec', 'outsource_org']
     form_widget_args = dictionary.resource_fields_placeholders
 
-    @expose('/')
-    def index_view(self):
-        """Расширяет view-класс для возможности обновления
-         динамических фильтров."""
-        self.dynamic_filters = []
-        self.dynamic_filters.extend(
-            [
-                ResourceOkrugFilter(
-                    None,
-                    name='Округа',
-                    options=get_instance_choices(Okrug,
-                                                 'okrug_id',
-                                                 'name')
-                ),
-                ResourceRegionFilter(
-                    None,
-                    name='Регион(-ы)',
-                    options=get_instance_choices(Region,
-                                                 'region_id',
-                                                 'name')
-                ),
-                ResourceIndustryFilter(
-                    None,
-                    name='Сферы',
-                    options=get_instance_choices(Industry,
-                                                 'industry_id',
-                                                 'name')
-                ),
-
-            ]
-        )
-        self._refresh_filters_cache()
-        return super(ResourceModelView, self).index_view()
+    def get_dynamic_filters(self) -> list:
+        """Возвращает динамические фильтры по справочникам."""
+        return [
+            ResourceOkrugFilter(
+                None,
+                name='Округа',
+                options=get_cached_instance_choices(Okrug,
+                                                    'okrug_id',
+                                                    'name')
+            ),
+            ResourceRegionFilter(
+                None,
+                name='Регион(-ы)',
+                options=get_cached_instance_choices(Region,
+                                                    'region_id',
+                                                    'name')
+            ),
+            ResourceIndustryFilter(
+                None,
+                name='Сферы',
+                options=get_cached_instance_choices(Industry,
+                                                    'industry_id',
+                                                    'name')
+            ),
+
+        ]
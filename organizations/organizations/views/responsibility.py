@@ -5,11 +5,11 @@ from flask import flash, redirect, request, url_for
 from flask_admin import expose
 from werkzeug.utils import secure_filename
 
+from ..choices_cache import get_cached_instance_choices
 from ..filters import RespResourceOkrugFilter, RespResourceRegionFilter
 from ..forms import AddXMLForm
 from ..models import Okrug, Region
 from ..tasks import aparse_xml
-from ..utils import get_instance_choices
 from ..views import forms_placeholders as dictionary
 from .markup_formatters import (cert_name_formatter, res_name_formatter,
                                 resp_org_name_formatter)
@@ -39,7 +39,10 @@ class ResponseModelView(BaseModelView):
                       'resource.org_owner.inn', 'cert.name',
                       'cert.org_owner.full_name', 'resource.name',
                       'resource.is_okii', 'resource.category']
+    column_default_sort = ('date_start', True)
+    keyset_pagination = True
     column_select_related_list = ['resource', 'cert', 'resource.org_owner']
+    column_eager_load = ('services',)
     column_formatters = {
         "resource.name": res_name_formatter,
         "cert.name": cert_name_formatter,
@@ -76,31 +79,24 @@ class ResponseModelView(BaseModelView):
                            'date_start', 'date_end', 'type', 'props',
                            'comment']
 
-    @expose('/')
-    def index_view(self):
-        """Расширяет view-класс для возможности обновления
-         динамических фильтров."""
-        self.dynamic_filters = []
-        self.dynamic_filters.extend(
-            [
-                RespResourceRegionFilter(
-                    None,
-                    name='Регион(-ы) расположения ресурса',
-                    options=get_instance_choices(Region,
-                                                 'region_id',
-                                                 'name')
-                ),
-                RespResourceOkrugFilter(
-                    None,
-                    name='Округ(-а) расположения ресурса',
-                    options=get_instance_choices(Okrug,
-                                                 'okrug_id',
-                                                 'name')
-                ),
-            ]
-        )
-        self._refresh_filters_cache()
-        return super(ResponseModelView, self).index_view()
+    def get_dynamic_filters(self) -> list:
+        """Возвращает динамические фильтры по справочникам."""
+        return [
+            RespResourceRegionFilter(
+                None,
+                name='Регион(-ы) расположения ресурса',
+                options=get_cached_instance_choices(Region,
+                                                    'region_id',
+                                                    'name')
+            ),
+            RespResourceOkrugFilter(
+                None,
+                name='Округ(-а) расположения ресурса',
+                options=get_cached_instance_choices(Okrug,
+                                                    'okrug_id',
+                                                    'name')
+            ),
+        ]
 
     @expose('/new/', methods=('GET', 'POST'))
     def create_view(self):
@@ -5,11 +5,10 @@ from flask import current_app as app
 from flask import flash, redirect, request, url_for
 from flask_admin import BaseView, expose
 
+from ..egrul import create_org_from_egrul, get_egrul_client
 from ..extentions import db
-from ..models import Organization, Region
-from ..utils import (INN_PATTERN, KPP_PATTERN, OGRN_PATTERN, check_response,
-                     check_retrieve_response, convert_from_json_to_dict,
-                     get_api_url)
+from ..models import Organization
+from ..utils import INN_PATTERN, KPP_PATTERN, OGRN_PATTERN, check_response
 
 
 def guess_search_term(term: str) -> dict:
@@ -37,16 +36,17 @@ class WorkspaceView(BaseView):
         """Описание view-функции поиска сведений в ЕГРЮЛ."""
         prev_url = request.form.get('prev_url')
         search_keyword = request.form['search_keyword']
+        client = get_egrul_client()
         url = (request.form.get('next_page')
                or request.form.get('prev_page')
-               or get_api_url('api/organizations/')
+               or client.get_url('api/organizations/')
                )
 
         params = guess_search_term(search_keyword)
         url += params.pop('url', '')
 
         try:
-            _request = requests.get(url, params=params)
+            response = client.search(params, url=url)
         except requests.exceptions.RequestException:
             app.logger.error('EGRUL API не доступен')
             flash(
@@ -55,7 +55,6 @@ class WorkspaceView(BaseView):
                          ' администратор уже оповещен и скоро починит!')
             )
             return redirect(prev_url)
-        response = convert_from_json_to_dict(_request)
 
         count = 0
         found_organizations = []
@@ -100,20 +99,8 @@ class WorkspaceView(BaseView):
         """Описание вью-функции добавления организации
         из ЕГРЮЛ в рабочее пространство."""
 
-        api_url = get_api_url(request.form['org_url'].lstrip('/'))
-        _request = requests.get(api_url)
-        response = convert_from_json_to_dict(_request)
-        response = check_retrieve_response(response)
-
-        new_org = Organization(
-            inn=response['inn'],
-            kpp=response['kpp'],
-            ogrn=response['ogrn'],
-            full_name=response['full_name'],
-            short_name=response.get("short_name") or response["full_name"],
-            factual_address=response['factual_address'],
-            region=db.session.query(Region).get(response['region_code'])
-        )
+        response = get_egrul_client().retrieve(request.form['org_url'])
+        new_org = create_org_from_egrul(response)
 
         try:
             db.session.add(new_org)
@@ -1,43 +1,161 @@
 import datetime
+import hashlib
 import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
 from typing import Optional
 
 import requests
+from flask import current_app as app
 from lxml import etree
+from sqlalchemy.exc import SQLAlchemyError
 
+from .bulk import insert_rows
+from .egrul import create_org_from_egrul, get_egrul_client
 from .extentions import db
+from .index_resolver import get_index_resolver
 from .models import (Cert, Contact, Organization, Region, Resource,
-                     Responsibility, Service)
-from .utils import (check_response, check_retrieve_response,
-                    convert_from_json_to_dict, get_api_url)
+                     Responsibility, Service, XMLImport, XMLImportZone,
+                     regions_resources_table,
+                     responsibilities_services_table)
+from .utils import chunked, generate_uuid
+
+# Ограничение на количество параметров в одном IN-запросе
+# (SQLite по умолчанию допускает не более 999 переменных)
+DB_IN_CHUNK_SIZE = 500
+
+# Размер блока при чтении файла для подсчета хеша
+HASH_BLOCK_SIZE = 1024 * 1024
+
+_schemas_cache = {}
+_schemas_lock = threading.Lock()
+
+
+def get_xml_schema(path: str) -> etree.XMLSchema:
+    """Возвращает скомпилированную XSD-схему. Схема компилируется один раз
+    на процесс и перечитывается с диска только при изменении файла."""
+
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    schema = _schemas_cache.get(key)
+    if schema is None:
+        with _schemas_lock:
+            schema = _schemas_cache.get(key)
+            if schema is None:
+                schema = etree.XMLSchema(etree.parse(path))
+                _schemas_cache.clear()
+                _schemas_cache[key] = schema
+    return schema
+
+
+def get_file_hash(path: str) -> str:
+    """Возвращает SHA-256 хеш содержимого файла."""
+
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def read_centre_key(path: str) -> Optional[tuple]:
+    """Возвращает кортеж (наименование центра, ИНН, КПП, ОГРН юр. лица
+    центра) из заголовка XML-файла, не читая файл целиком, или None,
+    если заголовок прочитать не удалось."""
+
+    try:
+        for _, elem in etree.iterparse(path, events=('start',),
+                                       tag='СвЮЛ'):
+            root = elem.getparent()
+            if root is None or root.getparent() is not None:
+                continue
+            return (root.get('НаимЦентр'), elem.get('ИНН'),
+                    elem.get('КПП'), elem.get('ОГРН'))
+    except etree.XMLSyntaxError:
+        pass
+    return None
+
+
+class ImportStats:
+    """Счетчики изменений в БД и время этапов обработки XML-файла."""
+
+    COUNTERS = (
+        ('zones', 'Тегов <ЕдЗО> в файле'),
+        ('zones_skipped', 'Тегов <ЕдЗО> не изменилось с прошлой загрузки'),
+        ('zones_failed', 'Тегов <ЕдЗО> не записано в БД'),
+        ('orgs_found', 'Юр. лиц найдено в БД'),
+        ('orgs_created', 'Юр. лиц создано из ЕГРЮЛ'),
+        ('orgs_not_found', 'Юр. лиц не найдено ни в БД, ни в ЕГРЮЛ'),
+        ('contacts_deleted', 'Контактов удалено'),
+        ('contacts_created', 'Контактов создано'),
+        ('resources_found', 'Ресурсов найдено в БД'),
+        ('resources_created', 'Ресурсов создано'),
+        ('resources_updated', 'Ресурсов с измененными регионами'),
+        ('resps_created', 'Единиц зоны ответственности создано'),
+        ('resps_skipped', 'Единиц зоны ответственности уже имеется в БД'),
+    )
+    PHASES = (
+        ('validate', 'Валидация XML'),
+        ('parse', 'Разбор тегов <ЕдЗО>'),
+        ('resolve_orgs', 'Поиск юр. лиц и ресурсов в БД'),
+        ('egrul', 'Поиск юр. лиц в ЕГРЮЛ'),
+        ('write', 'Запись в БД'),
+    )
+
+    def __init__(self) -> None:
+        self.counters = Counter()
+        self.timings = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Учитывает время выполнения блока кода в этапе <name>."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+
+    def report(self) -> list:
+        """Возвращает строки сводки по результатам обработки."""
+
+        lines = [f'{label}: {self.counters[name]}'
+                 for name, label in self.COUNTERS]
+        lines.extend(f'{label}: {self.timings[name]:.3f} с'
+                     for name, label in self.PHASES
+                     if name in self.timings)
+        return lines
 
 
 class XMLValidator:
-    def __init__(self, schema, file, logger) -> None:
+    def __init__(self, schema, file, logger, stream=False) -> None:
         self.schema = schema
         self.file = file
         self.logger = logging.getLogger(logger)
+        self.stream = stream
+        self.tree = None
 
     def get_xml_root(self):
         """Возвращает древо элементов XML-файла."""
 
-        return etree.parse(self.file)
+        if self.tree is None:
+            self.tree = etree.parse(self.file)
+        return self.tree
 
     def get_schema_root(self):
-        """Возвращает древо элементов XSD-схемы."""
+        """Возвращает скомпилированную XSD-схему."""
         try:
-            schema_root = etree.parse(self.schema)
-        except OSError:
+            return get_xml_schema(self.schema)
+        except (OSError, etree.XMLSyntaxError, etree.XMLSchemaParseError):
             self.logger.error("Не удалось загрузить схему")
             return None
-        else:
-            return etree.XMLSchema(schema_root)
 
     def check_xml_syntax(self) -> bool:
         """Возвращает результат проверки синтаксиса XML."""
 
         try:
-            etree.parse(self.file)
+            self.get_xml_root()
         except IOError as e:
             self.logger.error(f'Ошибка файловой системы {str(e)}')
             return False
@@ -63,10 +181,35 @@ class XMLValidator:
             self.logger.error(f'Строка: {error.line}. Ошибка: {error.message}')
         return False
 
+    def check_xml_stream(self) -> bool:
+        """Возвращает результат проверки синтаксиса XML и соответствия
+        XML схеме за один потоковый проход по файлу."""
+
+        schema = self.get_schema_root()
+        if not schema:
+            return False
+        try:
+            for _, elem in etree.iterparse(self.file, schema=schema):
+                elem.clear()
+        except IOError as e:
+            self.logger.error(f'Ошибка файловой системы {str(e)}')
+            return False
+        except etree.XMLSyntaxError as e:
+            self.logger.error('Ошибка синтаксиса XML или соответствия '
+                              f'XML-файла XSD-схеме {str(e)}')
+            return False
+        self.logger.info('Синтаксис XML ок')
+        self.logger.info('XML соответствует схеме')
+        return True
+
     def validate(self) -> bool:
         """Возвращает результат валидации XML-файла."""
 
-        if self.check_xml_syntax() and self.check_xml_schema():
+        if self.stream:
+            xml_ok = self.check_xml_stream()
+        else:
+            xml_ok = self.check_xml_syntax() and self.check_xml_schema()
+        if xml_ok:
             self.logger.info('Валидация XML успешно завершена')
             return True
         self.logger.error('Ошибка валидации XML файла. Выход')
@@ -75,21 +218,200 @@ class XMLValidator:
 
 class XMLParser:
 
-    def __init__(self, schema, file, logger) -> None:
+    def __init__(self, schema, file, logger, stream=False, tree=None,
+                 chunk_size=None, file_hash=None, force=False,
+                 dry_run=False, stats=None) -> None:
         self.schema = schema
         self.file = file
         self.regions = self.get_regions()
+        self.index_resolver = get_index_resolver()
         self.logger = logging.getLogger(logger)
+        self.stream = stream
+        self.tree = tree
+        self.chunk_size = (chunk_size
+                           or app.config['BUSINESS_LOGIC']['XML_CHUNK_SIZE'])
+        self.services = self.get_services()
+        self.orgs = {}
+        self.resources = {}
+        self.egrul_orgs = {}
+        self.egrul_new_orgs = {}
+        self.file_hash = file_hash
+        self.force = force
+        self.owner_key = None
+        self.cert_id = None
+        self.zone_hashes = set()
+        self.org_hashes = {}
+        self.org_zones_left = Counter()
+        self.changed_orgs = set()
+        self.failed_orgs = set()
+        self.dry_run = dry_run
+        self.stats = stats or ImportStats()
+        self.zone_stats = Counter()
 
     def get_xml_root(self):
-        """Возвращает древо элементов XML-файла."""
+        """Возвращает древо элементов XML-файла. Если файл уже был
+        разобран при валидации, повторно его не читает."""
+
+        if self.tree is None:
+            self.tree = etree.parse(self.file)
+        return self.tree
+
+    @staticmethod
+    def get_regions() -> set:
+        """Возвращает множество идентификаторов регионов."""
+
+        return {region_id for region_id, in db.session.query(Region.region_id)}
+
+    @staticmethod
+    def get_services() -> dict:
+        """Возвращает словарь услуг вида {name: service_id}."""
+
+        services = {}
+        for service_id, name in (db.session
+                                 .query(Service.service_id, Service.name)
+                                 .order_by(Service.service_id)):
+            services.setdefault(name, service_id)
+        return services
+
+    @staticmethod
+    def get_resource_key(org_id, name, factual_addresses,
+                         fstec_reg_number, category, is_okii) -> tuple:
+        """Возвращает ключ ресурса для поиска в карте ресурсов."""
+
+        return (org_id, name, factual_addresses, fstec_reg_number,
+                None if category is None else str(category), bool(is_okii))
+
+    def prefetch(self, org_issues: list) -> None:
+        """Заполняет карты организаций и ресурсов сведениями из БД.
+        Вместо запроса на каждый тег <ЕдЗО> и <СвОбкт> выполняет
+        несколько запросов вида IN по всем организациям файла."""
+
+        keys = {(org['inn'], org['kpp'], org['ogrn']) for org in org_issues}
+        keys.difference_update(self.orgs)
+        if not keys:
+            return
+        with self.stats.phase('resolve_orgs'):
+            self.prefetch_db(keys)
+        with self.stats.phase('egrul'):
+            self.prefetch_egrul()
+
+    def prefetch_db(self, keys: set) -> None:
+        """Заполняет карты организаций и ресурсов сведениями из БД
+        по ключам организаций вида (ИНН, КПП, ОГРН)."""
+
+        self.logger.info(f'Ищу юридические лица ({len(keys)} шт.) в БД')
+        org_ids = set()
+        for inns in chunked(sorted({key[0] for key in keys}),
+                            DB_IN_CHUNK_SIZE):
+            orgs = (db.session
+                    .query(Organization.org_id, Organization.inn,
+                           Organization.kpp, Organization.ogrn)
+                    .filter(Organization.inn.in_(inns))
+                    .order_by(Organization.org_id))
+            for org_id, *key in orgs:
+                key = tuple(key)
+                if key in keys and not self.orgs.get(key):
+                    self.orgs[key] = org_id
+                    org_ids.add(org_id)
+        for key in keys:
+            self.orgs.setdefault(key, None)
+        self.logger.info(f'Найдено в БД юридических лиц: {len(org_ids)}')
+        self.stats.counters['orgs_found'] += len(org_ids)
+
+        for ids in chunked(sorted(org_ids), DB_IN_CHUNK_SIZE):
+            resources = (db.session
+                         .query(Resource.resource_id, Resource.org_id,
+                                Resource.name, Resource.factual_addresses,
+                                Resource.fstec_reg_number, Resource.category,
+                                Resource.is_okii)
+                         .filter(Resource.org_id.in_(ids))
+                         .order_by(Resource.resource_id))
+            for res_id, *res_info in resources:
+                key = self.get_resource_key(*res_info)
+                self.resources.setdefault(key, res_id)
+        self.logger.info('Найдено в БД ресурсов этих юридических лиц: '
+                         f'{len(self.resources)}')
+
+    def iter_zones(self):
+        """Перебирает теги <ЕдЗО> файла. В потоковом режиме прочитанные
+        теги удаляются из памяти."""
+
+        if not self.stream:
+            yield from self.get_xml_root().getroot().iterfind(
+                'СвЗонаОтв/ЕдЗО')
+            return
+        for _, elem in etree.iterparse(self.file, tag='ЕдЗО'):
+            yield elem
+            self.clear_element(elem)
+
+    def collect_zone_orgs(self) -> list:
+        """Считает хеши сведений юр. лиц файла и возвращает реквизиты
+        юр. лиц, сведения которых изменились с прошлой загрузки.
+        Хеш сведений юр. лица считается по всем его тегам <ЕдЗО>
+        в порядке следования в файле: если изменился, добавился или
+        пропал хотя бы один тег, заново обрабатываются все теги юр. лица,
+        и его контакты заменяются так же, как при загрузке файла целиком."""
+
+        org_hashes = {}
+        org_issues = {}
+        for zone in self.iter_zones():
+            tag = zone.find('СвЗОЮЛ')
+            key = self.get_org_issues_key(tag)
+            if key not in org_hashes:
+                org_hashes[key] = hashlib.sha256()
+                org_issues[key] = self.get_org_issues(tag)
+            org_hashes[key].update(self.get_zone_hash(zone).encode())
+            self.org_zones_left[key] += 1
+        self.org_hashes = {key: org_hash.hexdigest()
+                           for key, org_hash in org_hashes.items()}
+        self.changed_orgs = {key for key, org_hash in self.org_hashes.items()
+                             if org_hash not in self.zone_hashes
+                             or key == self.owner_key}
+        return [org_issues[key] for key in org_hashes
+                if key in self.changed_orgs]
+
+    @staticmethod
+    def get_zone_hash(zone) -> str:
+        """Возвращает SHA-256 хеш канонической формы тега <ЕдЗО>."""
 
-        return etree.parse(self.file)
+        return hashlib.sha256(
+            etree.tostring(zone, method='c14n')).hexdigest()
 
     @staticmethod
-    def get_regions():
-        # session.scalars(query).all()
-        return [code for code, in db.session.query(Region.region_id).all()]
+    def get_zone_hashes(cert_id: int) -> set:
+        """Возвращает хеши сведений юр. лиц, загруженных ранее
+        для центра."""
+
+        return {zone_hash for zone_hash, in (
+            db.session
+            .query(XMLImportZone.zone_hash)
+            .filter(XMLImportZone.cert_id == cert_id))}
+
+    def read_zone(self, zone) -> Optional[dict]:
+        """Возвращает сведения тега <ЕдЗО> для записи в БД или None,
+        если сведения юр. лица не изменились с прошлой загрузки или
+        тег не может быть записан в БД. Теги юр. лица центра
+        обрабатываются всегда, так как его контакты перезаписываются
+        при каждой загрузке."""
+
+        self.stats.counters['zones'] += 1
+        org_key = self.get_org_issues_key(zone.find('СвЗОЮЛ'))
+        if org_key not in self.changed_orgs:
+            self.stats.counters['zones_skipped'] += 1
+            return None
+        zone_info = self.parse_zone(zone)
+        if not zone_info:
+            self.stats.counters['zones_failed'] += 1
+            self.failed_orgs.add(org_key)
+            return None
+        zone_info['org_key'] = org_key
+        return zone_info
+
+    @staticmethod
+    def get_org_issues_key(tag) -> tuple:
+        """Возвращает кортеж (ИНН, КПП, ОГРН) из XML-элемента <tag>."""
+
+        return tag.get('ИНН'), tag.get('КПП'), tag.get('ОГРН')
 
     @staticmethod
     def get_org_issues(tag) -> dict:
@@ -111,9 +433,20 @@ class XMLParser:
         region_code = tag.find('КодРегион').text
 
         if int(region_code) not in self.regions:
-            self.logger.warning(f'Код региона {region_code} не найден в БД. '
-                                f'Присваиваю код региона = 99')
-            region_code = '99'
+            region_id = None
+            if tag.find('Индекс') is not None:
+                region_id = self.index_resolver.get_region_id(
+                    tag.find('Индекс').text)
+            if region_id is not None:
+                self.logger.warning(
+                    f'Код региона {region_code} не найден в БД. Присваиваю '
+                    f'код региона по почтовому индексу = {region_id}')
+                region_code = str(region_id)
+            else:
+                self.logger.warning(
+                    f'Код региона {region_code} не найден в БД. '
+                    f'Присваиваю код региона = 99')
+                region_code = '99'
 
         region_name = tag.find('НаимРегион').text
         address = tag.find('Адрес').text
@@ -188,18 +521,16 @@ class XMLParser:
             "comment": comment
         }
 
-    def create_contacts(self, root, tag, org) -> list:
-        """Возвращает список объектов типа Contact."""
+    def parse_contacts(self, root, tag) -> list:
+        """Возвращает список словарей контактов из тегов <tag>."""
 
         self.logger.info(f'Запускаю парсер тега с контактами <{tag}>')
 
-        center_contacts = []
-        for contact in root.findall(tag):
-            cur_contact = self.parse_contact(contact)
-            center_contacts.append(Contact(org_id=org, **cur_contact))
+        contacts = [self.parse_contact(contact)
+                    for contact in root.findall(tag)]
 
-        self.logger.info(f'Найдено контактов: {len(center_contacts)}')
-        return center_contacts
+        self.logger.info(f'Найдено контактов: {len(contacts)}')
+        return contacts
 
     def get_org_from_db(self,
                         inn: str,
@@ -234,100 +565,95 @@ class XMLParser:
         self.logger.info(f'Создаю сущность {model.__name__} {name}')
         return model(**kwargs)
 
-    def get_org_from_egrul(self, inn: str) -> Optional[Organization]:
-        """Возвращает объект организации из ЕГРЮЛ API или None."""
+    def prefetch_egrul(self) -> None:
+        """Параллельно запрашивает в ЕГРЮЛ сведения обо всех
+        юр. лицах файла, которые не найдены в БД."""
 
-        self.logger.info(f'Ищу юр. лицо (ИНН {inn}) в ЕГРЮЛ')
+        inns = sorted({key[0] for key, org in self.orgs.items()
+                       if org is None} - set(self.egrul_orgs))
+        if not inns:
+            return
+        self.logger.info(f'Ищу юридические лица ({len(inns)} шт.) в ЕГРЮЛ')
+        self.egrul_orgs.update(
+            get_egrul_client().find_orgs(inns, logger=self.logger))
+        found = sum(1 for inn in inns if self.egrul_orgs[inn])
+        self.logger.info(f'Найдено в ЕГРЮЛ юридических лиц: {found}')
+        self.stats.counters['orgs_not_found'] += len(inns) - found
 
-        url = get_api_url('api/organizations/')
-        params = {"inn": inn, "is_main": True}
+    def find_org_in_egrul(self, inn: str) -> bool:
+        """Возвращает признак наличия организации в ЕГРЮЛ."""
 
-        try:
-            self.logger.info(f'Отправляю поисковый запрос на {url} с '
-                             f'параметрами {params}')
-            _request = requests.get(url, params=params)
-
-        except requests.exceptions.RequestException:
-            self.logger.warning('ЕГРЮЛ недоступен')
-            return None
-
-        response = convert_from_json_to_dict(_request)
-        if response:
-            orgs = check_response(response)
-            if orgs:
-
-                url = get_api_url(orgs[0]['relative_addr'].lstrip('/'))
-
-                try:
-                    _request = requests.get(url)
-
-                except requests.exceptions.RequestException:
-                    self.logger.warning('ЕГРЮЛ недоступен')
-                    return None
-
-                response = convert_from_json_to_dict(_request)
-                response = check_retrieve_response(response)
-
-                new_org = Organization(
-                    inn=response['inn'],
-                    kpp=response['kpp'],
-                    ogrn=response['ogrn'],
-                    full_name=response['full_name'],
-                    short_name=response.get("short_name") or response[
-                        "full_name"],
-                    factual_address=response['factual_address'],
-                    region=db.session.query(Region).get(
-                        response['region_code'])
-                )
-                return new_org
+        self.logger.info(f'Ищу юр. лицо (ИНН {inn}) в ЕГРЮЛ')
 
-        return None
+        if inn not in self.egrul_orgs:
+            try:
+                self.egrul_orgs[inn] = get_egrul_client().find_org(inn)
+            except requests.exceptions.RequestException:
+                self.logger.warning('ЕГРЮЛ недоступен')
+                return False
+        return bool(self.egrul_orgs[inn])
 
-    def find_org_from_db_or_egrul(
+    def find_org_id_from_db_or_egrul(
             self,
             inn: str,
             ogrn: str,
-            kpp: str) -> Optional[Organization]:
-        """Возвращает организацию либо из БД, либо из ЕГРЮЛ."""
-
-        org = self.get_org_from_db(inn=inn,
-                                   ogrn=ogrn,
-                                   kpp=kpp)
-        if org:
+            kpp: str) -> Optional[int]:
+        """Возвращает идентификатор организации из БД. Если организации
+        нет в БД, но она есть в ЕГРЮЛ, возвращает 0: такая организация
+        будет создана при записи тега <ЕдЗО> в БД."""
+
+        key = (inn, kpp, ogrn)
+        if key not in self.orgs:
+            org = self.get_org_from_db(inn=inn, ogrn=ogrn, kpp=kpp)
+            self.orgs[key] = org.org_id if org else None
+        org_id = self.orgs[key]
+        if org_id:
             self.logger.info(f'Юр. лицо (ИНН {inn}) обнаружено в БД ')
-            return org
+            return org_id
 
         self.logger.info(f'Не удалось найти юр. лицо (ИНН {inn}) в БД ')
 
-        org_from_egrul = self.get_org_from_egrul(inn=inn)
-        if org_from_egrul:
-            return org_from_egrul
+        if inn in self.egrul_new_orgs or self.find_org_in_egrul(inn=inn):
+            return 0
         self.logger.info(f'Не удалось найти юр. лицо (ИНН {inn}) в ЕГРЮЛ ')
         return None
 
-    @staticmethod
-    def get_regions_from_xml(region_codes: list) -> list:
-        """Возвращает список объектов типа Region."""
-
-        regions = []
+    def create_orgs_from_egrul(self, inns: set) -> dict:
+        """Создает в БД организации из ЕГРЮЛ по списку ИНН.
+        Возвращает словарь вида {inn: org_id}."""
+
+        new_orgs = {inn: create_org_from_egrul(self.egrul_orgs[inn])
+                    for inn in sorted(inns)}
+        if not new_orgs:
+            return {}
+        self.logger.info('Создаю юр. лица из ЕГРЮЛ: '
+                         f'{", ".join(new_orgs)}')
+        self.zone_stats['orgs_created'] += len(new_orgs)
+        db.session.add_all(new_orgs.values())
+        db.session.flush()
+        return {inn: org.org_id for inn, org in new_orgs.items()}
+
+    def get_region_ids_from_xml(self, region_codes: list) -> list:
+        """Возвращает список идентификаторов регионов."""
+
+        region_ids = []
         for region_code in region_codes:
-            cur_region = db.session.query(Region).get(region_code)
-            if cur_region:
-                regions.append(cur_region)
-        return regions
+            region_id = int(region_code)
+            if region_id in self.regions and region_id not in region_ids:
+                region_ids.append(region_id)
+        return region_ids
 
-    def get_services_from_xml(self, services) -> list:
-        """Возвращает список объектов типа Service."""
+    def get_service_ids_from_xml(self, services) -> list:
+        """Возвращает список идентификаторов услуг."""
 
-        new_services = []
+        service_ids = []
         for service in services:
-            cur_service = db.session.query(Service).filter(
-                Service.name == service.text).first()
-            if cur_service:
-                new_services.append(cur_service)
+            service_id = self.services.get(service.text)
+            if service_id and service_id not in service_ids:
+                service_ids.append(service_id)
 
-        self.logger.info(f'Найдено услуг: {len(new_services)}')
-        return new_services
+        self.logger.info(f'Найдено услуг: {len(service_ids)}')
+        return service_ids
 
     @staticmethod
     def parse_kii(tag) -> dict:
@@ -349,11 +675,11 @@ class XMLParser:
             "is_okii": is_okii
         }
 
-    def parse(self) -> bool:
-        """Основной метод класса. Парсит XML-файл."""
+    def parse_header(self, root):
+        """Обрабатывает сведения о центре из корневого XML-элемента <root>.
+        Возвращает кортеж (org_id владельца центра, cert_id центра)
+        или None."""
 
-        tree = self.get_xml_root()
-        root = tree.getroot()
         cent_info = root.attrib
         date_form = datetime.date.fromisoformat(cent_info['ДатаФорм'])
         cent_name, cent_klass = cent_info['НаимЦентр'], cent_info['КлассЦентр']
@@ -364,139 +690,501 @@ class XMLParser:
 
         if not owner:
             self.logger.error('Юр. лицо центра не найдено. Выход')
-            return False
+            return None
 
         if not owner.date_agreement:
             self.logger.error('У юр. лица центра отсутствует'
                               ' соглашение. Выход')
-            return False
+            return None
 
         cent_address_info = self.parse_address(root.find('СвЦентрАдр'))
         cent_mailing_address = cent_address_info['address']
         owner.mailing_address = cent_mailing_address
-        owner.com_contacts.delete()
-        cent_contacts = self.create_contacts(root=root, tag='СвЦентрКонт',
-                                             org=owner)
-        owner.com_contacts = cent_contacts
+        self.stats.counters['contacts_deleted'] += (
+            owner.com_contacts.delete())
+        cent_contacts = self.parse_contacts(root=root, tag='СвЦентрКонт')
+        self.stats.counters['contacts_created'] += insert_rows(
+            Contact, [dict(contact, org_id=owner.org_id)
+                      for contact in cent_contacts])
         db.session.add(owner)
         cert = self.get_instance_from_db_or_create(
             Cert, name=cent_name, org_owner=owner)
         cert.date_actual_resp, cert.type = date_form, cent_klass
         db.session.add(cert)
+        db.session.flush()
+        self.owner_key = (owner_org['inn'], owner_org['kpp'],
+                          owner_org['ogrn'])
+        self.cert_id = cert.cert_id
+        if not self.force:
+            self.zone_hashes = self.get_zone_hashes(cert.cert_id)
+        return owner.org_id, cert.cert_id
+
+    def parse_zone(self, zone) -> Optional[dict]:
+        """Разбирает XML-элемент <ЕдЗО>. Возвращает словарь со сведениями
+        о юр. лице, его контактах и ресурсах для записи в БД или None."""
+
+        zone_org_from_xml = self.get_org_issues(zone.find('СвЗОЮЛ'))
+        org_inn, org_kpp, org_ogrn, org_name = zone_org_from_xml.values()
+        org_id = self.find_org_id_from_db_or_egrul(
+            inn=org_inn,
+            kpp=org_kpp,
+            ogrn=org_ogrn)
+
+        if org_id is None:
+            self.logger.error(
+                f'Не удалось найти юр. лицо {org_name} (ИНН/КПП {org_inn}'
+                f'/{org_kpp}). Перехожу к следующему тегу <ЕдЗО>')
+            return None
 
-        zone_root = root.find('СвЗонаОтв')
-        if zone_root.find('ЕдЗО') is None:
-            self.logger.info('Зона ответственности отсутствует. Штатный выход')
-            db.session.commit()
-            return True
+        org_contacts = self.parse_contacts(root=zone, tag='СвЗОКонтЮЛ')
+
+        self.logger.info('Начинаю парсинг ресурсов')
+
+        resources = []
+        for res_root in zone.find('СвЗООбктЮЛ').findall('СвОбкт'):
+            res_name = res_root.attrib['Наим']
+            kii_info = self.parse_kii(res_root.find('СвКИИ'))
+
+            res_formatted_address = []
+            res_codes = []
+            res_addresses = res_root.findall('СвАдрРазм/АдрРазмОбкт')
+            for res_address in res_addresses:
+                res_address_info = self.parse_address(res_address)
+                res_formatted_address.append(res_address_info['address'])
+                res_codes.append(res_address_info['region_code'])
+            res_category = kii_info['category']
+
+            doc_info = self.parse_document(res_root.find('СвДокумент'))
+            self.logger.info('Реквизиты документа успешно обработаны')
+
+            resources.append({
+                'resource': {
+                    'name': res_name,
+                    'factual_addresses': "; ".join(res_formatted_address),
+                    'fstec_reg_number': kii_info['fstec_reg_number'],
+                    'category': (None if res_category is None
+                                 else int(res_category)),
+                    'is_okii': kii_info['is_okii']
+                },
+                'regions': self.get_region_ids_from_xml(res_codes),
+                'document': doc_info,
+                'services': self.get_service_ids_from_xml(
+                    res_root.findall('СвФункции/Функция'))
+            })
+            self.logger.info(f'Ресурс {res_name} успешно обработан')
 
-        zones = zone_root.findall('ЕдЗО')
-        self.logger.info('Начинаю парсинг тега <ЕдЗО>')
+        return {
+            'org_id': org_id,
+            'inn': org_inn,
+            'contacts': org_contacts,
+            'resources': resources
+        }
+
+    def write_zones(self, zones: list, owner_id: int, cert_id: int) -> int:
+        """Записывает в БД разобранные теги <ЕдЗО> одной пачкой внутри
+        SAVEPOINT. Если пачку записать не удалось, записывает теги
+        по одному, каждый в своем SAVEPOINT, пропуская ошибочные.
+        Возвращает количество записанных тегов."""
+
+        if not zones:
+            return 0
+        self.logger.info(f'Записываю в БД теги <ЕдЗО> ({len(zones)} шт.)')
+        try:
+            self.write_zones_savepoint(zones, owner_id, cert_id)
+            return len(zones)
+        except SQLAlchemyError as e:
+            self.logger.error(f'Ошибка записи пачки тегов <ЕдЗО>: {e}. '
+                              'Записываю теги по одному')
+
+        written = 0
         for zone in zones:
-            zone_org_from_xml = self.get_org_issues(zone.find('СвЗОЮЛ'))
-            org_inn, org_kpp, org_ogrn, org_name = zone_org_from_xml.values()
-            zone_org = self.find_org_from_db_or_egrul(
-                inn=org_inn,
-                kpp=org_kpp,
-                ogrn=org_ogrn)
-
-            if not zone_org:
+            try:
+                self.write_zones_savepoint([zone], owner_id, cert_id)
+                written += 1
+            except SQLAlchemyError as e:
+                self.failed_orgs.add(zone['org_key'])
                 self.logger.error(
-                    f'Не удалось найти юр. лицо {org_name} (ИНН/КПП {org_inn}'
-                    f'/{org_kpp}). Перехожу к следующему тегу <ЕдЗО>')
-                continue
-
-            org_contacts = self.create_contacts(
-                root=zone, tag='СвЗОКонтЮЛ', org=zone_org)
+                    f'Не удалось записать тег <ЕдЗО> юр. лица (ИНН '
+                    f'{zone["inn"]}): {e}. Перехожу к следующему тегу <ЕдЗО>')
+        return written
+
+    def get_written_org_hashes(self, zones_counts: Counter) -> list:
+        """Возвращает хеши сведений юр. лиц, последние теги <ЕдЗО>
+        которых записываются пачкой (<zones_counts> - количество тегов
+        пачки по юр. лицам), если все их теги записаны без ошибок."""
+
+        return [self.org_hashes[key] for key, count in zones_counts.items()
+                if self.org_zones_left[key] == count
+                and key not in self.failed_orgs]
+
+    def write_zones_savepoint(self, zones: list,
+                              owner_id: int, cert_id: int) -> None:
+        """Записывает теги <ЕдЗО> в БД внутри SAVEPOINT. Карты организаций
+        и ресурсов, а также счетчики изменений дополняются только после
+        успешной записи. Хеш сведений юр. лица записывается в журнал
+        вместе с последним из его тегов <ЕдЗО>."""
+
+        self.zone_stats = Counter()
+        zones_counts = Counter(zone['org_key'] for zone in zones)
+        with db.session.begin_nested():
+            new_orgs = self.create_orgs_from_egrul(
+                {zone['inn'] for zone in zones if not zone['org_id']}
+                - set(self.egrul_new_orgs))
+            zones = [dict(zone, org_id=(zone['org_id']
+                                        or self.egrul_new_orgs.get(zone['inn'])
+                                        or new_orgs[zone['inn']]))
+                     for zone in zones]
+            self.write_contacts(zones, owner_id)
+            zone_resources, new_resources = self.write_resources(zones)
+            self.write_resources_regions(zone_resources)
+            self.write_responsibilities(zone_resources, cert_id)
+            insert_rows(XMLImportZone,
+                        [{'cert_id': cert_id, 'zone_hash': org_hash}
+                         for org_hash
+                         in self.get_written_org_hashes(zones_counts)],
+                        ignore_conflicts=True)
+        self.org_zones_left.subtract(zones_counts)
+        self.egrul_new_orgs.update(new_orgs)
+        self.resources.update(new_resources)
+        self.stats.counters.update(self.zone_stats)
+
+    def write_contacts(self, zones: list, owner_id: int) -> None:
+        """Заменяет контакты юр. лиц пачки. Контакты юр. лица центра
+        дополняются, для остальных юр. лиц сохраняются контакты
+        последнего тега <ЕдЗО>."""
+
+        owner_contacts = []
+        org_contacts = {}
+        for zone in zones:
+            org_id = zone['org_id']
+            contacts = [dict(contact, org_id=org_id)
+                        for contact in zone['contacts']]
+            if org_id == owner_id:
+                owner_contacts.extend(contacts)
+            else:
+                org_contacts[org_id] = contacts
+
+        for org_ids in chunked(sorted(org_contacts), DB_IN_CHUNK_SIZE):
+            result = db.session.execute(
+                Contact.__table__.delete()
+                .where(Contact.org_id.in_(org_ids)))
+            self.zone_stats['contacts_deleted'] += result.rowcount
+        for contacts in org_contacts.values():
+            owner_contacts.extend(contacts)
+        self.zone_stats['contacts_created'] += insert_rows(
+            Contact, owner_contacts)
+
+    def write_resources(self, zones: list) -> tuple:
+        """Создает отсутствующие в БД ресурсы пачки. Возвращает список пар
+        (resource_id, сведения о ресурсе из XML) и словарь созданных
+        ресурсов вида {ключ ресурса: resource_id}."""
+
+        new_resources = {}
+        zone_resources = []
+        for zone in zones:
+            org_id = zone['org_id']
+            for res in zone['resources']:
+                key = self.get_resource_key(org_id, **res['resource'])
+                if key not in self.resources and key not in new_resources:
+                    new_resources[key] = dict(
+                        res['resource'], org_id=org_id, uuid=generate_uuid())
+                zone_resources.append((key, res))
+
+        self.zone_stats['resources_found'] += len(
+            {key for key, _ in zone_resources} - set(new_resources))
+        self.zone_stats['resources_created'] += len(new_resources)
+        created = {}
+        if new_resources:
+            self.logger.info('Не найдено в БД ресурсов, создаю: '
+                             f'{len(new_resources)}')
+            insert_rows(Resource, new_resources.values())
+            keys_by_uuid = {row['uuid']: key
+                            for key, row in new_resources.items()}
+            for uuids in chunked(keys_by_uuid, DB_IN_CHUNK_SIZE):
+                rows = (db.session
+                        .query(Resource.uuid, Resource.resource_id)
+                        .filter(Resource.uuid.in_(uuids)))
+                for res_uuid, res_id in rows:
+                    created[keys_by_uuid[res_uuid]] = res_id
+
+        return ([(self.resources.get(key) or created[key], res)
+                 for key, res in zone_resources], created)
+
+    def write_resources_regions(self, zone_resources: list) -> None:
+        """Приводит регионы ресурсов пачки к указанным в XML-файле."""
+
+        regions = {res_id: set(res['regions'])
+                   for res_id, res in zone_resources}
+        existing = set()
+        table = regions_resources_table
+        for res_ids in chunked(sorted(regions), DB_IN_CHUNK_SIZE):
+            existing.update(db.session.execute(
+                db.select(table.c.resource_id, table.c.region_id)
+                .where(table.c.resource_id.in_(res_ids))))
+
+        outdated = [{'res_id': res_id, 'reg_id': region_id}
+                    for res_id, region_id in existing
+                    if region_id not in regions[res_id]]
+        if outdated:
+            db.session.execute(
+                table.delete()
+                .where(table.c.resource_id == db.bindparam('res_id'),
+                       table.c.region_id == db.bindparam('reg_id')),
+                outdated)
+        added = [{'resource_id': res_id, 'region_id': region_id}
+                 for res_id, region_ids in regions.items()
+                 for region_id in region_ids
+                 if (res_id, region_id) not in existing]
+        insert_rows(table, added, ignore_conflicts=True)
+        # ресурсы без регионов в БД считаются новыми, а не измененными
+        existing_res_ids = {res_id for res_id, _ in existing}
+        self.zone_stats['resources_updated'] += len(
+            {row['res_id'] for row in outdated}
+            | {row['resource_id'] for row in added
+               if row['resource_id'] in existing_res_ids})
 
-            if zone_org == owner:
-                owner.com_contacts.extend(org_contacts)
+    @staticmethod
+    def get_responsibilities(cert_id, res_ids) -> dict:
+        """Возвращает единицы зоны ответственности центра <cert_id> по ресурсам
+        <res_ids> в виде {(resource_id, date_start, date_end): resp_id}."""
+
+        resps = {}
+        for ids in chunked(sorted(res_ids), DB_IN_CHUNK_SIZE):
+            rows = (db.session
+                    .query(Responsibility.resource_id,
+                           Responsibility.date_start,
+                           Responsibility.date_end,
+                           Responsibility.resp_id)
+                    .filter(Responsibility.cert_id == cert_id,
+                            Responsibility.resource_id.in_(ids))
+                    .order_by(Responsibility.resp_id))
+            for res_id, date_start, date_end, resp_id in rows:
+                resps.setdefault((res_id, date_start, date_end), resp_id)
+        return resps
+
+    def write_responsibilities(self, zone_resources: list,
+                               cert_id: int) -> None:
+        """Создает отсутствующие в БД единицы зоны ответственности
+        центра <cert_id> и связывает их с услугами."""
+
+        resps = {}
+        for res_id, res in zone_resources:
+            doc_info = res['document']
+            key = (res_id, doc_info['date_start'], doc_info['date_end'])
+            resps.setdefault(key, res)
+
+        res_ids = {key[0] for key in resps}
+        existing = self.get_responsibilities(cert_id, res_ids)
+        new_resps = {key: res for key, res in resps.items()
+                     if key not in existing}
+        self.zone_stats['resps_skipped'] += len(resps) - len(new_resps)
+        self.zone_stats['resps_created'] += len(new_resps)
+        if len(resps) > len(new_resps):
+            self.logger.warning('Единиц зоны ответственности уже имеется '
+                                f'в БД: {len(resps) - len(new_resps)}. '
+                                'Пропускаю')
+        if not new_resps:
+            return
+
+        self.logger.info('В БД отсутствует информация о зонах '
+                         'ответственности. Создаю новые единицы: '
+                         f'{len(new_resps)}')
+        insert_rows(Responsibility, [
+            dict(res['document'], resource_id=key[0], cert_id=cert_id)
+            for key, res in new_resps.items()])
+        created = self.get_responsibilities(cert_id, res_ids)
+        insert_rows(responsibilities_services_table, [
+            {'service_id': service_id, 'resp_id': created[key]}
+            for key, res in new_resps.items()
+            for service_id in res['services']],
+            ignore_conflicts=True)
+
+    def write_chunk(self, zones: list, owner_id: int, cert_id: int) -> None:
+        """Записывает в БД очередную порцию тегов <ЕдЗО>, фиксирует
+        транзакцию и очищает сессию от обработанных объектов, чтобы
+        не держать блокировки и память до конца обработки файла."""
+
+        with self.stats.phase('write'):
+            written = self.write_zones(zones, owner_id, cert_id)
+            if self.dry_run:
+                db.session.flush()
             else:
-                zone_org.com_contacts.delete()
-                zone_org.com_contacts = org_contacts
+                db.session.commit()
+            db.session.expunge_all()
+        self.stats.counters['zones_failed'] += len(zones) - written
+        self.logger.info(f'Записано в БД тегов <ЕдЗО>: {written} '
+                         f'из {len(zones)}')
+
+    def write_ledger(self) -> None:
+        """Записывает результаты загрузки в журнал загрузок. Удаляет хеши
+        сведений юр. лиц, которых больше нет в файле центра. Хеш файла
+        сохраняется, только если все теги <ЕдЗО> записаны в БД."""
+
+        zones_skipped = self.stats.counters['zones_skipped']
+        zones_failed = self.stats.counters['zones_failed']
+        if zones_skipped:
+            self.logger.info('Пропущено тегов <ЕдЗО>, не изменившихся '
+                             f'с прошлой загрузки: {zones_skipped}')
+        outdated = (self.get_zone_hashes(self.cert_id)
+                    - set(self.org_hashes.values()))
+        for zone_hashes in chunked(sorted(outdated), DB_IN_CHUNK_SIZE):
+            db.session.execute(
+                XMLImportZone.__table__.delete()
+                .where(XMLImportZone.cert_id == self.cert_id,
+                       XMLImportZone.zone_hash.in_(zone_hashes)))
+        if zones_failed:
+            self.logger.warning(f'Не записано тегов <ЕдЗО>: '
+                                f'{zones_failed}. Файл будет '
+                                'обработан повторно при следующей загрузке')
+            return
+        if self.file_hash:
+            db.session.add(XMLImport(
+                cert_id=self.cert_id,
+                file_name=os.path.basename(self.file),
+                file_hash=self.file_hash,
+                zones_count=self.stats.counters['zones'],
+                zones_skipped=zones_skipped))
+
+    def commit(self) -> None:
+        """Фиксирует результаты обработки файла в БД."""
+
+        self.write_ledger()
+        for line in self.stats.report():
+            self.logger.info(line)
+        if self.dry_run:
+            db.session.rollback()
+            self.logger.info('Режим проверки: транзакция отменена. Выход')
+            return
+        self.logger.info('Начинаю выполнение транзакции в БД')
+        db.session.commit()
+        self.logger.info('Транзакция выполнилась. Выход')
 
-            self.logger.info('Начинаю парсинг ресурсов')
+    def parse(self) -> bool:
+        """Основной метод класса. Парсит XML-файл."""
 
-            resources = zone.find('СвЗООбктЮЛ')
-            res_roots = resources.findall('СвОбкт')
+        if self.stream:
+            return self.parse_stream()
 
-            # Ошибка схемы СвОбкт должен быть мин 1
-            if res_roots is None:
-                self.logger.error('Тег <СвОбкт> пустой. Перехожу к следующему '
-                                  'тегу <ЕдЗО>')
-                continue
+        tree = self.get_xml_root()
+        root = tree.getroot()
+        header = self.parse_header(root)
+        if not header:
+            db.session.rollback()
+            return False
+        owner_id, cert_id = header
 
-            for res_root in res_roots:
-                res_name = res_root.attrib['Наим']
-                kii_info = self.parse_kii(res_root.find('СвКИИ'))
-
-                res_formatted_address = []
-                res_codes = []
-                res_addresses = res_root.findall('СвАдрРазм/АдрРазмОбкт')
-                for res_address in res_addresses:
-                    res_address_info = self.parse_address(res_address)
-                    res_formatted_address.append(res_address_info['address'])
-                    res_codes.append(res_address_info['region_code'])
-                res_formatted_address = "; ".join(res_formatted_address)
-                res_fstec_reg_number = kii_info['fstec_reg_number']
-                res_category = kii_info['category']
-                res_is_okii = kii_info['is_okii']
-
-                res = self.get_instance_from_db_or_create(
-                    Resource, name=res_name, org_owner=zone_org,
-                    factual_addresses=res_formatted_address,
-                    fstec_reg_number=res_fstec_reg_number,
-                    category=res_category,
-                    is_okii=res_is_okii)
-
-                res.regions = self.get_regions_from_xml(region_codes=res_codes)
-                db.session.add(res)
-                self.logger.info(f'Ресурс {res_name} успешно обработан')
-
-                doc_info = self.parse_document(res_root.find('СвДокумент'))
-                self.logger.info('Реквизиты документа успешно обработаны')
-                type, props, date_start, date_end, comment, = doc_info.values()
-
-                self.logger.info('Ищу в БД единицу зоны ответственности')
-                resp_exists = (
-                    db.session
-                    .query(Responsibility)
-                    .filter(Responsibility.date_start == date_start,
-                            Responsibility.date_end == date_end,
-                            Responsibility.resource_id == res.resource_id,
-                            Responsibility.cert == cert)
-                    .first()
-                )
-
-                if not resp_exists:
-                    self.logger.info('В БД отсутствует информация о зоне '
-                                     'ответственности. Создаю новую единицу')
-                    new_resp = Responsibility(**doc_info,
-                                              resource_id=res.resource_id,
-                                              cert=cert)
-                    db.session.add(new_resp)
-
-                    self.logger.info('Начинаю парсинг функций (услуг)')
-                    services = self.get_services_from_xml(
-                        res_root.findall('СвФункции/Функция'))
-                    new_resp.services = services
-                    db.session.add(new_resp)
-                else:
-                    self.logger.warning('Единица зоны ответственности уже '
-                                        'имеется в БД. Пропускаю')
-        self.logger.info('Начинаю выполнение транзакции в БД')
-        db.session.commit()
-        self.logger.info('Транзакция выполнилась. Выход')
+        zone_root = root.find('СвЗонаОтв')
+        if zone_root.find('ЕдЗО') is None:
+            self.logger.info('Зона ответственности отсутствует. Штатный выход')
+            self.commit()
+            return True
+
+        with self.stats.phase('parse'):
+            org_issues = self.collect_zone_orgs()
+        self.prefetch(org_issues)
+        self.logger.info('Начинаю парсинг тега <ЕдЗО>')
+        for zones in chunked(zone_root.iterfind('ЕдЗО'), self.chunk_size):
+            with self.stats.phase('parse'):
+                zones = [zone for zone in map(self.read_zone, zones) if zone]
+            self.write_chunk(zones, owner_id, cert_id)
+        self.commit()
+        return True
+
+    def parse_stream(self) -> bool:
+        """Парсит XML-файл потоково, не загружая в память все древо.
+        Каждый тег <ЕдЗО> обрабатывается и удаляется из памяти сразу
+        после прочтения."""
+
+        self.logger.info('Включен потоковый режим обработки XML-файла')
+        owner_id = cert_id = None
+        zones_count = 0
+        zones = []
+        for event, elem in etree.iterparse(
+                self.file, events=('start', 'end'),
+                tag=('СвЗонаОтв', 'ЕдЗО')):
+            if elem.tag == 'СвЗонаОтв':
+                if event == 'start':
+                    # к началу <СвЗонаОтв> сведения о центре уже прочитаны
+                    header = self.parse_header(elem.getparent())
+                    if not header:
+                        db.session.rollback()
+                        return False
+                    owner_id, cert_id = header
+                    with self.stats.phase('parse'):
+                        org_issues = self.collect_zone_orgs()
+                    self.prefetch(org_issues)
+                    self.logger.info('Начинаю парсинг тега <ЕдЗО>')
+                continue
+            if event == 'end':
+                with self.stats.phase('parse'):
+                    zone = self.read_zone(elem)
+                if zone:
+                    zones.append(zone)
+                zones_count += 1
+                self.clear_element(elem)
+                if zones_count % self.chunk_size == 0:
+                    self.write_chunk(zones, owner_id, cert_id)
+                    zones = []
+        if zones:
+            self.write_chunk(zones, owner_id, cert_id)
+
+        if not zones_count:
+            self.logger.info('Зона ответственности отсутствует. Штатный выход')
+            self.commit()
+            return True
+        self.commit()
         return True
 
+    @staticmethod
+    def clear_element(elem) -> None:
+        """Освобождает память, занятую обработанным XML-элементом
+        и предшествующими ему элементами."""
+
+        elem.clear()
+        parent = elem.getparent()
+        while elem.getprevious() is not None:
+            del parent[0]
+
 
 class XMLHandler:
-    def __init__(self, file, schema, logger_name, logger_file) -> None:
+    def __init__(self, file, schema, logger_name, logger_file,
+                 stream=False, chunk_size=None, force=False,
+                 dry_run=False) -> None:
         self.file = file
         self.schema = schema
         self.logger_name = logger_name
         self.logger_file = logger_file
         self.log_level = logging.INFO
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.force = force
+        self.dry_run = dry_run
+        self.stats = ImportStats()
+        self.skipped = False
+
+    def find_import(self, file_hash: str) -> Optional[XMLImport]:
+        """Возвращает запись журнала загрузок файла с тем же содержимым
+        для того же центра. Центр ищется в БД по наименованию и юр. лицу
+        из заголовка файла так же, как при обработке файла: если центра
+        в БД нет, файл обрабатывается."""
+
+        if self.force:
+            return None
+        centre_key = read_centre_key(self.file)
+        if centre_key is None:
+            return None
+        cent_name, inn, kpp, ogrn = centre_key
+        return (db.session
+                .query(XMLImport)
+                .join(Cert, XMLImport.cert_id == Cert.cert_id)
+                .join(Organization, Cert.org_id == Organization.org_id)
+                .filter(XMLImport.file_hash == file_hash,
+                        Cert.name == cent_name,
+                        Organization.inn == inn,
+                        Organization.kpp == kpp,
+                        Organization.ogrn == ogrn)
+                .order_by(XMLImport.import_id.desc())
+                .first())
 
     def handle(self) -> bool:
         """Основной метод класса. Возвращает результат обработки."""
@@ -509,10 +1197,25 @@ class XMLHandler:
         fh.setFormatter(formatter)
         logger.addHandler(fh)
 
-        validator = XMLValidator(self.schema, self.file, self.logger_name)
-        if not validator.validate():
+        file_hash = get_file_hash(self.file)
+        xml_import = self.find_import(file_hash)
+        if xml_import:
+            logger.info('Файл с таким же содержимым уже загружен '
+                        f'{xml_import.date_imported}. Пропускаю')
+            self.skipped = True
+            return True
+
+        validator = XMLValidator(self.schema, self.file, self.logger_name,
+                                 stream=self.stream)
+        with self.stats.phase('validate'):
+            xml_ok = validator.validate()
+        if not xml_ok:
             return False
-        parser = XMLParser(self.schema, self.file, self.logger_name)
+        parser = XMLParser(self.schema, self.file, self.logger_name,
+                           stream=self.stream, tree=validator.tree,
+                           chunk_size=self.chunk_size, file_hash=file_hash,
+                           force=self.force, dry_run=self.dry_run,
+                           stats=self.stats)
         if parser.parse():
             return True
         return False
@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+import pytest
+
+TEST_FILES_DIR = tempfile.mkdtemp(prefix='organizations-tests-')
+
+# Настройки читаются при импорте config, поэтому окружение
+# задается до импорта приложения
+for name in ('ORG_FILES_MOUNT_PATH', 'METHOD_DOCS_MOUNT_PATH',
+             'DOCX_TEMPLATE_MOUNT_PATH'):
+    os.environ.pop(name, None)
+os.environ.update({
+    'FLASK_ENV': 'testing',
+    'SECRET_KEY': 'test',
+    'DOCX_TEMPLATE_PATH': TEST_FILES_DIR,
+    'BOSS_EMAIL_FOR_NOTIFY': 'boss@example.com',
+    'EGRUL_SERVICE_URL': 'http://127.0.0.1:1/',
+    'EGRUL_CACHE_PATH': '',
+    'ORG_FILES_PATH': os.path.join(TEST_FILES_DIR, 'orgs'),
+    'METHOD_DOCS_PATH': os.path.join(TEST_FILES_DIR, 'method-docs'),
+})
+
+from organizations import create_app  # noqa: E402
+from organizations.extentions import db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Приложение с пустой SQLite-базой во временной директории."""
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        WTF_CSRF_ENABLED=False,
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "test.db"}',
+        BUSINESS_LOGIC={**app.config['BUSINESS_LOGIC'],
+                        'EGRUL_CACHE_PATH': '',
+                        'FILTERS_CACHE_TTL': 0,
+                        'LIST_COUNT_CACHE_TTL': 0},
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
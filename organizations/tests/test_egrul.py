@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from organizations.egrul import EgrulClient, get_egrul_client
+
+NOT_FOUND_SUFFIX = '9'
+
+
+class EgrulStub:
+    """Заглушка EGRUL-сервиса. Организации с ИНН, оканчивающимся на 9,
+    не находятся. <delays> - задержка ответа по ИНН, <failures> -
+    сколько раз подряд отвечать на поиск ИНН ошибкой 503."""
+
+    def __init__(self) -> None:
+        self.delays = {}
+        self.failures = {}
+        self.hits = []
+        self.lock = threading.Lock()
+
+    def search(self, inn: str) -> tuple:
+        with self.lock:
+            if self.failures.get(inn):
+                self.failures[inn] -= 1
+                return 503, {'detail': 'unavailable'}
+        results = []
+        if not inn.endswith(NOT_FOUND_SUFFIX):
+            results.append({'relative_addr': f'/api/organizations/{inn}/',
+                            'full_name': f'ООО {inn}', 'inn': inn})
+        return 200, {'count': len(results), 'next': None, 'previous': None,
+                     'results': results, 'date_info': '2024-01-01'}
+
+    @staticmethod
+    def retrieve(inn: str) -> tuple:
+        return 200, {'full_name': f'ООО {inn}', 'short_name': None,
+                     'inn': inn, 'kpp': '770001001', 'ogrn': '1' + inn,
+                     'factual_address': 'Москва', 'region_code': 77}
+
+    def respond(self, path: str) -> tuple:
+        url = urlparse(path)
+        with self.lock:
+            self.hits.append(path)
+        if url.path == '/api/organizations/':
+            inn = parse_qs(url.query)['inn'][0]
+            time.sleep(self.delays.get(inn, 0))
+            return self.search(inn)
+        return self.retrieve(url.path.strip('/').split('/')[-1])
+
+    def count_searches(self, inn: str) -> int:
+        return sum(f'inn={inn}&' in path for path in self.hits)
+
+
+@pytest.fixture
+def egrul_stub():
+    stub = EgrulStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            status, body = stub.respond(self.path)
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stub.url = f'http://127.0.0.1:{server.server_port}/'
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+
+def test_find_orgs_mixed_found_and_not_found(app, egrul_stub):
+    client = EgrulClient(egrul_stub.url, timeout=(1, 1), max_workers=4)
+    inns = ['7700000001', '7700000009', '7700000002', '7700000019']
+
+    orgs = client.find_orgs(inns)
+
+    assert list(orgs) == inns
+    assert orgs['7700000009'] is None and orgs['7700000019'] is None
+    for inn in ('7700000001', '7700000002'):
+        assert orgs[inn]['inn'] == inn
+        assert orgs[inn]['ogrn'] == '1' + inn
+    # для ненайденных организаций сведения не запрашиваются
+    assert len(egrul_stub.hits) == len(inns) + 2
+
+
+def test_find_orgs_retries_unavailable_service(app, egrul_stub):
+    egrul_stub.failures['7700000001'] = 2
+    egrul_stub.failures['7700000002'] = 5
+    client = EgrulClient(egrul_stub.url, timeout=(1, 1), retries=2)
+
+    orgs = client.find_orgs(['7700000001', '7700000002', '7700000003'])
+
+    # две ошибки 503 подряд укладываются в две повторные попытки
+    assert orgs['7700000001']['inn'] == '7700000001'
+    assert egrul_stub.count_searches('7700000001') == 3
+    # после исчерпания попыток организация считается ненайденной,
+    # остальные ИНН обрабатываются
+    assert orgs['7700000002'] is None
+    assert egrul_stub.count_searches('7700000002') == 3
+    assert orgs['7700000003']['inn'] == '7700000003'
+
+
+def test_find_orgs_read_timeout(app, egrul_stub):
+    egrul_stub.delays['7700000001'] = 1
+    client = EgrulClient(egrul_stub.url, timeout=(1, 0.2), retries=0,
+                         max_workers=2)
+
+    started = time.monotonic()
+    orgs = client.find_orgs(['7700000001', '7700000002'])
+
+    assert time.monotonic() - started < 1
+    assert orgs['7700000001'] is None
+    assert orgs['7700000002']['inn'] == '7700000002'
+
+
+def test_get_egrul_client_uses_settings_and_cache(app, egrul_stub):
+    app.config['BUSINESS_LOGIC'].update({
+        'EGRUL_SERVICE_URL': egrul_stub.url,
+        'EGRUL_CONNECT_TIMEOUT': 1.5,
+        'EGRUL_READ_TIMEOUT': 2.5,
+        'EGRUL_MAX_WORKERS': 3,
+        'EGRUL_CACHE_PATH': '',
+        'EGRUL_CACHE_TTL': 60,
+    })
+
+    client = get_egrul_client()
+
+    assert get_egrul_client() is client
+    assert client.base_url == egrul_stub.url
+    assert client.timeout == (1.5, 2.5)
+    assert client.max_workers == 3
+    inns = ['7700000001', '7700000009']
+    first = client.find_orgs(inns)
+    hits = len(egrul_stub.hits)
+    # повторный поиск (в том числе ненайденных) отвечается из кеша
+    assert client.find_orgs(inns) == first
+    assert len(egrul_stub.hits) == hits
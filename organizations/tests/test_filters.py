@@ -0,0 +1,178 @@
+import random
+from datetime import date
+
+import pytest
+from sqlalchemy import func
+
+from organizations.extentions import db
+from organizations.filters import (MessageIsMethodDoc, OrgDocumentsAndFilter,
+                                   OrgDocumentsFilter, OrgIsSubjectKIIFilter,
+                                   OrgOkrugFilter, OrgOkrugNotFilter,
+                                   RespResourceOkrugFilter,
+                                   RespResourceRegionFilter,
+                                   ResourceIndustryFilter, ResourceOkrugFilter,
+                                   ResourceRegionFilter)
+from organizations.models import (Cert, Industry, Message, MethodicalDoc,
+                                  Okrug, OrgAdmDoc, OrgAdmDocOrganization,
+                                  Organization, Region, Resource,
+                                  Responsibility)
+
+
+@pytest.fixture
+def seeded(app):
+    """Справочники и случайный, но воспроизводимый набор организаций,
+    ресурсов, зон ответственности и писем, в том числе без связей."""
+    rnd = random.Random(15)
+    okrugs = [Okrug(okrug_id=i, name=f'Округ {i}') for i in (1, 2, 3)]
+    regions = [Region(region_id=i, name=f'Регион {i}', okrug_id=i % 3 + 1)
+               for i in range(1, 10)]
+    industries = [Industry(name=f'Сфера {i}') for i in range(4)]
+    docs = [OrgAdmDoc(name=f'Документ {i}', name_prefix=f'd{i}')
+            for i in range(4)]
+    method_docs = [MethodicalDoc(name=f'МР {i}', path_prefix=f'm{i}')
+                   for i in range(3)]
+    db.session.add_all(okrugs + regions + industries + docs + method_docs)
+    cert = Cert(name='Центр')
+    db.session.add(cert)
+    for i in range(60):
+        org = Organization(db_name=f'ОРГ {i}', full_name=f'ОРГ {i}',
+                           region=rnd.choice(regions + [None]))
+        for doc in rnd.sample(docs, rnd.randint(0, len(docs))):
+            db.session.add(OrgAdmDocOrganization(organization=org,
+                                                 org_doc=doc))
+        for j in range(rnd.randint(0, 3)):
+            resource = Resource(
+                name=f'Ресурс {i}-{j}', org_owner=org,
+                is_okii=rnd.random() < 0.3,
+                regions=rnd.sample(regions, rnd.randint(0, 3)),
+                industries=rnd.sample(industries, rnd.randint(0, 2)))
+            if rnd.random() < 0.7:
+                db.session.add(Responsibility(
+                    cert=cert, resource=resource,
+                    date_start=date(2020, 1, 1), date_end=date(2030, 1, 1)))
+        db.session.add(Message(
+            information=f'Письмо {i}', organizations=[org],
+            methodical_docs=rnd.sample(method_docs, rnd.randint(0, 2))))
+    db.session.commit()
+
+
+# Прежние реализации фильтров, материализующие списки id
+
+def old_org_okrug(value):
+    return (db.session.query(Organization.org_id.distinct())
+            .join(Region, Organization.region_id == Region.region_id)
+            .filter(Region.okrug_id.in_(value)))
+
+
+def old_org_okrug_not(value):
+    return (db.session.query(Organization.org_id.distinct())
+            .join(Region, Organization.region_id == Region.region_id)
+            .filter(~Region.okrug_id.in_(value)))
+
+
+def old_org_documents(value):
+    return (Organization.query
+            .join(OrgAdmDocOrganization, Organization.org_adm_doc)
+            .filter(OrgAdmDocOrganization.orgadm_id.in_(value))
+            .with_entities(Organization.org_id))
+
+
+def old_org_documents_and(value):
+    subquery = (
+        db.session.query(Organization.org_id)
+        .join(OrgAdmDocOrganization, Organization.org_adm_doc)
+        .filter(OrgAdmDocOrganization.orgadm_id.in_(value))
+        .group_by(Organization.org_id)
+        .having(func.count(OrgAdmDocOrganization.orgadm_id) == len(value))
+        .all()
+    )
+    return [org_id[0] for org_id in subquery]
+
+
+def old_org_is_subject_kii(value):
+    subjects_kii_ids = (db.session.query(Organization.org_id.distinct())
+                        .join(Resource, Organization.resources)
+                        .filter(Resource.is_okii.is_(True)))
+    query = db.session.query(Organization.org_id)
+    if value == 'да':
+        return query.filter(Organization.org_id.in_(subjects_kii_ids))
+    return query.filter(Organization.org_id.not_in(subjects_kii_ids))
+
+
+def old_resource_region(value):
+    return (db.session.query(Resource.resource_id.distinct())
+            .join(Region, Resource.regions)
+            .filter(Region.region_id.in_(value)))
+
+
+def old_resource_industry(value):
+    return (db.session.query(Resource.resource_id.distinct())
+            .join(Industry, Resource.industries)
+            .filter(Industry.industry_id.in_(value)))
+
+
+def old_resource_okrug(value):
+    return (db.session.query(Resource.resource_id.distinct())
+            .join(Region, Resource.regions)
+            .filter(Region.okrug_id.in_(value)))
+
+
+def old_message_is_method_doc(value):
+    subquery_messages = (db.session.query(Message.message_id)
+                         .join(MethodicalDoc, Message.methodical_docs))
+    query = db.session.query(Message.message_id)
+    if value == 'да':
+        return query.filter(Message.message_id.in_(subquery_messages))
+    return query.filter(~Message.message_id.in_(subquery_messages))
+
+
+def old_resp_resource_region(value):
+    return (db.session.query(Responsibility.resp_id.distinct())
+            .join(Resource, Responsibility.resource)
+            .join(Region, Resource.regions)
+            .filter(Region.region_id.in_(value)))
+
+
+def old_resp_resource_okrug(value):
+    return (db.session.query(Responsibility.resp_id.distinct())
+            .join(Resource, Responsibility.resource)
+            .join(Region, Resource.regions)
+            .filter(Region.okrug_id.in_(value)))
+
+
+CASES = [
+    (Organization, OrgOkrugFilter, old_org_okrug, [1]),
+    (Organization, OrgOkrugFilter, old_org_okrug, [1, 3]),
+    (Organization, OrgOkrugNotFilter, old_org_okrug_not, [2]),
+    (Organization, OrgDocumentsFilter, old_org_documents, [1, 2]),
+    (Organization, OrgDocumentsAndFilter, old_org_documents_and, [1]),
+    (Organization, OrgDocumentsAndFilter, old_org_documents_and, [1, 3]),
+    (Organization, OrgDocumentsAndFilter, old_org_documents_and,
+     [1, 2, 3, 4]),
+    (Organization, OrgIsSubjectKIIFilter, old_org_is_subject_kii, 'да'),
+    (Organization, OrgIsSubjectKIIFilter, old_org_is_subject_kii, 'нет'),
+    (Resource, ResourceRegionFilter, old_resource_region, [2, 5, 7]),
+    (Resource, ResourceIndustryFilter, old_resource_industry, [1, 2]),
+    (Resource, ResourceOkrugFilter, old_resource_okrug, [2]),
+    (Message, MessageIsMethodDoc, old_message_is_method_doc, 'да'),
+    (Message, MessageIsMethodDoc, old_message_is_method_doc, 'нет'),
+    (Responsibility, RespResourceRegionFilter, old_resp_resource_region,
+     [3, 4]),
+    (Responsibility, RespResourceOkrugFilter, old_resp_resource_okrug,
+     [1, 2]),
+]
+
+
+@pytest.mark.parametrize('model, filter_class, old_filter, value', CASES)
+def test_filter_matches_old_implementation(seeded, model, filter_class,
+                                           old_filter, value):
+    primary_key = model.__mapper__.primary_key[0]
+    query = filter_class(None, name='фильтр').apply(
+        db.session.query(model), value)
+    ids = [getattr(row, primary_key.key) for row in query]
+    old_ids = old_filter(value)
+    if not isinstance(old_ids, list):
+        old_ids = [row[0] for row in old_ids]
+    assert old_ids
+    assert len(ids) == len(set(ids))
+    assert sorted(ids) == sorted(set(old_ids))
@@ -0,0 +1,64 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from organizations.extentions import db
+from organizations.models import (Cert, Message, Okrug, Organization, Region,
+                                  Resource, Responsibility, Service)
+
+LIST_ENDPOINTS = ('organizations', 'certs', 'resources', 'messages',
+                  'responsibilities')
+
+
+def seed(start: int, count: int) -> None:
+    """Добавляет <count> организаций, каждая со своим центром,
+    ресурсом, зоной ответственности с услугами и письмом."""
+    region = db.session.get(Region, 77)
+    if region is None:
+        okrug = Okrug(okrug_id=1, name='ЦФО')
+        region = Region(region_id=77, name='Москва', okrug=okrug)
+        db.session.add_all([okrug, region,
+                            Service(name='Мониторинг'),
+                            Service(name='Реагирование')])
+    services = Service.query.all()
+    for i in range(start, start + count):
+        org = Organization(db_name=f'ООО ОРГ {i}', full_name=f'ООО ОРГ {i}',
+                           inn=str(7700000000 + i), kpp=str(770000000 + i),
+                           region=region)
+        cert = Cert(name=f'Центр {i}', org_owner=org)
+        resource = Resource(name=f'Ресурс {i}', org_owner=org,
+                            regions=[region])
+        responsibility = Responsibility(
+            cert=cert, resource=resource, services=services,
+            date_start=date(2020, 1, 1), date_end=date(2030, 1, 1))
+        message = Message(information=f'Письмо {i}', organizations=[org],
+                          our_outbox_number=str(i), date_approved=date.today())
+        db.session.add_all([org, cert, resource, responsibility, message])
+    db.session.commit()
+
+
+def count_list_queries(client, endpoint: str) -> int:
+    """Возвращает количество SQL-запросов при выводе списка."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(f'/{endpoint}/?page_size=100')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute',
+                     before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('endpoint', LIST_ENDPOINTS)
+def test_list_query_count_does_not_depend_on_rows(app, client, endpoint):
+    seed(0, 3)
+    few_rows = count_list_queries(client, endpoint)
+    seed(3, 40)
+    many_rows = count_list_queries(client, endpoint)
+    assert many_rows == few_rows
@@ -0,0 +1,129 @@
+import importlib
+import json
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import (Column, Date, DateTime, Integer, MetaData, Numeric,
+                        String, Table, create_engine, select)
+
+from organizations import serializers
+
+values_table = Table(
+    'values', MetaData(),
+    Column('value_id', Integer, primary_key=True),
+    Column('name', String(50)),
+    Column('date_approved', Date),
+    Column('date_updated', DateTime),
+    Column('amount', Numeric(10, 2)),
+)
+
+VALUES = [
+    {'value_id': 1, 'name': 'Организация «1»',
+     'date_approved': date(2023, 1, 31),
+     'date_updated': datetime(2023, 2, 1, 9, 5, 7, 123456),
+     'amount': Decimal('1.50')},
+    {'value_id': 2, 'name': None, 'date_approved': None,
+     'date_updated': None, 'amount': None},
+    {'value_id': 3, 'name': '"кавычки" и \\ \n',
+     'date_approved': date(1999, 12, 1),
+     'date_updated': datetime(1999, 12, 1), 'amount': Decimal('0')},
+]
+
+FIELD_SETS = [
+    ('name', 'date_approved', 'date_updated'),
+    ('date_updated', 'value_id', 'name'),
+    ('date_approved',),
+    ('name',),
+    ('value_id', 'name'),
+]
+
+
+class JsonExtendEncoder(json.JSONEncoder):
+    """Кодировщик прежней построчной сериализации API."""
+
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.strftime('%Y-%m-%d %H:%M:%S')
+        elif isinstance(obj, date):
+            return obj.strftime('%Y-%m-%d')
+        else:
+            return json.JSONEncoder.default(self, obj)
+
+
+def dump_row_old(row, fields) -> str:
+    return json.dumps({field: getattr(row, field) for field in fields},
+                      cls=JsonExtendEncoder)
+
+
+@pytest.fixture(scope='module')
+def rows():
+    engine = create_engine('sqlite://')
+    values_table.create(engine)
+    with engine.connect() as connection:
+        connection.execute(values_table.insert(), VALUES)
+        return connection.execute(
+            select(values_table).order_by(values_table.c.value_id)).all()
+
+
+@contextmanager
+def reload_serializers(without_orjson: bool):
+    """Перезагружает модуль serializers; при <without_orjson> - так,
+    как если бы orjson не был установлен."""
+    orjson = sys.modules.get('orjson')
+    if without_orjson:
+        sys.modules['orjson'] = None
+    try:
+        yield importlib.reload(serializers)
+    finally:
+        sys.modules['orjson'] = orjson
+        importlib.reload(serializers)
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def serializers_module(request):
+    with reload_serializers(request.param == 'json') as module:
+        yield module
+
+
+def test_fallback_without_orjson():
+    with reload_serializers(without_orjson=True) as module:
+        assert module.orjson is None
+        assert module.dumps({'name': 'ИНН'}) == '{"name":"ИНН"}'.encode()
+
+
+@pytest.mark.parametrize('fields', FIELD_SETS)
+def test_row_serializer_matches_old_encoder(serializers_module, rows,
+                                            fields):
+    serializer = serializers_module.RowSerializer(values_table.c, fields)
+    for row in rows:
+        expected = json.loads(dump_row_old(row, fields))
+        assert serializer.to_dict(row) == expected
+        assert json.loads(serializer.dumps(row)) == expected
+        assert list(json.loads(serializer.dumps(row))) == list(fields)
+
+
+def test_row_serializer_decimal(serializers_module, rows):
+    """Прежний кодировщик не сериализовал Decimal (TypeError),
+    новый выводит его строкой без потери точности."""
+    fields = ('value_id', 'amount')
+    serializer = serializers_module.RowSerializer(values_table.c, fields)
+    with pytest.raises(TypeError):
+        dump_row_old(rows[0], fields)
+    assert [json.loads(serializer.dumps(row)) for row in rows] == [
+        {'value_id': 1, 'amount': '1.50'},
+        {'value_id': 2, 'amount': None},
+        {'value_id': 3, 'amount': '0.00'},
+    ]
+
+
+def test_dumps_nested_values(serializers_module):
+    """Даты вне строк запроса (во вложенных структурах) сериализуются
+    так же, как прежним кодировщиком."""
+    obj = {'items': [{'date': date(2023, 1, 31),
+                      'datetime': datetime(2023, 1, 31, 23, 59, 59, 999)}],
+           'total': 1, 'next': None}
+    assert (json.loads(serializers_module.dumps(obj))
+            == json.loads(json.dumps(obj, cls=JsonExtendEncoder)))
@@ -0,0 +1,199 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from organizations.extentions import db
+from organizations.models import (Cert, Contact, Okrug, Organization, Region,
+                                  Resource, Service, XMLImport)
+from organizations.xml_parser import XMLHandler, XMLParser
+
+SCHEMA = '''<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:element name="Файл">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:any processContents="skip" minOccurs="0" maxOccurs="unbounded"/>
+      </xs:sequence>
+      <xs:anyAttribute processContents="skip"/>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>
+'''
+
+OWNER = 0
+
+
+def org_attrs(number: int) -> str:
+    return (f'ИНН="{7700000000 + number}" КПП="{770000000 + number}" '
+            f'ОГРН="{1027700000000 + number}" НаимЮЛПолн="ООО ОРГ {number}"')
+
+
+def make_zone(number: int, contact: str, resource: str) -> str:
+    return (
+        f'<ЕдЗО><СвЗОЮЛ {org_attrs(number)}/>'
+        f'<СвЗОКонтЮЛ><ФИО>{contact}</ФИО><РабТел>1</РабТел></СвЗОКонтЮЛ>'
+        f'<СвЗООбктЮЛ><СвОбкт Наим="{resource}">'
+        '<СвАдрРазм><АдрРазмОбкт><КодРегион>77</КодРегион>'
+        '<НаимРегион>Москва</НаимРегион><Адрес>ул. Мира, 1</Адрес>'
+        '</АдрРазмОбкт></СвАдрРазм>'
+        '<СвДокумент><Наим>Договор</Наим><Рекв>№ 1</Рекв>'
+        '<ДатаСтарт>2024-01-01</ДатаСтарт><ДатаФиниш>2025-01-01</ДатаФиниш>'
+        '</СвДокумент><СвФункции><Функция>Мониторинг</Функция></СвФункции>'
+        '</СвОбкт></СвЗООбктЮЛ></ЕдЗО>')
+
+
+def make_xml(zones: list, cent_name: str = 'ЦЕНТР 1') -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<Файл ДатаФорм="2024-01-10" НаимЦентр="{cent_name}" '
+        f'КлассЦентр="А"><СвЮЛ {org_attrs(OWNER)}/>'
+        '<СвЦентрАдр><КодРегион>77</КодРегион><НаимРегион>Москва'
+        '</НаимРегион><Адрес>ул. Ленина, 1</Адрес></СвЦентрАдр>'
+        '<СвЦентрКонт><ФИО>Иванов</ФИО><РабТел>1</РабТел></СвЦентрКонт>'
+        f'<СвЗонаОтв>{"".join(zones)}</СвЗонаОтв></Файл>')
+
+
+@pytest.fixture
+def orgs(app):
+    """Справочники и юр. лица 0 (владелец центра) - 3."""
+    okrug = Okrug(okrug_id=1, name='ЦФО')
+    db.session.add_all([okrug,
+                        Region(region_id=77, name='Москва', okrug=okrug),
+                        Service(name='Мониторинг')])
+    orgs = {}
+    for number in range(4):
+        orgs[number] = Organization(
+            db_name=f'ООО ОРГ {number}', full_name=f'ООО ОРГ {number}',
+            inn=str(7700000000 + number), kpp=str(770000000 + number),
+            ogrn=str(1027700000000 + number),
+            date_agreement=date(2020, 1, 1) if number == OWNER else None)
+    db.session.add_all(orgs.values())
+    db.session.commit()
+    return {number: org.org_id for number, org in orgs.items()}
+
+
+@pytest.fixture
+def import_file(tmp_path):
+    """Записывает XML-файл центра и загружает его, возвращает XMLHandler."""
+    schema = tmp_path / 'schema.xsd'
+    schema.write_text(SCHEMA, encoding='utf-8')
+
+    def import_file(zones: list, stream: bool = False, **kwargs):
+        path = tmp_path / 'cert.xml'
+        path.write_text(make_xml(zones, **kwargs), encoding='utf-8')
+        handler = XMLHandler(file=str(path), schema=str(schema),
+                             logger_name='xml-test',
+                             logger_file=str(tmp_path / 'parse.log'),
+                             stream=stream, chunk_size=10)
+        assert handler.handle()
+        return handler
+    return import_file
+
+
+@pytest.fixture
+def fail_zones(monkeypatch):
+    """Запись ресурсов пачки, в которой есть ресурс из <names>,
+    завершается ошибкой БД."""
+    names = set()
+    write_resources = XMLParser.write_resources
+
+    def failing_write_resources(self, zones):
+        for zone in zones:
+            for res in zone['resources']:
+                if res['resource']['name'] in names:
+                    raise SQLAlchemyError('тестовая ошибка записи')
+        return write_resources(self, zones)
+
+    monkeypatch.setattr(XMLParser, 'write_resources',
+                        failing_write_resources)
+    return names
+
+
+def get_contacts(org_id: int) -> list:
+    return [fio for fio, in db.session.query(Contact.fio)
+            .filter(Contact.org_id == org_id).order_by(Contact.fio)]
+
+
+ZONES = [make_zone(1, 'Контакт А', 'Ресурс А'),
+         make_zone(2, 'Контакт В', 'Ресурс В'),
+         make_zone(1, 'Контакт Б', 'Ресурс Б')]
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_partial_reimport_matches_full_import(orgs, import_file, fail_zones,
+                                              stream):
+    # первая загрузка: первый тег юр. лица 1 записать не удалось,
+    # контакты юр. лица 1 - из его последнего тега
+    fail_zones.add('Ресурс А')
+    handler = import_file(ZONES, stream=stream)
+    assert handler.stats.counters['zones_failed'] == 1
+    assert XMLImport.query.count() == 0
+    assert get_contacts(orgs[1]) == ['Контакт Б']
+
+    # повторная загрузка того же файла: теги юр. лица 1 обрабатываются
+    # заново все и в порядке файла, неизменное юр. лицо 2 пропускается
+    fail_zones.clear()
+    handler = import_file(ZONES, stream=stream)
+    assert not handler.skipped
+    assert handler.stats.counters['zones_failed'] == 0
+    assert handler.stats.counters['zones_skipped'] == 1
+    assert get_contacts(orgs[1]) == ['Контакт Б']
+    assert get_contacts(orgs[2]) == ['Контакт В']
+    assert {name for name, in db.session.query(Resource.name)} == {
+        'Ресурс А', 'Ресурс Б', 'Ресурс В'}
+    assert XMLImport.query.count() == 1
+
+    # файл загружен целиком - третья загрузка пропускается
+    assert import_file(ZONES, stream=stream).skipped
+
+
+def test_removed_zone_reprocesses_org(orgs, import_file):
+    import_file(ZONES)
+    assert get_contacts(orgs[1]) == ['Контакт Б']
+
+    handler = import_file(ZONES[:2])
+    assert handler.stats.counters['zones_skipped'] == 1
+    assert get_contacts(orgs[1]) == ['Контакт А']
+
+
+def test_same_file_for_another_cert_is_imported(orgs, import_file):
+    import_file(ZONES)
+    assert import_file(ZONES).skipped
+
+    # центр переименован в БД: файл с тем же содержимым относится
+    # к другому центру и загружается заново
+    cert = Cert.query.one()
+    cert.name = 'ЦЕНТР 1 (прежний)'
+    db.session.commit()
+    handler = import_file(ZONES)
+    assert not handler.skipped
+    assert handler.stats.counters['zones_skipped'] == 0
+    assert Cert.query.filter_by(name='ЦЕНТР 1').count() == 1
+    assert XMLImport.query.count() == 2
+
+
+def test_failed_zone_does_not_block_chunk(orgs, import_file, fail_zones,
+                                          tmp_path):
+    db.session.add(Contact(fio='Прежний контакт', org_id=orgs[2]))
+    db.session.commit()
+    fail_zones.add('Ресурс В')
+
+    handler = import_file([make_zone(1, 'Контакт А', 'Ресурс А'),
+                           make_zone(2, 'Контакт В', 'Ресурс В'),
+                           make_zone(3, 'Контакт Г', 'Ресурс Г')])
+
+    # остальные теги пачки записаны и зафиксированы
+    db.session.remove()
+    assert {name for name, in db.session.query(Resource.name)} == {
+        'Ресурс А', 'Ресурс Г'}
+    assert get_contacts(orgs[1]) == ['Контакт А']
+    assert get_contacts(orgs[3]) == ['Контакт Г']
+    # изменения ошибочного тега отменены вместе с его SAVEPOINT
+    assert get_contacts(orgs[2]) == ['Прежний контакт']
+    # ошибка отражена в сводке и в логе, файл не отмечен загруженным
+    assert handler.stats.counters['zones_failed'] == 1
+    assert XMLImport.query.count() == 0
+    log = (tmp_path / 'parse.log').read_text(encoding='utf-8')
+    assert 'Не удалось записать тег <ЕдЗО> юр. лица (ИНН 7700000002)' in log
+    assert 'Записано в БД тегов <ЕдЗО>: 2 из 3' in log